@@ -4,183 +4,30 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import Calendar, DateEntry
-import sqlite3
-from datetime import datetime
-
-# Vehicle Class
-class Vehicle:
-    def __init__(self, vehicle_id, make, model, year, status='Available'):
-        self.vehicle_id = vehicle_id
-        self.make = make
-        self.model = model
-        self.year = year
-        self.status = status
-        self.maintenance_schedule = []
-
-    def update_status(self, status):
-        self.status = status
-
-    def add_maintenance(self, maintenance):
-        self.maintenance_schedule.append(maintenance)
-    
-    def remove_maintenance(self, maintenance):
-        if maintenance in self.maintenance_schedule:
-            self.maintenance_schedule.remove(maintenance)
-
-# Maintenance Class
-class Maintenance:
-    def __init__(self, date, description):
-        self.date = date
-        self.description = description
-        self.completed = False
-    
-    def complete_maintenance(self):
-        self.completed = True
-
-# Schedule Call Class
-class CallSchedule:
-    def __init__(self, call_id, customer_name, date, time, job_type, vehicle_id=None):
-        self.call_id = call_id
-        self.customer_name = customer_name
-        self.date = date
-        self.time = time
-        self.job_type = job_type
-        self.vehicle_id = vehicle_id
-
-    def assign_vehicle(self, vehicle_id):
-        self.vehicle_id = vehicle_id
-
-# Inventory Class
-class Inventory:
-    def __init__(self):
-        self.items = {
-            "Heating Service Kit": 5,
-            "AC Service Kit": 5,
-            "Plumbing Service Kit": 5,
-            "Drain/Sewer Service Kit": 5,
-            "Electrical Service Kit": 5
-        }
-
-    def use_item(self, item):
-        if self.items[item] > 0:
-            self.items[item] -= 1
-            return True
-        return False
-
-    def restock_item(self, item, quantity):
-        self.items[item] += quantity
-
-# Database
-class FleetManagementSystem:
-    def __init__(self, db_name="fleet_management.db"):
-        # Initialize the fleet management system, connecting to the database
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()
-        self.inventory = Inventory()
-
-    def create_tables(self):
-        # Create necessary tables if they don't exist
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vehicles (
-                vehicle_id TEXT PRIMARY KEY,
-                make TEXT,
-                model TEXT,
-                year INTEGER,
-                status TEXT
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS maintenance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                vehicle_id TEXT,
-                date TEXT,
-                description TEXT,
-                completed INTEGER,
-                FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS call_schedules (
-                call_id TEXT PRIMARY KEY,
-                customer_name TEXT,
-                date TEXT,
-                time TEXT,
-                job_type TEXT,
-                vehicle_id TEXT,
-                FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
-            )
-        ''')
-        self.conn.commit()
-
-    def add_vehicle(self, vehicle):
-        # Add a new vehicle to the vehicles table
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO vehicles (vehicle_id, make, model, year, status) VALUES (?, ?, ?, ?, ?)
-        ''', (vehicle.vehicle_id, vehicle.make, vehicle.model, vehicle.year, vehicle.status))
-        self.conn.commit()
-
-    def remove_vehicle(self, vehicle_id):
-        # Remove a vehicle from the vehicles table
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM vehicles WHERE vehicle_id = ?', (vehicle_id,))
-        self.conn.commit()
-
-    def add_call_schedule(self, call_schedule):
-        # Add call schedule to the call_schedule table
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO call_schedules (call_id, customer_name, date, time, job_type, vehicle_id) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (call_schedule.call_id, call_schedule.customer_name, call_schedule.date, 
-            call_schedule.time, call_schedule.job_type, call_schedule.vehicle_id))
-        self.conn.commit()
-
-    def remove_call_schedule(self, call_id):
-        # Remove a call schedule from the call_schedules table
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM call_schedules WHERE call_id = ?', (call_id,))
-        self.conn.commit()
-
-    def assign_vehicle_to_call(self, call_id, vehicle_id):
-        # Assign a vehicle to a call and update vehicle status
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE call_schedules SET vehicle_id = ? WHERE call_id = ?', (vehicle_id, call_id))
-        cursor.execute('UPDATE vehicles SET status = "Assigned to Call" WHERE vehicle_id = ?', (vehicle_id,))
-        self.conn.commit()
-
-    def add_maintenance_record(self, vehicle_id, maintenance):
-        # Add a maintenance record to the maintenance table
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO maintenance (vehicle_id, date, description, completed) VALUES (?, ?, ?, ?)
-        ''', (vehicle_id, maintenance.date, maintenance.description, int(maintenance.completed)))
-        self.conn.commit()
-
-    def remove_maintenance_record(self, maintenance_id):
-        # Remove a maintenance record from the maintenance table
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM maintenance WHERE id = ?', (maintenance_id,))
-        self.conn.commit()
-
-    def complete_maintenance_record(self, maintenance_id):
-        # Mark a maintenance record as completed
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE maintenance SET completed = 1 WHERE id = ?', (maintenance_id,))
-        self.conn.commit()
-
-    def get_vehicle(self, vehicle_id):
-        # Retrieve a vehicle's details from the vehicles table
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM vehicles WHERE vehicle_id = ?', (vehicle_id,))
-        return cursor.fetchone()
-
-    def get_call_schedule(self, call_id):
-        # Retrieve a call schedule's details from the call_schedules table
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM call_schedules WHERE call_id = ?', (call_id,))
-        return cursor.fetchone()
+import os
+import time
+# The data model and database live in fleet_core, which works without the GUI
+from fleet_core import PAGE_SIZE, CallSchedule, FleetManagementSystem, Maintenance, Vehicle
+from fleet_timing import CallbackProfiler, StartupTimer
+from fleet_schedule import minutes_of_day
+from fleet_views import KeyedTreeBinder, VirtualTreeview
+from fleet_worker import DatabaseWorker
+from fleet_events import ChangeFeed, ChangeWatcher
+
+
+# Table tabs whose row count and first page are read in the background at startup:
+# (table, count, get_page)
+PREFETCH_VIEWS = [
+    ('vehicles', FleetManagementSystem.count_vehicles, FleetManagementSystem.get_vehicles_page),
+    ('maintenance', FleetManagementSystem.count_maintenance, FleetManagementSystem.get_maintenance_page),
+    ('call_schedules', FleetManagementSystem.count_calls, FleetManagementSystem.get_calls_page),
+]
+
+
+def read_first_page(fleet_system, count, get_page):
+    # (row count, (rows, next_key)) for VirtualTreeview.show_first_page
+    return count(fleet_system), get_page(fleet_system, None, PAGE_SIZE)
+
 
 class LoginWindow(tk.Toplevel):
     def __init__(self, parent):
@@ -224,13 +71,35 @@ class LoginWindow(tk.Toplevel):
 class FleetManagementApp(tk.Tk):
     def __init__(self, root):
         super().__init__()
+        # FLEET_PROFILE_UI=<file> times every Tk callback from here on, prints a summary on
+        # quitting and saves the profile to that file as collapsed stacks (flamegraph.pl,
+        # speedscope). Popups made without a master belong to root, so it is timed as well.
+        self.profiler = None
+        if os.environ.get("FLEET_PROFILE_UI"):
+            self.profiler = CallbackProfiler()
+            self.profiler.install(self, root)
         self.title("Fleet Management System")
         self.geometry("1600x1200")
         self.current_user = None
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.tree_binders = {}
+        self.notebook = None
 
-        # Initialize the FleetManagementSystem
+        # Initialize the FleetManagementSystem. It upgrades the database at startup; every
+        # query goes through the background worker, which opens its own connection, so the
+        # window never waits on SQL.
         self.fleet_system = FleetManagementSystem()
+        self.db_worker = DatabaseWorker(self, FleetManagementSystem, on_busy=self.show_busy,
+                                        on_error=self.show_database_error, profiler=self.profiler)
+        # Views subscribe to the tables they show and refresh when any workstation changes them
+        self.change_feed = ChangeFeed()
+        self.change_watcher = ChangeWatcher(self, self.db_worker, self.change_feed)
+        # FLEET_QUERY_STATS=<ms> times every SQL statement from the first one on and logs
+        # those taking at least that long; Ctrl+Shift+D shows the timings
+        self.diagnostics_frame = None
+        if os.environ.get("FLEET_QUERY_STATS"):
+            self.db_worker.submit(FleetManagementSystem.enable_query_stats, float(os.environ["FLEET_QUERY_STATS"]),
+                                  quiet=True)
 
         self.withdraw()  # Hide the main window
         self.login_window = LoginWindow(self)
@@ -238,27 +107,126 @@ class FleetManagementApp(tk.Tk):
     # Quit pop up window
     def on_closing(self):
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            self.change_watcher.stop()
+            self.db_worker.stop()
+            if self.profiler is not None:
+                print(self.profiler.report())
+                self.profiler.write(os.environ["FLEET_PROFILE_UI"])
             self.destroy()
 
-    # Setup for main user interface
+    # Loading indicator shown while the database worker has queries in flight
+    def show_busy(self, busy):
+        if not hasattr(self, 'busy_bar'):
+            return
+        if busy:
+            self.busy_label.config(text="Loading...")
+            self.busy_bar.start(10)
+        else:
+            self.busy_label.config(text="")
+            self.busy_bar.stop()
+
+    def show_database_error(self, error):
+        messagebox.showerror("Database Error", str(error))
+
+    # Setup for main user interface. Only the dashboard is built straight away; every other
+    # tab is built the first time it is selected, and the data the table tabs open on is
+    # read in the background once the dashboard's own queries are done.
     def create_main_interface(self):
+        if self.notebook is not None:
+            # Logging in again after a logout; the interface is still there
+            return
+        self.startup_timer = StartupTimer()
+        status_frame = ttk.Frame(self)
+        status_frame.pack(side="bottom", fill="x")
+        self.busy_bar = ttk.Progressbar(status_frame, mode="indeterminate", length=120)
+        self.busy_bar.pack(side="right", padx=5, pady=2)
+        self.busy_label = ttk.Label(status_frame, text="")
+        self.busy_label.pack(side="right")
+        self.timing_label = ttk.Label(status_frame, text="")
+        self.timing_label.pack(side="left", padx=5)
+
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(expand=True, fill="both")
 
-        # Individual tabs
-        self.create_dashboard_tab()
-        self.create_vehicles_tab()
-        self.create_maintenance_tab()
-        self.create_schedule_tab()
-        self.create_inventory_tab()
+        # The change watcher's first check only records where the tables stand. Queue it
+        # ahead of every view's first read so a change committed after those reads is
+        # always published.
+        self.change_watcher.check_now()
+
+        # Individual tabs: an empty frame each, filled in by build_tab
+        self.prefetched = {}
+        self.unbuilt_tabs = {}
+        for title, create_tab in (("Dashboard", self.create_dashboard_tab), ("Vehicles", self.create_vehicles_tab),
+                                  ("Maintenance", self.create_maintenance_tab),
+                                  ("Call Schedules", self.create_schedule_tab),
+                                  ("Inventory", self.create_inventory_tab), ("Search", self.create_search_tab)):
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=title)
+            self.unbuilt_tabs[str(frame)] = (title, create_tab, frame)
+        self.build_tab(self.notebook.select())
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self.build_tab(self.notebook.select()))
+        self.bind("<Control-Shift-D>", lambda event: self.show_diagnostics())
+        self.db_worker.submit(lambda fleet_system: None, quiet=True,
+                              on_done=lambda result: self.startup_timer.mark("dashboard data shown"))
+
+        # First page and row count of each table tab, read behind the dashboard's queries
+        # (the worker runs jobs in order) and dropped if the table changes before the tab
+        # is opened
+        for table, count, get_page in PREFETCH_VIEWS:
+            self.change_feed.subscribe(table, lambda table=table: self.prefetched.pop(table, None))
+            self.db_worker.submit(read_first_page, count, get_page, quiet=True,
+                                  on_done=lambda page, table=table: self.prefetched.__setitem__(table, page))
+        self.db_worker.submit(lambda fleet_system: None, quiet=True, on_done=self.prefetch_done)
+        self.startup_timer.mark("window built")
+        self.after_idle(self.show_ready)
+
+        self.change_watcher.start()
+
+    def build_tab(self, tab):
+        if tab not in self.unbuilt_tabs:
+            return
+        title, create_tab, frame = self.unbuilt_tabs.pop(tab)
+        started = time.perf_counter()
+        create_tab(frame)
+        self.startup_timer.mark(f"{title} tab built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # First idle moment after login: the window is drawn and answering input
+    def show_ready(self):
+        elapsed = self.startup_timer.mark("interactive")
+        self.timing_label.config(text=f"Ready {elapsed:.0f} ms after login")
+
+    # Set FLEET_STARTUP_REPORT=1 to print the startup timing report once prefetching ends
+    def prefetch_done(self, result=None):
+        self.startup_timer.mark("table tabs prefetched")
+        if os.environ.get("FLEET_STARTUP_REPORT"):
+            print(self.startup_timer.report())
+
+    # Fill a table tab's view from the startup prefetch while it is still current,
+    # otherwise read it now
+    def load_view(self, view, table):
+        prefetched = self.prefetched.pop(table, None)
+        if prefetched is None:
+            view.refresh()
+        else:
+            view.show_first_page(*prefetched)
 
-    # Dashboard tab
-    def create_dashboard_tab(self):
-        dashboard_frame = ttk.Frame(self.notebook)
-        self.notebook.add(dashboard_frame, text="Dashboard")
+    # Called when a write from this workstation lands; the watcher then refreshes every
+    # view of the changed tables
+    def data_saved(self, result=None):
+        self.change_watcher.check_now()
 
+    # Dashboard tab
+    def create_dashboard_tab(self, dashboard_frame):
         ttk.Label(dashboard_frame, text="Dashboard").pack(pady=10)
 
+        # KPI strip: headline counts read from the summary tables
+        kpi_frame = ttk.Frame(dashboard_frame)
+        kpi_frame.pack(pady=5, padx=10, fill="x")
+        self.kpi_labels = {}
+        for name in ("vehicles", "calls", "maintenance"):
+            self.kpi_labels[name] = ttk.Label(kpi_frame, text="", relief="groove", padding=6)
+            self.kpi_labels[name].pack(side="left", padx=5, expand=True, fill="x")
+
         # Vehicles List Snapshot
         vehicles_frame = ttk.Frame(dashboard_frame)
         vehicles_frame.pack(pady=10, fill="x")
@@ -296,57 +264,66 @@ class FleetManagementApp(tk.Tk):
         self.schedule_tree_dashboard.heading("Vehicle ID", text="Vehicle ID")
         self.schedule_tree_dashboard.pack(pady=10, padx=10, expand=True, fill="both")
 
-        # Populate the dashboard with data
+        # Populate the dashboard with data and keep it live
         self.refresh_dashboard()
+        self.change_feed.subscribe('vehicles', self.refresh_vehicle_dashboard)
+        self.change_feed.subscribe('maintenance', self.refresh_maintenance_dashboard)
+        self.change_feed.subscribe('call_schedules', self.refresh_schedule_dashboard)
+        for table in ('vehicles', 'maintenance', 'call_schedules'):
+            self.change_feed.subscribe(table, self.refresh_kpis)
 
         ttk.Button(schedule_frame, text="Logout", command=self.logout).pack(side="bottom", padx=5)
 
     # Refresh tab methods with updated data
     def refresh_dashboard(self):
+        self.refresh_kpis()
         self.refresh_vehicle_dashboard()
         self.refresh_maintenance_dashboard()
         self.refresh_schedule_dashboard()
 
+    def refresh_kpis(self):
+        self.db_worker.submit(FleetManagementSystem.dashboard_kpis, key="kpis", quiet=True, on_done=self.show_kpis)
+
+    def show_kpis(self, kpis):
+        by_status = ", ".join(f"{status or 'No status'} {count}" for status, count in kpis['vehicles_by_status'].items())
+        self.kpi_labels["vehicles"].config(text=f"Vehicles: {kpis['vehicles']}" + (f" ({by_status})" if by_status else ""))
+        self.kpi_labels["calls"].config(
+            text=f"Calls today: {kpis['open_calls']} open, {kpis['assigned_calls']} assigned")
+        self.kpi_labels["maintenance"].config(
+            text=f"Maintenance: {kpis['open_maintenance']} incomplete, {kpis['overdue_maintenance']} overdue")
+
     def refresh_vehicle_dashboard(self):
-        for row in self.vehicle_tree_dashboard.get_children():
-            self.vehicle_tree_dashboard.delete(row)
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT * FROM vehicles')
-        for row in cursor.fetchall():
-            self.vehicle_tree_dashboard.insert('', 'end', values=row)
+        self.refresh_tree(self.vehicle_tree_dashboard, FleetManagementSystem.get_vehicles_page)
 
     def refresh_maintenance_dashboard(self):
-        for row in self.maintenance_tree_dashboard.get_children():
-            self.maintenance_tree_dashboard.delete(row)
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT * FROM maintenance')
-        for row in cursor.fetchall():
-            self.maintenance_tree_dashboard.insert('', 'end', values=row)
+        self.refresh_tree(self.maintenance_tree_dashboard, FleetManagementSystem.get_maintenance_page)
 
     def refresh_schedule_dashboard(self):
-        for row in self.schedule_tree_dashboard.get_children():
-            self.schedule_tree_dashboard.delete(row)
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT * FROM call_schedules')
-        for row in cursor.fetchall():
-            self.schedule_tree_dashboard.insert('', 'end', values=row)
+        self.refresh_tree(self.schedule_tree_dashboard, FleetManagementSystem.get_calls_page)
 
-    # Vehicle List tab
-    def create_vehicles_tab(self):
-        vehicles_frame = ttk.Frame(self.notebook)
-        self.notebook.add(vehicles_frame, text="Vehicles")
+    # Reload the first page of a dashboard treeview on the worker, applying only the rows
+    # that changed. A newer refresh of the same tree cancels one still waiting.
+    def refresh_tree(self, tree, get_page):
+        binder = self.tree_binders.get(tree)
+        if binder is None:
+            binder = self.tree_binders[tree] = KeyedTreeBinder(tree)
+        self.db_worker.submit(get_page, None, PAGE_SIZE, key=tree, on_done=lambda page: binder.apply(page[0]))
 
+    # Vehicle List tab
+    def create_vehicles_tab(self, vehicles_frame):
         ttk.Label(vehicles_frame, text="Vehicles").pack(pady=10)
         ttk.Button(vehicles_frame, text="Logout", command=self.logout).pack(side="bottom", padx=5)
 
-        # Create a treeview to display vehicles
-        self.vehicle_tree = ttk.Treeview(vehicles_frame, columns=("ID", "Make", "Model", "Year", "Status"), show="headings")
+        # Create a virtual treeview that pages vehicles in from the database as it scrolls
+        self.vehicle_view = VirtualTreeview(vehicles_frame, ("ID", "Make", "Model", "Year", "Status"), self.db_worker,
+                                            FleetManagementSystem.get_vehicles_page, FleetManagementSystem.count_vehicles)
+        self.vehicle_tree = self.vehicle_view.tree
         self.vehicle_tree.heading("ID", text="ID")
         self.vehicle_tree.heading("Make", text="Make")
         self.vehicle_tree.heading("Model", text="Model")
         self.vehicle_tree.heading("Year", text="Year")
         self.vehicle_tree.heading("Status", text="Status")
-        self.vehicle_tree.pack(pady=10, padx=10, expand=True, fill="both")
+        self.vehicle_view.pack(pady=10, padx=10, expand=True, fill="both")
 
         # Buttons for vehicle operations
         button_frame = ttk.Frame(vehicles_frame)
@@ -355,26 +332,28 @@ class FleetManagementApp(tk.Tk):
         ttk.Button(button_frame, text="Add Vehicle", command=self.add_vehicle_popup).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Remove Vehicle", command=self.remove_vehicle).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Update Status", command=self.update_vehicle_status).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Find Free Vehicles", command=self.free_vehicles_popup).pack(side="left", padx=5)
 
-        # Populate the treeview with vehicles from the database
-        self.refresh_vehicle_list()
+        # Populate the treeview from the startup prefetch, or from the database
+        self.load_view(self.vehicle_view, 'vehicles')
+        self.change_feed.subscribe('vehicles', self.refresh_vehicle_list)
 
     # Maintenance Record tab
-    def create_maintenance_tab(self):
-        maintenance_frame = ttk.Frame(self.notebook)
-        self.notebook.add(maintenance_frame, text="Maintenance")
-
+    def create_maintenance_tab(self, maintenance_frame):
         ttk.Label(maintenance_frame, text="Maintenance").pack(pady=10)
         ttk.Button(maintenance_frame, text="Logout", command=self.logout).pack(side="bottom", padx=5)
 
-        # Create a treeview to display maintenance records
-        self.maintenance_tree = ttk.Treeview(maintenance_frame, columns=("ID", "Vehicle ID", "Date", "Description", "Completed"), show="headings")
+        # Create a virtual treeview to display maintenance records
+        self.maintenance_view = VirtualTreeview(maintenance_frame, ("ID", "Vehicle ID", "Date", "Description", "Completed"),
+                                                self.db_worker, FleetManagementSystem.get_maintenance_page,
+                                                FleetManagementSystem.count_maintenance)
+        self.maintenance_tree = self.maintenance_view.tree
         self.maintenance_tree.heading("ID", text="ID")
         self.maintenance_tree.heading("Vehicle ID", text="Vehicle ID")
         self.maintenance_tree.heading("Date", text="Date")
         self.maintenance_tree.heading("Description", text="Description")
         self.maintenance_tree.heading("Completed", text="Completed")
-        self.maintenance_tree.pack(pady=10, padx=10, expand=True, fill="both")
+        self.maintenance_view.pack(pady=10, padx=10, expand=True, fill="both")
 
         # Buttons for maintenance operations
         button_frame = ttk.Frame(maintenance_frame)
@@ -384,26 +363,27 @@ class FleetManagementApp(tk.Tk):
         ttk.Button(button_frame, text="Remove Maintenance Record", command=self.remove_maintenance_record).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Complete Maintenance", command=self.complete_maintenance_record).pack(side="left", padx=5)
 
-        # Populate the treeview with maintenance records from the database
-        self.refresh_maintenance_list()
+        # Populate the treeview from the startup prefetch, or from the database
+        self.load_view(self.maintenance_view, 'maintenance')
+        self.change_feed.subscribe('maintenance', self.refresh_maintenance_list)
 
     # Schedule tab
-    def create_schedule_tab(self):
-        schedule_frame = ttk.Frame(self.notebook)
-        self.notebook.add(schedule_frame, text="Call Schedules")
-
+    def create_schedule_tab(self, schedule_frame):
         ttk.Label(schedule_frame, text="Call Schedules").pack(pady=10)
         ttk.Button(schedule_frame, text="Logout", command=self.logout).pack(side="bottom", padx=5)
 
-        # Create a treeview to display call schedules
-        self.schedule_tree = ttk.Treeview(schedule_frame, columns=("ID", "Customer Name", "Date", "Time", "Job Type", "Vehicle ID"), show="headings")
+        # Create a virtual treeview to display call schedules
+        self.schedule_view = VirtualTreeview(schedule_frame, ("ID", "Customer Name", "Date", "Time", "Job Type", "Vehicle ID"),
+                                             self.db_worker, FleetManagementSystem.get_calls_page,
+                                             FleetManagementSystem.count_calls)
+        self.schedule_tree = self.schedule_view.tree
         self.schedule_tree.heading("ID", text="ID")
         self.schedule_tree.heading("Customer Name", text="Customer Name")
         self.schedule_tree.heading("Date", text="Date")
         self.schedule_tree.heading("Time", text="Time")
         self.schedule_tree.heading("Job Type", text="Job Type")
         self.schedule_tree.heading("Vehicle ID", text="Vehicle ID")
-        self.schedule_tree.pack(pady=10, padx=10, expand=True, fill="both")
+        self.schedule_view.pack(pady=10, padx=10, expand=True, fill="both")
 
         # Buttons for schedule operations
         button_frame = ttk.Frame(schedule_frame)
@@ -412,9 +392,36 @@ class FleetManagementApp(tk.Tk):
         ttk.Button(button_frame, text="Add Call Schedule", command=self.add_call_schedule_popup).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Remove Call Schedule", command=self.remove_call_schedule).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Assign Vehicle", command=self.assign_vehicle_popup).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Dispatch Day", command=self.dispatch_day_popup).pack(side="left", padx=5)
 
-        # Populate the treeview with call schedules from the database
-        self.refresh_schedule_list()
+        # Populate the treeview from the startup prefetch, or from the database
+        self.load_view(self.schedule_view, 'call_schedules')
+        self.change_feed.subscribe('call_schedules', self.refresh_schedule_list)
+
+    # Dispatch day popup: assign every open call on a date in one go
+    def dispatch_day_popup(self):
+        popup = tk.Toplevel()
+        popup.title("Dispatch Day")
+
+        tk.Label(popup, text="Date").grid(row=0, column=0, padx=10, pady=10)
+        date_entry = DateEntry(popup, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd')
+        date_entry.grid(row=0, column=1, padx=10, pady=10)
+
+        def dispatched(plan):
+            self.data_saved()
+            message = f"Assigned {len(plan.assignments)} call(s)."
+            if plan.unassigned:
+                reasons = "\n".join(f"{call_id}: {reason}" for call_id, reason in plan.unassigned[:20])
+                more = f"\n... and {len(plan.unassigned) - 20} more" if len(plan.unassigned) > 20 else ""
+                message += f"\n\n{len(plan.unassigned)} call(s) left unassigned:\n{reasons}{more}"
+            messagebox.showinfo("Dispatch Complete", message)
+
+        def dispatch():
+            date = date_entry.get_date().strftime("%Y-%m-%d")
+            popup.destroy()
+            self.db_worker.submit(FleetManagementSystem.dispatch_calls, date, on_done=dispatched)
+
+        tk.Button(popup, text="Dispatch", command=dispatch).grid(row=1, column=0, columnspan=2, pady=10)
 
     # Add schedule popup
     def add_call_schedule_popup(self):
@@ -445,6 +452,9 @@ class FleetManagementApp(tk.Tk):
             if not job_type_var.get():
                 messagebox.showwarning("Missing Information", "Please select a job type.")
                 return
+            if minutes_of_day(time_entry.get()) is None:
+                messagebox.showwarning("Invalid Time", "Please enter the time like 9:00, 14:30 or 2:30 PM.")
+                return
     
             selected_date = date_entry.get_date()
             formatted_date = selected_date.strftime("%Y-%m-%d")
@@ -456,9 +466,9 @@ class FleetManagementApp(tk.Tk):
                 time_entry.get(),
                 job_type_var.get()
             )
-            self.fleet_system.add_call_schedule(call_schedule)
-            self.refresh_schedule_list()
             popup.destroy()
+            self.db_worker.submit(FleetManagementSystem.add_call_schedule, call_schedule,
+                                  on_done=self.data_saved)
 
         tk.Button(popup, text="Add", command=add_call_schedule).grid(row=5, column=0, columnspan=2, pady=10)
 
@@ -466,29 +476,29 @@ class FleetManagementApp(tk.Tk):
     def assign_vehicle_popup(self):
         selected_item = self.schedule_tree.selection()
         if selected_item:
-            call_id = self.schedule_tree.item(selected_item)['values'][0]
+            call_id = selected_item[0]
             popup = tk.Toplevel()
             popup.title("Assign Vehicle")
 
             tk.Label(popup, text="Select Vehicle").grid(row=0, column=0, padx=10, pady=10)
     
-            # Fetch available vehicles from the database with all details
-            cursor = self.fleet_system.conn.cursor()
-            cursor.execute('SELECT vehicle_id, make, model, year FROM vehicles WHERE status = "Available"')
-            available_vehicles = cursor.fetchall()
+            vehicle_var = tk.StringVar()
+            vehicle_dropdown = ttk.Combobox(popup, textvariable=vehicle_var, width=50)
+            vehicle_dropdown.grid(row=0, column=1, padx=10, pady=10)
 
-            # Create a dictionary to store vehicle information
+            # Fetch available vehicles from the database with all details
             vehicle_dict = {}
-            vehicle_list = []
-            for vehicle in available_vehicles:
-                vehicle_id, make, model, year = vehicle
-                display_text = f"{vehicle_id} - {make} {model} ({year})"
-                vehicle_dict[display_text] = vehicle_id
-                vehicle_list.append(display_text)
 
-            vehicle_var = tk.StringVar()
-            vehicle_dropdown = ttk.Combobox(popup, textvariable=vehicle_var, values=vehicle_list, width=50)
-            vehicle_dropdown.grid(row=0, column=1, padx=10, pady=10)
+            def show_vehicles(available_vehicles):
+                vehicle_list = []
+                for vehicle in available_vehicles:
+                    vehicle_id, make, model, year = vehicle
+                    display_text = f"{vehicle_id} - {make} {model} ({year})"
+                    vehicle_dict[display_text] = vehicle_id
+                    vehicle_list.append(display_text)
+                vehicle_dropdown['values'] = vehicle_list
+
+            self.db_worker.submit(FleetManagementSystem.get_available_vehicles, on_done=show_vehicles)
 
             def assign_vehicle():
                 selected_vehicle_display = vehicle_var.get()
@@ -496,12 +506,18 @@ class FleetManagementApp(tk.Tk):
                     selected_vehicle_id = vehicle_dict[selected_vehicle_display]
                     selected_item = self.inventory_checklist()
                     if selected_item:
-                        self.fleet_system.inventory.use_item(selected_item)
-                        self.fleet_system.assign_vehicle_to_call(call_id, selected_vehicle_id)
-                        self.refresh_schedule_list()
-                        self.refresh_vehicle_list()
-                        self.refresh_inventory_list()
+                        def assign_failed(error):
+                            # Out of stock, or the vehicle already has a call at that time
+                            if isinstance(error, ValueError):
+                                messagebox.showwarning("Cannot Assign Vehicle", str(error))
+                            else:
+                                self.show_database_error(error)
+
                         popup.destroy()
+                        # The kit is taken from stock in the same transaction as the assignment
+                        self.db_worker.submit(FleetManagementSystem.assign_vehicle_to_call, call_id,
+                                              selected_vehicle_id, selected_item,
+                                              on_done=self.data_saved, on_error=assign_failed)
                     else:
                         messagebox.showwarning("Inventory Check Failed", "Please select an inventory item before assigning a vehicle.")
                 else:
@@ -513,19 +529,23 @@ class FleetManagementApp(tk.Tk):
         checklist_popup = tk.Toplevel()
         checklist_popup.title("Inventory Checklist")
 
-        items = self.fleet_system.inventory.items.keys()
         selected_item = tk.StringVar()
-
-        for i, item in enumerate(items):
-            ttk.Radiobutton(checklist_popup, text=f"{item} (Qty: {self.fleet_system.inventory.items[item]})", 
-                            variable=selected_item, value=item).grid(row=i, column=0, sticky="w", padx=10, pady=5)
-
+        quantities = {}
         result = {'selected': None}
 
+        def show_items(items):
+            if not checklist_popup.winfo_exists():
+                return
+            for i, (item, quantity) in enumerate(items):
+                quantities[item] = quantity
+                ttk.Radiobutton(checklist_popup, text=f"{item} (Qty: {quantity})",
+                                variable=selected_item, value=item).grid(row=i, column=0, sticky="w", padx=10, pady=5)
+            ttk.Button(checklist_popup, text="Confirm", command=confirm_checklist).grid(row=len(items), column=0, pady=10)
+
         def confirm_checklist():
             selected = selected_item.get()
             if selected:
-                if self.fleet_system.inventory.items[selected] > 0:
+                if quantities[selected] > 0:
                     result['selected'] = selected
                     checklist_popup.destroy()
                 else:
@@ -533,8 +553,7 @@ class FleetManagementApp(tk.Tk):
             else:
                 messagebox.showwarning("No Selection", "Please select an inventory item before confirming.")
 
-        ttk.Button(checklist_popup, text="Confirm", command=confirm_checklist).grid(row=len(items), column=0, pady=10)
-
+        self.db_worker.submit(FleetManagementSystem.get_inventory, on_done=show_items)
         checklist_popup.wait_window()
         return result['selected']
 
@@ -545,10 +564,7 @@ class FleetManagementApp(tk.Tk):
         self.login_window = LoginWindow(self)
 
     # Inventory Tab
-    def create_inventory_tab(self):
-        inventory_frame = ttk.Frame(self.notebook)
-        self.notebook.add(inventory_frame, text="Inventory")
-
+    def create_inventory_tab(self, inventory_frame):
         ttk.Label(inventory_frame, text="Inventory").pack(pady=10)
 
         self.inventory_tree = ttk.Treeview(inventory_frame, columns=("Item", "Quantity"), show="headings")
@@ -564,14 +580,107 @@ class FleetManagementApp(tk.Tk):
 
         # Refresh the inventory list after creating the tree
         self.refresh_inventory_list()
+        self.change_feed.subscribe('inventory', self.refresh_inventory_list)
 
     def refresh_inventory_list(self):
         if hasattr(self, 'inventory_tree'):
-            for row in self.inventory_tree.get_children():
-                self.inventory_tree.delete(row)
-            for item, quantity in self.fleet_system.inventory.items.items():
-                self.inventory_tree.insert('', 'end', values=(item, quantity))
+            binder = self.tree_binders.get(self.inventory_tree)
+            if binder is None:
+                binder = self.tree_binders[self.inventory_tree] = KeyedTreeBinder(self.inventory_tree)
+            self.db_worker.submit(FleetManagementSystem.get_inventory, key=self.inventory_tree, on_done=binder.apply)
     
+    # Search tab: calls by customer or job type and maintenance by description, updated as
+    # the user types
+    def create_search_tab(self, search_frame):
+        ttk.Label(search_frame, text="Search customers, job types and maintenance").pack(pady=10)
+
+        self.search_text = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_text, width=50)
+        search_entry.pack(pady=5)
+        self.search_timer = None
+        self.search_text.trace_add("write", lambda *args: self.schedule_search())
+
+        self.search_tree = ttk.Treeview(search_frame, columns=("Type", "ID", "Date", "Match"), show="headings")
+        self.search_tree.heading("Type", text="Type")
+        self.search_tree.heading("ID", text="ID")
+        self.search_tree.heading("Date", text="Date")
+        self.search_tree.heading("Match", text="Match")
+        self.search_tree.pack(pady=10, padx=10, expand=True, fill="both")
+
+        # Results may change when calls or maintenance records do
+        self.change_feed.subscribe('call_schedules', self.run_search)
+        self.change_feed.subscribe('maintenance', self.run_search)
+
+    # Wait for a pause in typing before searching
+    def schedule_search(self):
+        if self.search_timer is not None:
+            self.after_cancel(self.search_timer)
+        self.search_timer = self.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_timer = None
+        self.db_worker.submit(FleetManagementSystem.search, self.search_text.get(), key=self.search_tree,
+                              quiet=True, on_done=self.show_search_results)
+
+    def show_search_results(self, results):
+        self.search_tree.delete(*self.search_tree.get_children())
+        for kind, key, day, text in results:
+            self.search_tree.insert('', 'end', values=("Call" if kind == 'call' else "Maintenance", key, day, text))
+
+    # Diagnostics tab: SQL timings for the worker's connection. It isn't in the notebook
+    # until Ctrl+Shift+D opens it, which also switches the timings on.
+    def show_diagnostics(self):
+        if self.diagnostics_frame is None:
+            self.db_worker.submit(FleetManagementSystem.enable_query_stats, quiet=True)
+            self.diagnostics_frame = ttk.Frame(self.notebook)
+            self.notebook.add(self.diagnostics_frame, text="Diagnostics")
+            self.create_diagnostics_tab(self.diagnostics_frame)
+        self.notebook.select(self.diagnostics_frame)
+
+    def create_diagnostics_tab(self, diagnostics_frame):
+        ttk.Label(diagnostics_frame, text="SQL statements since timing started, most total time first").pack(pady=10)
+
+        button_frame = ttk.Frame(diagnostics_frame)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Refresh", command=self.refresh_diagnostics).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reset", command=self.reset_diagnostics).pack(side="left", padx=5)
+
+        columns = ("Statement", "Count", "Total ms", "p50 ms", "p95 ms", "p99 ms", "Rows")
+        self.query_stats_tree = ttk.Treeview(diagnostics_frame, columns=columns, show="headings")
+        for column in columns:
+            self.query_stats_tree.heading(column, text=column)
+            self.query_stats_tree.column(column, width=600 if column == "Statement" else 80,
+                                         anchor="w" if column == "Statement" else "e")
+        self.query_stats_tree.pack(pady=5, padx=10, expand=True, fill="both")
+
+        ttk.Label(diagnostics_frame, text="Slow statements and their query plans").pack(pady=5)
+        self.slow_query_tree = ttk.Treeview(diagnostics_frame, columns=("ms", "Statement", "Plan"), show="headings",
+                                            height=8)
+        for column, width in (("ms", 80), ("Statement", 600), ("Plan", 400)):
+            self.slow_query_tree.heading(column, text=column)
+            self.slow_query_tree.column(column, width=width)
+        self.slow_query_tree.pack(pady=5, padx=10, fill="x")
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        self.db_worker.submit(lambda fleet_system: (fleet_system.query_stats(), fleet_system.slow_queries()),
+                              key=self.query_stats_tree, quiet=True, on_done=self.show_diagnostics_data)
+
+    def reset_diagnostics(self):
+        self.db_worker.submit(FleetManagementSystem.reset_query_stats, quiet=True,
+                              on_done=lambda result: self.refresh_diagnostics())
+
+    def show_diagnostics_data(self, result):
+        statements, slow = result
+        self.query_stats_tree.delete(*self.query_stats_tree.get_children())
+        for stats in statements:
+            self.query_stats_tree.insert('', 'end', values=(
+                stats['sql'], stats['count'], f"{stats['total_ms']:.1f}", f"{stats['p50_ms']:.2f}",
+                f"{stats['p95_ms']:.2f}", f"{stats['p99_ms']:.2f}", stats['rows']))
+        self.slow_query_tree.delete(*self.slow_query_tree.get_children())
+        for sql, params, ms, plan in reversed(slow):
+            self.slow_query_tree.insert('', 'end', values=(f"{ms:.1f}", sql, "; ".join(line.strip() for line in plan)))
+
     # Restock button popup
     def restock_item_popup(self):
         popup = tk.Toplevel()
@@ -581,47 +690,44 @@ class FleetManagementApp(tk.Tk):
         tk.Label(popup, text="Quantity").grid(row=1, column=0, padx=10, pady=10)
 
         item_var = tk.StringVar()
-        item_combobox = ttk.Combobox(popup, textvariable=item_var, values=list(self.fleet_system.inventory.items.keys()))
+        item_combobox = ttk.Combobox(popup, textvariable=item_var)
         quantity_entry = tk.Entry(popup)
 
         item_combobox.grid(row=0, column=1, padx=10, pady=10)
         quantity_entry.grid(row=1, column=1, padx=10, pady=10)
 
+        def show_items(items):
+            if popup.winfo_exists():
+                item_combobox['values'] = [item for item, quantity in items]
+
+        self.db_worker.submit(FleetManagementSystem.get_inventory, on_done=show_items)
+
         def restock_item():
             item = item_var.get()
-            quantity = int(quantity_entry.get())
-            self.fleet_system.inventory.restock_item(item, quantity)
-            self.refresh_inventory_list()
+            try:
+                quantity = int(quantity_entry.get())
+            except ValueError:
+                quantity = 0
+            if not item or quantity <= 0:
+                messagebox.showwarning("Invalid Restock", "Please choose an item and a positive whole number to restock.")
+                return
             popup.destroy()
+            self.db_worker.submit(lambda fleet_system: fleet_system.inventory.restock_item(item, quantity),
+                                  on_done=self.data_saved)
 
         tk.Button(popup, text="Restock", command=restock_item).grid(row=2, column=0, columnspan=2, pady=10)
 
     # Clears and reloads vehicle list from database
     def refresh_vehicle_list(self):
-        for row in self.vehicle_tree.get_children():
-            self.vehicle_tree.delete(row)
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT * FROM vehicles')
-        for row in cursor.fetchall():
-            self.vehicle_tree.insert('', 'end', values=row)
+        self.vehicle_view.refresh()
 
     # Clears and reloads maintenance record list from database
     def refresh_maintenance_list(self):
-        for row in self.maintenance_tree.get_children():
-            self.maintenance_tree.delete(row)
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT * FROM maintenance')
-        for row in cursor.fetchall():
-            self.maintenance_tree.insert('', 'end', values=row)
+        self.maintenance_view.refresh()
     
     # Clears and reloads call schedule list from database
     def refresh_schedule_list(self):
-        for row in self.schedule_tree.get_children():
-            self.schedule_tree.delete(row)
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT * FROM call_schedules')
-        for row in cursor.fetchall():
-            self.schedule_tree.insert('', 'end', values=row)
+        self.schedule_view.refresh()
 
     # Add vehicle button popup
     def add_vehicle_popup(self):
@@ -645,25 +751,66 @@ class FleetManagementApp(tk.Tk):
 
         def add_vehicle():
             vehicle = Vehicle(vehicle_id_entry.get(), make_entry.get(), model_entry.get(), int(year_entry.get()))
-            self.fleet_system.add_vehicle(vehicle)
-            self.refresh_vehicle_list()
             popup.destroy()
+            self.db_worker.submit(FleetManagementSystem.add_vehicle, vehicle,
+                                  on_done=self.data_saved)
 
         tk.Button(popup, text="Add", command=add_vehicle).grid(row=4, column=0, columnspan=2, pady=10)
 
+    # Free vehicles popup: which vehicles have nothing booked in a time window
+    def free_vehicles_popup(self):
+        popup = tk.Toplevel()
+        popup.title("Find Free Vehicles")
+
+        tk.Label(popup, text="Date").grid(row=0, column=0, padx=10, pady=10)
+        tk.Label(popup, text="From").grid(row=1, column=0, padx=10, pady=10)
+        tk.Label(popup, text="To").grid(row=2, column=0, padx=10, pady=10)
+
+        date_entry = DateEntry(popup, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd')
+        from_entry = tk.Entry(popup)
+        to_entry = tk.Entry(popup)
+        listbox = tk.Listbox(popup, width=30, height=15)
+
+        date_entry.grid(row=0, column=1, padx=10, pady=10)
+        from_entry.grid(row=1, column=1, padx=10, pady=10)
+        to_entry.grid(row=2, column=1, padx=10, pady=10)
+        listbox.grid(row=4, column=0, columnspan=2, padx=10, pady=10)
+
+        def show_vehicles(vehicle_ids):
+            if not popup.winfo_exists():
+                return
+            listbox.delete(0, tk.END)
+            for vehicle_id in vehicle_ids:
+                listbox.insert(tk.END, vehicle_id)
+            if not vehicle_ids:
+                listbox.insert(tk.END, "No vehicles are free then.")
+
+        def find():
+            start = minutes_of_day(from_entry.get())
+            end = minutes_of_day(to_entry.get())
+            if start is None or end is None or end <= start:
+                messagebox.showwarning("Invalid Time", "Please enter a start and a later end time, like 2:00 PM and 4:00 PM.")
+                return
+            day = date_entry.get_date().strftime("%Y-%m-%d")
+            self.db_worker.submit(FleetManagementSystem.free_vehicles, day, start, end, on_done=show_vehicles)
+
+        tk.Button(popup, text="Find", command=find).grid(row=3, column=0, columnspan=2, pady=10)
+
     # Remove vehicle method
     def remove_vehicle(self):
         selected_item = self.vehicle_tree.selection()
         if selected_item:
-            vehicle_id = self.vehicle_tree.item(selected_item)['values'][0]
-            self.fleet_system.remove_vehicle(vehicle_id)
-            self.refresh_vehicle_list()
+            # The tree's iids are the rows' keys as text (see KeyedTreeBinder); the values
+            # would turn an ID like '007' into the int 7
+            vehicle_id = selected_item[0]
+            self.db_worker.submit(FleetManagementSystem.remove_vehicle, vehicle_id,
+                                  on_done=self.data_saved)
 
     # Update vehicle status button popup
     def update_vehicle_status(self):
         selected_item = self.vehicle_tree.selection()
         if selected_item:
-            vehicle_id = self.vehicle_tree.item(selected_item)['values'][0]
+            vehicle_id = selected_item[0]
             popup = tk.Toplevel()
             popup.title("Update Vehicle Status")
 
@@ -682,10 +829,9 @@ class FleetManagementApp(tk.Tk):
 
             def update_status():
                 new_status = status_var.get()
-                self.fleet_system.conn.cursor().execute('UPDATE vehicles SET status = ? WHERE vehicle_id = ?', (new_status, vehicle_id))
-                self.fleet_system.conn.commit()
-                self.refresh_vehicle_list()
                 popup.destroy()
+                self.db_worker.submit(FleetManagementSystem.update_vehicle_status, vehicle_id, new_status,
+                                      on_done=self.data_saved)
 
             tk.Button(popup, text="Update", command=update_status).grid(row=1, column=0, columnspan=2, pady=10)
 
@@ -698,15 +844,16 @@ class FleetManagementApp(tk.Tk):
         tk.Label(popup, text="Date (YYYY-MM-DD)").grid(row=1, column=0, padx=10, pady=10)
         tk.Label(popup, text="Description").grid(row=2, column=0, padx=10, pady=10)
 
-        # Fetch available vehicles from the database
-        cursor = self.fleet_system.conn.cursor()
-        cursor.execute('SELECT vehicle_id FROM vehicles')
-        available_vehicles = [row[0] for row in cursor.fetchall()]
-
         vehicle_var = tk.StringVar()
-        vehicle_dropdown = ttk.Combobox(popup, textvariable=vehicle_var, values=available_vehicles)
+        vehicle_dropdown = ttk.Combobox(popup, textvariable=vehicle_var)
         vehicle_dropdown.grid(row=0, column=1, padx=10, pady=10)
 
+        # Fetch available vehicles from the database
+        def show_vehicles(vehicle_ids):
+            vehicle_dropdown['values'] = vehicle_ids
+
+        self.db_worker.submit(FleetManagementSystem.get_vehicle_ids, on_done=show_vehicles)
+
         date_entry = DateEntry(popup, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd')
         date_entry.grid(row=1, column=1, padx=10, pady=10)
 
@@ -723,9 +870,9 @@ class FleetManagementApp(tk.Tk):
             formatted_date = selected_date.strftime("%Y-%m-%d")
         
             maintenance = Maintenance(formatted_date, description_entry.get())
-            self.fleet_system.add_maintenance_record(selected_vehicle, maintenance)
-            self.refresh_maintenance_list()
             popup.destroy()
+            self.db_worker.submit(FleetManagementSystem.add_maintenance_record, selected_vehicle, maintenance,
+                                  on_done=self.data_saved)
 
         tk.Button(popup, text="Add", command=add_maintenance).grid(row=3, column=0, columnspan=2, pady=10)
 
@@ -733,17 +880,17 @@ class FleetManagementApp(tk.Tk):
     def remove_maintenance_record(self):
         selected_item = self.maintenance_tree.selection()
         if selected_item:
-            maintenance_id = self.maintenance_tree.item(selected_item)['values'][0]
-            self.fleet_system.remove_maintenance_record(maintenance_id)
-            self.refresh_maintenance_list()
+            maintenance_id = int(selected_item[0])
+            self.db_worker.submit(FleetManagementSystem.remove_maintenance_record, maintenance_id,
+                                  on_done=self.data_saved)
 
     # Complete maintenance method
     def complete_maintenance_record(self):
         selected_item = self.maintenance_tree.selection()
         if selected_item:
-            maintenance_id = self.maintenance_tree.item(selected_item)['values'][0]
-            self.fleet_system.complete_maintenance_record(maintenance_id)
-            self.refresh_maintenance_list()
+            maintenance_id = int(selected_item[0])
+            self.db_worker.submit(FleetManagementSystem.complete_maintenance_record, maintenance_id,
+                                  on_done=self.data_saved)
 
     # Add call button popup
     def add_call_schedule_popup(self):
@@ -758,7 +905,7 @@ class FleetManagementApp(tk.Tk):
 
         call_id_entry = tk.Entry(popup)
         customer_name_entry = tk.Entry(popup)
-        date_entry = DateEntry(popup, width=12, background='darkblue', foreground='white', borderwidth=2)
+        date_entry = DateEntry(popup, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd')
         time_entry = tk.Entry(popup)
         job_type_var = tk.StringVar()
         job_types = ["Heating", "AC", "Plumbing", "Drain/Sewer", "Electrical"]
@@ -774,6 +921,9 @@ class FleetManagementApp(tk.Tk):
             if not job_type_var.get():
                 messagebox.showwarning("Missing Information", "Please select a job type.")
                 return
+            if minutes_of_day(time_entry.get()) is None:
+                messagebox.showwarning("Invalid Time", "Please enter the time like 9:00, 14:30 or 2:30 PM.")
+                return
             call_schedule = CallSchedule(
                 call_id_entry.get(),
                 customer_name_entry.get(),
@@ -781,9 +931,9 @@ class FleetManagementApp(tk.Tk):
                 time_entry.get(),
                 job_type_var.get()
             )
-            self.fleet_system.add_call_schedule(call_schedule)
-            self.refresh_schedule_list()
             popup.destroy()
+            self.db_worker.submit(FleetManagementSystem.add_call_schedule, call_schedule,
+                                  on_done=self.data_saved)
 
         tk.Button(popup, text="Add", command=add_call_schedule).grid(row=5, column=0, columnspan=2, pady=10)
 
@@ -791,39 +941,35 @@ class FleetManagementApp(tk.Tk):
     def remove_call_schedule(self):
         selected_item = self.schedule_tree.selection()
         if selected_item:
-            call_id = self.schedule_tree.item(selected_item)['values'][0]
-            self.fleet_system.remove_call_schedule(call_id)
-            self.refresh_schedule_list()
+            call_id = selected_item[0]
+            self.db_worker.submit(FleetManagementSystem.remove_call_schedule, call_id,
+                                  on_done=self.data_saved)
 
     # Assign vehicle popup
     def assign_vehicle_popup(self):
         selected_item = self.schedule_tree.selection()
         if selected_item:
-            call_id = self.schedule_tree.item(selected_item)['values'][0]
+            call_id = selected_item[0]
             popup = tk.Toplevel()
             popup.title("Assign Vehicle")
 
             tk.Label(popup, text="Select Vehicle").grid(row=0, column=0, padx=10, pady=10)
     
-            # Fetch available vehicles from the database with all details
-            cursor = self.fleet_system.conn.cursor()
-            cursor.execute('SELECT vehicle_id, make, model, year FROM vehicles WHERE status = "Available"')
-            available_vehicles = cursor.fetchall()
-
-            # Create a dictionary to store vehicle information
-            vehicle_dict = {}
-            vehicle_list = []
-            for vehicle in available_vehicles:
-                vehicle_id, make, model, year = vehicle
-                display_text = f"{vehicle_id} - {make} {model} ({year})"
-                vehicle_dict[display_text] = vehicle_id
-                vehicle_list.append(display_text)
-
             # Use a Listbox instead of Combobox
             listbox = tk.Listbox(popup, width=50, height=10)
             listbox.grid(row=0, column=1, padx=10, pady=10)
-            for item in vehicle_list:
-                listbox.insert(tk.END, item)
+
+            # Fetch available vehicles from the database with all details
+            vehicle_dict = {}
+
+            def show_vehicles(available_vehicles):
+                for vehicle in available_vehicles:
+                    vehicle_id, make, model, year = vehicle
+                    display_text = f"{vehicle_id} - {make} {model} ({year})"
+                    vehicle_dict[display_text] = vehicle_id
+                    listbox.insert(tk.END, display_text)
+
+            self.db_worker.submit(FleetManagementSystem.get_available_vehicles, on_done=show_vehicles)
 
             def assign_vehicle():
                 selection = listbox.curselection()
@@ -832,12 +978,18 @@ class FleetManagementApp(tk.Tk):
                     selected_vehicle_id = vehicle_dict[selected_vehicle_display]
                     selected_item = self.inventory_checklist()
                     if selected_item:
-                        self.fleet_system.inventory.use_item(selected_item)
-                        self.fleet_system.assign_vehicle_to_call(call_id, selected_vehicle_id)
-                        self.refresh_schedule_list()
-                        self.refresh_vehicle_list()
-                        self.refresh_inventory_list()
+                        def assign_failed(error):
+                            # Out of stock, or the vehicle already has a call at that time
+                            if isinstance(error, ValueError):
+                                messagebox.showwarning("Cannot Assign Vehicle", str(error))
+                            else:
+                                self.show_database_error(error)
+
                         popup.destroy()
+                        # The kit is taken from stock in the same transaction as the assignment
+                        self.db_worker.submit(FleetManagementSystem.assign_vehicle_to_call, call_id,
+                                              selected_vehicle_id, selected_item,
+                                              on_done=self.data_saved, on_error=assign_failed)
                     else:
                         messagebox.showwarning("Inventory Check Failed", "Please select an inventory item before assigning a vehicle.")
                 else:
@@ -1,12 +1,13 @@
 # Final Project Classes
 
 import sqlite3
+from contextlib import contextmanager
 
 class Vehicle:
     def __init__(self, vehicle_id, make, model, year, status='Available'):
-        self.vehcile_id = vehicle_id
+        self.vehicle_id = vehicle_id
         self.make = make
-        self.mdoel = model
+        self.model = model
         self.year = year
         self.status = status
         self.maintenance_schedule = []
@@ -45,6 +46,7 @@ class CallSchedule:
 class FleetManagementSystem:
     def __init__(self, db_name="fleet_management.db"):
         self.conn = sqlite3.connect(db_name)
+        self._transaction_depth = 0
         self.create_tables()
 
     def create_tables(self):
@@ -85,44 +87,76 @@ class FleetManagementSystem:
         cursor.execute('''
             INSERT INTO vehicles (vehicle_id, make, model, year, status) VALUES (?, ?, ?, ?, ?)
         ''', (vehicle.vehicle_id, vehicle.make, vehicle.model, vehicle.year, vehicle.status))
-        self.conn.commit()
+        self._commit()
 
     def remove_vehicle(self, vehicle_id):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM vehicles WHERE vehicle_id = ?', (vehicle_id,))
-        self.conn.commit()
+        self._commit()
 
     def add_call_schedule(self, call_schedule):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO call_schedules (call_id, customer_name, date, time, vehicle_id) VALUES (?, ?, ?, ?, ?)
         ''', (call_schedule.call_id, call_schedule.customer_name, call_schedule.date, call_schedule.time, call_schedule.vehicle_id))
-        self.conn.commit()
+        self._commit()
 
     def remove_call_schedule(self, call_id):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM call_schedules WHERE call_id = ?', (call_id,))
-        self.conn.commit()
+        self._commit()
 
     def assign_vehicle_to_call(self, call_id, vehicle_id):
         cursor = self.conn.cursor()
         cursor.execute('UPDATE call_schedules SET vehicle_id = ? WHERE call_id = ?', (vehicle_id, call_id))
         cursor.execute('UPDATE vehicles SET status = "Assigned to Call" WHERE vehicle_id = ?', (vehicle_id,))
-        self.conn.commit()
+        self._commit()
 
     def add_maintenance_record(self, vehicle_id, maintenance):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO maintenance (vehicle_id, date, description, completed) VALUES (?, ?, ?, ?)
         ''', (vehicle_id, maintenance.date, maintenance.description, int(maintenance.completed)))
-        self.conn.commit()
+        self._commit()
 
     def remove_maintenance_record(self, vehicle_id, maintenance):
         cursor = self.conn.cursor()
         cursor.execute('''
             DELETE FROM maintenance WHERE vehicle_id = ? AND date = ? AND description = ?
         ''', (vehicle_id, maintenance.date, maintenance.description))
-        self.conn.commit()
+        self._commit()
+
+    @contextmanager
+    def transaction(self):
+        # Group several operations into one commit; nested blocks use savepoints
+        cursor = self.conn.cursor()
+        if self._transaction_depth == 0:
+            if not self.conn.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE')
+        else:
+            cursor.execute(f'SAVEPOINT fleet_sp_{self._transaction_depth}')
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+            else:
+                cursor.execute(f'ROLLBACK TO fleet_sp_{self._transaction_depth}')
+                cursor.execute(f'RELEASE fleet_sp_{self._transaction_depth}')
+            raise
+        else:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.commit()
+            else:
+                cursor.execute(f'RELEASE fleet_sp_{self._transaction_depth}')
+
+    def _commit(self):
+        # Leave the commit to an open transaction() block
+        if self._transaction_depth == 0:
+            self.conn.commit()
 
     def get_vehicle(self, vehicle_id):
         cursor = self.conn.cursor()
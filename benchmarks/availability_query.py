@@ -0,0 +1,75 @@
+# Availability bitmap benchmark
+# python benchmarks/availability_query.py --vehicles 5000 --days 90
+#
+# Fills an AvailabilityTimeline with synthetic bookings (a few calls per vehicle per day
+# and the odd maintenance day), then times the full build, fleet-wide "who is free in this
+# window" queries, and rewriting single vehicle-days as bookings change.
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fleet_availability import AvailabilityTimeline  # noqa: E402
+
+
+def synthetic_bookings(vehicle_ids, first_day, days, calls_per_day, seed=1):
+    rng = random.Random(seed)
+    first = date.fromisoformat(first_day)
+    calls = []
+    maintenance = []
+    for vehicle_id in vehicle_ids:
+        for offset in range(days):
+            day = (first + timedelta(days=offset)).isoformat()
+            if rng.random() < 0.02:
+                maintenance.append((len(maintenance), vehicle_id, day))
+                continue
+            for _ in range(rng.randint(0, calls_per_day)):
+                start = rng.randint(28, 72) * 15
+                calls.append((f"C{len(calls)}", vehicle_id, day, start, start + rng.choice((60, 90, 120))))
+    return calls, maintenance
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time fleet-wide free-window queries on the availability bitmap.")
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--calls-per-day", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    first_day = "2024-06-01"
+    vehicle_ids = [f"V{i:05d}" for i in range(args.vehicles)]
+    calls, maintenance = synthetic_bookings(vehicle_ids, first_day, args.days, args.calls_per_day)
+    timeline = AvailabilityTimeline(vehicle_ids, first_day, args.days)
+    start = time.perf_counter()
+    timeline.load(calls, maintenance)
+    print(f"build   {len(calls)} calls, {len(maintenance)} maintenance days   {time.perf_counter() - start:8.3f} s   "
+          f"bitmap {timeline.busy.nbytes / 1e6:.1f} MB")
+
+    rng = random.Random(2)
+    dates = timeline.dates()
+    windows = []
+    for _ in range(args.queries):
+        begin = rng.randint(28, 68) * 15
+        windows.append((rng.choice(dates), begin, begin + 120))
+    start = time.perf_counter()
+    free = 0
+    for day, begin, end in windows:
+        free += len(timeline.free_vehicles(day, begin, end))
+    elapsed = time.perf_counter() - start
+    print(f"query   {args.queries} free-vehicle lookups   {elapsed / args.queries * 1000:8.3f} ms each   "
+          f"(average {free // args.queries} free)")
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        timeline.set_day(rng.choice(vehicle_ids), rng.choice(dates), [("X", 600, 720)])
+    print(f"update  {args.queries} vehicle-day rewrites    "
+          f"{(time.perf_counter() - start) / args.queries * 1000:8.3f} ms each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Batch dispatch benchmark
+# python benchmarks/dispatch_scale.py --calls 2000 --vehicles 2000
+#
+# Times fleet_dispatch on a storm-day sized problem: building the cost matrix, solving it
+# (SciPy when installed, and the NumPy fallback either way) and a full
+# FleetManagementSystem.dispatch_calls against a temporary database, including writing
+# every assignment back in one transaction. With fewer vehicles than calls, dispatch_calls
+# matches in rounds so vehicles take several calls each.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CallSchedule, FleetManagementSystem, Vehicle  # noqa: E402
+import fleet_dispatch  # noqa: E402
+from fleet_schedule import CALL_MINUTES, format_minutes  # noqa: E402
+
+JOB_TYPES = ["Heating", "AC", "Plumbing", "Drain/Sewer", "Electrical"]
+DATE = "2024-06-01"
+
+
+def synthetic_day(calls, vehicles, seed=1):
+    rng = random.Random(seed)
+    call_rows = []
+    for i in range(calls):
+        start = rng.randint(14, 36) * 30
+        call_rows.append((f"C{i:05d}", rng.choice(JOB_TYPES), start, start + CALL_MINUTES))
+    vehicle_ids = [f"V{j:05d}" for j in range(vehicles)]
+    history = {(vehicle_id, job_type): rng.randint(0, 3) for vehicle_id in vehicle_ids for job_type in JOB_TYPES}
+    bookings = {}
+    for vehicle_id in vehicle_ids[:vehicles // 4]:
+        start = rng.randint(7, 18) * 60
+        bookings[vehicle_id] = [(start, start + CALL_MINUTES)]
+    return call_rows, vehicle_ids, history, bookings
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def numpy_solver(cost):
+    # The NumPy fallback as solve_assignment runs it: on the transpose when there are more
+    # calls than vehicles, with the indices swapped back
+    if cost.shape[0] <= cost.shape[1]:
+        return fleet_dispatch._hungarian(cost)
+    cols, rows = fleet_dispatch._hungarian(cost.T)
+    return rows, cols
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time batch dispatch on a large day.")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--vehicles", type=int, default=2000)
+    parser.add_argument("--skip-db", action="store_true", help="only time the solver")
+    args = parser.parse_args(argv)
+
+    calls, vehicles, history, bookings = synthetic_day(args.calls, args.vehicles)
+    seconds, cost = timed(fleet_dispatch.build_cost_matrix, calls, vehicles, bookings, history)
+    print(f"cost matrix {cost.shape[0]}x{cost.shape[1]}   {seconds:8.3f} s")
+    if fleet_dispatch.linear_sum_assignment is not None:
+        seconds, (rows, cols) = timed(fleet_dispatch.linear_sum_assignment, cost)
+        print(f"scipy solver           {seconds:8.3f} s   cost {cost[rows, cols].sum():.1f}")
+    else:
+        print("scipy solver           not installed")
+    seconds, (rows, cols) = timed(numpy_solver, cost)
+    print(f"numpy solver           {seconds:8.3f} s   cost {cost[rows, cols].sum():.1f}")
+    if args.skip_db:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        fleet_system.add_vehicles_bulk(Vehicle(vehicle_id, "Ford", "Transit", 2020) for vehicle_id in vehicles)
+        fleet_system.add_call_schedules_bulk(CallSchedule(call_id, "Customer", DATE, format_minutes(start), job_type)
+                                             for call_id, job_type, start, end in calls)
+        for job_type in JOB_TYPES:
+            fleet_system.inventory.restock_item(fleet_dispatch.kit_for_job(job_type), args.calls)
+        seconds, plan = timed(fleet_system.dispatch_calls, DATE)
+        print(f"dispatch_calls         {seconds:8.3f} s   {plan}")
+        fleet_system.conn.close()
+
+
+if __name__ == "__main__":
+    main()
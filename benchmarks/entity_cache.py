@@ -0,0 +1,58 @@
+# Entity cache benchmark
+# python benchmarks/entity_cache.py --vehicles 5000 --lookups 100000
+#
+# Looks up vehicles and calls by key against a temporary database, skewed toward a few
+# hot rows the way the GUI asks for them, plus the whole available-vehicle list the assign
+# popup shows: straight from SQLite, then through FleetManagementSystem's read-through
+# cache. Prints the cache statistics at the end.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CallSchedule, FleetManagementSystem, Vehicle  # noqa: E402
+
+
+def timed_lookups(lookup, keys):
+    start = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time cached and uncached row lookups.")
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    vehicle_ids = [f"V{i:05d}" for i in range(args.vehicles)]
+    call_ids = [f"C{i:06d}" for i in range(args.calls)]
+    vehicle_keys = [vehicle_ids[min(int(rng.paretovariate(1.2)) - 1, args.vehicles - 1)] for _ in range(args.lookups)]
+    call_keys = [call_ids[min(int(rng.paretovariate(1.2)) - 1, args.calls - 1)] for _ in range(args.lookups)]
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        fleet_system.add_vehicles_bulk(Vehicle(vehicle_id, "Ford", "Transit", 2020) for vehicle_id in vehicle_ids)
+        fleet_system.add_call_schedules_bulk(CallSchedule(call_id, "Customer", "2024-06-01", "9:00", "AC")
+                                             for call_id in call_ids)
+        for name, load, get, keys in (
+                ("get_vehicle", fleet_system._load_vehicle, fleet_system.get_vehicle, vehicle_keys),
+                ("get_call_schedule", fleet_system._load_call_schedule, fleet_system.get_call_schedule, call_keys),
+                ("available vehicles", fleet_system._load_available_vehicles,
+                 lambda key: fleet_system.get_available_vehicles(), [None] * 200)):
+            print(f"{name:18} sqlite {timed_lookups(load, keys):7.2f} us   cached {timed_lookups(get, keys):7.2f} us")
+        for kind, stats in fleet_system.cache_stats().items():
+            print(f"  {kind:18} {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%}), "
+                  f"{stats['evictions']} evictions, size {stats['size']}")
+        fleet_system.conn.close()
+
+
+if __name__ == "__main__":
+    main()
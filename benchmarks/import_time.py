@@ -0,0 +1,79 @@
+# Core import-time benchmark
+# python benchmarks/import_time.py --repeat 20 --budget-ms 25
+#
+# Imports fleet_core in fresh interpreters and times it two ways: the package alone, and
+# with FleetManagementSystem pulled in (models, storage, services, fleet_db, sqlite3...).
+# A first untimed import writes __pycache__ so the timings are for compiled bytecode, as
+# an installed copy would have. Also lists the slowest modules from python -X importtime.
+# Exits non-zero if a median is over budget or tkinter, tkcalendar or NumPy was imported.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_MODULES = ("tkinter", "tkcalendar", "numpy")
+CASES = [
+    ("import fleet_core", "import fleet_core"),
+    ("FleetManagementSystem", "from fleet_core import FleetManagementSystem"),
+]
+TIMER = '''
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "gui": [name for name in {gui!r} if name in sys.modules]}}))
+'''
+
+
+def run_python(*args):
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def time_import(statement):
+    result = run_python("-c", TIMER.format(statement=statement, gui=GUI_MODULES))
+    return json.loads(result.stdout)
+
+
+def slowest_modules(statement, count):
+    # (cumulative microseconds, module) from -X importtime, which writes to stderr
+    timings = []
+    for line in run_python("-X", "importtime", "-c", statement).stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time importing the GUI-free core in a fresh interpreter.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=25.0)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    failed = False
+    run_python("-c", CASES[-1][1])
+    for name, statement in CASES:
+        runs = [time_import(statement) for _ in range(args.repeat)]
+        times = sorted(run["ms"] for run in runs)
+        gui = sorted({module for run in runs for module in run["gui"]})
+        median = statistics.median(times)
+        print(f"{name:24} median {median:6.2f} ms   min {times[0]:6.2f} ms   max {times[-1]:6.2f} ms   "
+              f"GUI/NumPy modules: {', '.join(gui) or 'none'}")
+        failed |= median > args.budget_ms or bool(gui)
+
+    print(f"Slowest imports for {CASES[-1][1]!r} (cumulative):")
+    for cumulative, module in slowest_modules(CASES[-1][1], args.top):
+        print(f"    {cumulative / 1000:7.2f} ms  {module}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
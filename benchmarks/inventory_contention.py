@@ -0,0 +1,113 @@
+# Inventory contention check for the shared fleet database
+# python benchmarks/inventory_contention.py --processes 16 --calls 400 --stock 150
+#
+# Many processes assign vehicles to calls at the same time, all drawing on one kit. Each
+# assignment takes the kit in the same transaction, so the kit must run out exactly once:
+# stock never goes below zero, every successful assignment has one ledger row, and every
+# refused one left its call unassigned. Afterwards a kit is restocked and assigned to a call
+# that doesn't exist, which must be refused without touching the stock, the ledger or the
+# vehicle. Exits non-zero if any of that doesn't hold.
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CallSchedule, FleetManagementSystem, Vehicle  # noqa: E402
+ITEM = "Heating Service Kit"
+
+
+def setup(db_name, calls, stock):
+    fleet_system = FleetManagementSystem(db_name)
+    fleet_system.add_vehicles_bulk(Vehicle(f"V{i:05d}", "Ford", "Transit", 2020) for i in range(calls))
+    fleet_system.add_call_schedules_bulk(CallSchedule(f"C{i:05d}", f"Customer {i}", "2024-06-01", "9:00", "Heating")
+                                         for i in range(calls))
+    cursor = fleet_system.conn.cursor()
+    cursor.execute('UPDATE inventory SET quantity = ? WHERE item = ?', (stock, ITEM))
+    fleet_system.conn.commit()
+    fleet_system.conn.close()
+
+
+def assign(db_name, indexes, start):
+    fleet_system = FleetManagementSystem(db_name)
+    # Start together so the processes really contend for the write lock
+    while time.time() < start:
+        time.sleep(0.001)
+    assigned = refused = 0
+    for i in indexes:
+        try:
+            fleet_system.assign_vehicle_to_call(f"C{i:05d}", f"V{i:05d}", ITEM)
+            assigned += 1
+        except ValueError:
+            refused += 1
+    fleet_system.conn.close()
+    return assigned, refused
+
+
+def assign_missing_call(fleet_system):
+    # True if assigning a vehicle to a call that doesn't exist is refused and changes nothing
+    fleet_system.inventory.restock_item(ITEM, 1)
+    before = (fleet_system.inventory.items[ITEM], fleet_system.get_vehicle("V00000"))
+    try:
+        fleet_system.assign_vehicle_to_call("NO-SUCH-CALL", "V00000", ITEM)
+        refused = False
+    except ValueError:
+        refused = True
+    cursor = fleet_system.conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM inventory_ledger WHERE call_id = ?', ("NO-SUCH-CALL",))
+    ledger_rows = cursor.fetchone()[0]
+    after = (fleet_system.inventory.items[ITEM], fleet_system.get_vehicle("V00000"))
+    return refused and ledger_rows == 0 and after == before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assign calls from many processes against limited stock.")
+    parser.add_argument("--processes", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--stock", type=int, default=150)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "fleet.db")
+        setup(db_name, args.calls, args.stock)
+        start = time.time() + 1.0
+        chunks = [range(p, args.calls, args.processes) for p in range(args.processes)]
+        began = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(assign, [(db_name, chunk, start) for chunk in chunks])
+        elapsed = time.perf_counter() - began - 1.0
+        assigned = sum(result[0] for result in results)
+        refused = sum(result[1] for result in results)
+
+        fleet_system = FleetManagementSystem(db_name)
+        cursor = fleet_system.conn.cursor()
+        quantity = fleet_system.inventory.items[ITEM]
+        cursor.execute('SELECT COALESCE(SUM(change), 0), COUNT(*) FROM inventory_ledger WHERE item = ?', (ITEM,))
+        ledger_sum, ledger_rows = cursor.fetchone()
+        cursor.execute('SELECT COUNT(*) FROM call_schedules WHERE vehicle_id IS NOT NULL')
+        assigned_calls = cursor.fetchone()[0]
+        missing_call_refused = assign_missing_call(fleet_system)
+        fleet_system.conn.close()
+
+    print(f"{args.processes} processes, {args.calls} calls, {args.stock} kits in {elapsed:.2f} s")
+    print(f"assigned {assigned}, refused {refused}, stock left {quantity}, "
+          f"ledger rows {ledger_rows} (sum {ledger_sum}), calls with a vehicle {assigned_calls}")
+    checks = [
+        ("stock never negative", quantity >= 0),
+        ("every kit handed out once", assigned == min(args.calls, args.stock)),
+        ("stock matches assignments", quantity == args.stock - assigned),
+        ("one ledger row per assignment", ledger_rows == assigned and ledger_sum == -assigned),
+        ("refused calls left unassigned", assigned_calls == assigned),
+        ("missing call refused, nothing changed", missing_call_refused),
+    ]
+    for label, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+    return 0 if all(ok for label, ok in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
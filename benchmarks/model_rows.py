@@ -0,0 +1,103 @@
+# Model object memory and row mapping benchmark
+# python benchmarks/model_rows.py --objects 1000000 --calls 200000
+#
+# Memory: a million calls held as raw tuples, as dict-backed objects (how the models were
+# written before they had __slots__) and as the slotted CallSchedule.
+# Speed: fetching every call as tuples, through the CallSchedule row_factory, and as tuples
+# turned into objects afterwards with from_rows; then reading one field from each row.
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CALL_MODEL_COLUMNS, CallSchedule, FleetManagementSystem, from_rows, row_factory  # noqa: E402
+from synthetic_fleet import populate  # noqa: E402
+
+
+# CallSchedule as it was before __slots__: every object carries its own __dict__
+class DictCallSchedule:
+    def __init__(self, call_id, customer_name, date, time, job_type, vehicle_id=None, duration=120):
+        self.call_id = call_id
+        self.customer_name = customer_name
+        self.date = date
+        self.time = time
+        self.job_type = job_type
+        self.vehicle_id = vehicle_id
+        self.duration = duration
+
+
+def measure_memory(build, rows):
+    # Bytes allocated for the containers alone; the field values are shared with rows
+    gc.collect()
+    tracemalloc.start()
+    objects = [build(row) for row in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def best_ms(func, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare model objects with raw tuples.")
+    parser.add_argument("--objects", type=int, default=1000000)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rows = [(f"C{i:07d}", "Customer Name", "2024-06-01", "09:00", "Heating", "V00001") for i in range(args.objects)]
+    print(f"Memory for {args.objects:,} calls, not counting the field values they share")
+    # A fresh tuple per row, as fetchall() makes; tuple(row) would hand back row itself
+    tuple_bytes = measure_memory(lambda row: tuple([*row]), rows)
+    for name, build in (("tuple", lambda row: tuple([*row])),
+                        ("dict-backed object", lambda row: DictCallSchedule(*row)),
+                        ("CallSchedule (slots)", lambda row: CallSchedule(*row))):
+        size = measure_memory(build, rows)
+        print(f"  {name:22} {size / 2**20:8.1f} MiB  {size / args.objects:6.1f} B each  "
+              f"{size / tuple_bytes:4.2f}x tuples")
+    del rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        populate(fleet_system, max(10, args.calls // 100), args.calls, 0)
+        sql = f"SELECT {CALL_MODEL_COLUMNS} FROM call_schedules ORDER BY call_id"
+
+        def fetch(factory=None):
+            cursor = fleet_system.conn.cursor()
+            cursor.row_factory = factory
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+        tuples, objects = fetch(), fetch(row_factory(CallSchedule, CALL_MODEL_COLUMNS))
+        print(f"\nFetching {args.calls:,} calls (best of {args.repeat})")
+        for name, func in (("tuples", fetch),
+                           ("row_factory", lambda: fetch(row_factory(CallSchedule, CALL_MODEL_COLUMNS))),
+                           ("tuples + from_rows", lambda: from_rows(CallSchedule, fetch(), CALL_MODEL_COLUMNS)),
+                           ("page of 200, tuples", lambda: fleet_system.get_calls_page()),
+                           ("page of 200, as_models", lambda: fleet_system.get_calls_page(as_models=True))):
+            print(f"  {name:24} {best_ms(func, args.repeat):9.2f} ms")
+        print(f"\nReading vehicle_id from every call (best of {args.repeat})")
+        print(f"  {'row[5]':24} {best_ms(lambda: [row[5] for row in tuples], args.repeat):9.2f} ms")
+        print(f"  {'call.vehicle_id':24} "
+              f"{best_ms(lambda: [call.vehicle_id for call in objects], args.repeat):9.2f} ms")
+        fleet_system.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Query plan check for the hot reads
+# python benchmarks/query_plans.py --calls 20000
+#
+# Builds a fully migrated fleet database and runs each hot FleetManagementSystem read with
+# query stats on and a 0 ms slow threshold, so every statement is kept with its
+# EXPLAIN QUERY PLAN. Checks that each read searches the index it was written for, rather
+# than scanning the table or sorting in a temp b-tree. Exits non-zero if any plan doesn't.
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import FleetManagementSystem  # noqa: E402
+from fleet_db import schema_version  # noqa: E402
+from synthetic_fleet import populate  # noqa: E402
+
+DAY = "2024-06-12"
+
+
+def hot_reads(fleet_system):
+    # (label, read, table, index the plan must search); the index is a name, or
+    # 'PRIMARY KEY' for an INTEGER PRIMARY KEY seek
+    cursor = fleet_system.conn.cursor()
+    cursor.execute('SELECT vehicle_id FROM call_schedules WHERE vehicle_id IS NOT NULL LIMIT 1')
+    vehicle_id = cursor.fetchone()[0]
+    # Keys from short first pages, so even a small fleet has a page after them
+    _, call_key = fleet_system.get_calls_page(limit=5)
+    _, vehicle_key = fleet_system.get_vehicles_page(limit=5)
+    _, status_key = fleet_system.get_vehicles_page(limit=5, order='status')
+    _, maintenance_key = fleet_system.get_maintenance_page(limit=5)
+    return [
+        ("calls by date and time", lambda: fleet_system.calls_between(f"{DAY}T08:00", f"{DAY}T12:00"),
+         'call_schedules', 'idx_calls_date_time'),
+        ("calls by vehicle", lambda: fleet_system.get_calls_page(filters={'vehicle_id': vehicle_id}),
+         'call_schedules', 'idx_calls_vehicle'),
+        ("vehicle bookings on a day", lambda: fleet_system._load_bookings(vehicle_id, DAY),
+         'call_schedules', 'idx_calls_vehicle_slot'),
+        ("open maintenance by vehicle",
+         lambda: fleet_system.get_maintenance_page(filters={'vehicle_id': vehicle_id, 'completed': 0},
+                                                   order='vehicle'),
+         'maintenance', 'idx_maintenance_vehicle'),
+        ("vehicles by status", lambda: fleet_system._load_available_vehicles(None),
+         'vehicles', 'idx_vehicles_status'),
+        ("vehicles page by status", lambda: fleet_system.get_vehicles_page(filters={'status': 'Available'}),
+         'vehicles', 'idx_vehicles_status'),
+        ("calls keyset page", lambda: fleet_system.get_calls_page(call_key),
+         'call_schedules', 'idx_calls_date_time'),
+        ("calls keyset page, descending", lambda: fleet_system.get_calls_page(call_key, descending=True),
+         'call_schedules', 'idx_calls_date_time'),
+        ("vehicles keyset page", lambda: fleet_system.get_vehicles_page(vehicle_key),
+         'vehicles', 'sqlite_autoindex_vehicles_1'),
+        ("vehicles keyset page by status", lambda: fleet_system.get_vehicles_page(status_key, order='status'),
+         'vehicles', 'idx_vehicles_status'),
+        ("maintenance keyset page", lambda: fleet_system.get_maintenance_page(maintenance_key),
+         'maintenance', 'PRIMARY KEY'),
+    ]
+
+
+def problems(plan, table, index):
+    # What is wrong with plan for a read of table meant to search index; [] when nothing
+    found = []
+    searches = [line.strip() for line in plan if line.strip().startswith(f'SEARCH {table} ')]
+    if index == 'PRIMARY KEY':
+        wanted = 'USING INTEGER PRIMARY KEY'
+    else:
+        wanted = f'INDEX {index} '
+    if not any(wanted in line for line in searches):
+        found.append(f"does not search {index}")
+    if any(line.strip().startswith(f'SCAN {table}') for line in plan):
+        found.append(f"scans {table}")
+    if any('TEMP B-TREE' in line for line in plan):
+        found.append("sorts in a temp b-tree")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the hot reads search the indexes meant for them.")
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    # Every statement counts as slow here; keep them out of the log
+    logging.getLogger("fleet.sql").disabled = True
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        populate(fleet_system, max(10, args.calls // 100), args.calls, args.calls // 4)
+        print(f"schema version {schema_version(fleet_system.conn)}, {args.calls:,} calls")
+        fleet_system.enable_query_stats(0)
+        for label, read, table, index in hot_reads(fleet_system):
+            fleet_system.reset_query_stats()
+            read()
+            statements = fleet_system.slow_queries()
+            if not statements:
+                print(f"  FAIL {label}: ran no SQL")
+                failures += 1
+                continue
+            sql, params, ms, plan = statements[-1]
+            found = problems(plan, table, index)
+            failures += bool(found)
+            print(f"  {'FAIL' if found else 'ok  '} {label}: {'; '.join(found) or index}")
+            for line in plan:
+                print(f"         {line}")
+        fleet_system.conn.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
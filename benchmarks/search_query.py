@@ -0,0 +1,65 @@
+# Full-text search benchmark
+# python benchmarks/search_query.py --calls 1000000 --maintenance 250000
+#
+# Fills a temporary database with synthetic calls and maintenance records, then times
+# FleetManagementSystem.search for rare names, common words and as-you-type prefixes, and
+# confirms the FTS5 indexes still match their tables.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CallSchedule, FleetManagementSystem, Maintenance  # noqa: E402
+
+SURNAMES = ["Smith", "Johnson", "Garcia", "Miller", "Davis", "Lopez", "Wilson", "Anderson", "Thomas", "Moore",
+            "Jackson", "Martin", "Lee", "Thompson", "White", "Harris", "Clark", "Lewis", "Walker", "Hall"]
+JOB_TYPES = ["Heating", "AC", "Plumbing", "Drain/Sewer", "Electrical"]
+WORDS = ["replace", "furnace", "filter", "inspect", "brakes", "oil", "change", "tires", "rotate", "coolant",
+         "flush", "battery", "wiper", "blades", "transmission", "belt", "ladder", "rack", "hose", "pump"]
+QUERIES = ["Hendricks", "Hendricks furnace", "Smith", "oil change", "furn", "hen", "Garcia Heating", "zzz"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time full-text search on a large database.")
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--maintenance", type=int, default=250000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        start = time.perf_counter()
+        # A handful of rare customers among many common surnames
+        fleet_system.add_call_schedules_bulk(
+            CallSchedule(f"C{i:07d}", f"{rng.choice('ABCDEFGHJKLMNPRSTW')}. "
+                         f"{'Hendricks' if i % 100000 == 7 else rng.choice(SURNAMES)}",
+                         f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", "9:00", rng.choice(JOB_TYPES))
+            for i in range(args.calls))
+        fleet_system.add_maintenance_records_bulk(
+            (f"V{i % 500:03d}", Maintenance("2024-03-01", " ".join(rng.sample(WORDS, 4))))
+            for i in range(args.maintenance))
+        print(f"load    {args.calls} calls, {args.maintenance} maintenance records   "
+              f"{time.perf_counter() - start:8.1f} s (including index triggers)")
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results = fleet_system.search(query)
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            top = results[0][3] if results else "-"
+            print(f"search  {query!r:22} {elapsed:8.2f} ms   {len(results):3} results   top: {top}")
+
+        for index in ("call_search", "maintenance_search"):
+            fleet_system.conn.execute(f"INSERT INTO {index} ({index}) VALUES ('integrity-check')")
+        print("indexes match their tables")
+        fleet_system.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Columnar snapshot benchmark
+# python benchmarks/snapshot.py --calls 1000000
+#
+# Builds a FleetSnapshot of a synthetic fleet, saves it, memory-maps it back and refreshes
+# it after a few writes, then answers "minutes booked per vehicle make and job type for a
+# month" three ways: a Python loop over fetchall() tuples, SQL GROUP BY with a join, and the
+# snapshot.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CallSchedule, FleetManagementSystem  # noqa: E402
+from fleet_snapshot import FleetSnapshot  # noqa: E402
+from synthetic_fleet import populate  # noqa: E402
+
+FIRST, LAST = "2024-06-01", "2024-06-30"
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    result = func()
+    print(f"  {label:36} {(time.perf_counter() - started) * 1000:10.1f} ms")
+    return result
+
+
+def python_loop(fleet_system):
+    makes = dict(fleet_system.conn.execute('SELECT vehicle_id, make FROM vehicles').fetchall())
+    totals = {}
+    for day, start, end, job_type, vehicle_id in fleet_system.conn.execute(
+            'SELECT date, start_minute, end_minute, job_type, vehicle_id FROM call_schedules').fetchall():
+        if FIRST <= day <= LAST and vehicle_id in makes:
+            key = (makes[vehicle_id], job_type)
+            totals[key] = totals.get(key, 0) + end - start
+    return totals
+
+
+def sql_group_by(fleet_system):
+    return {(make, job_type): minutes for make, job_type, minutes in fleet_system.conn.execute('''
+        SELECT v.make, c.job_type, SUM(c.end_minute - c.start_minute) FROM call_schedules AS c
+        JOIN vehicles AS v USING (vehicle_id) WHERE c.date BETWEEN ? AND ? GROUP BY v.make, c.job_type
+    ''', (FIRST, LAST)).fetchall()}
+
+
+def snapshot_query(snapshot):
+    calls = snapshot.join(snapshot.calls, 'make')
+    month = calls.between('date', FIRST, LAST) & (calls['vehicle_make'] >= 0)
+    return calls.sum_by(('vehicle_make', 'job_type'), calls['end_minute'] - calls['start_minute'], month)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the columnar fleet snapshot.")
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--writes", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        populate(fleet_system, max(10, args.calls // 100), args.calls, args.calls // 4)
+        cache = os.path.join(tmp, "snapshot")
+        print(f"{args.calls:,} calls")
+        snapshot = timed("build from the database", lambda: fleet_system.snapshot())
+        timed("save", lambda: snapshot.save(cache))
+        size = sum(os.path.getsize(os.path.join(cache, name)) for name in os.listdir(cache))
+        print(f"  {'cache size':36} {size / 2**20:10.1f} MiB")
+        loaded = timed("load (memory-mapped)", lambda: FleetSnapshot.load(cache))
+        timed("first query after load", lambda: snapshot_query(loaded))
+
+        for i in range(args.writes):
+            fleet_system.add_call_schedule(CallSchedule(f"SN{i:05d}", "Snapshot Bench", "2024-06-12", "06:00", "AC"))
+        timed(f"refresh after {args.writes} writes", lambda: loaded.refresh(fleet_system))
+
+        print(f"Minutes booked per make and job type, {FIRST} to {LAST}")
+        expected = timed("Python loop over fetchall()", lambda: python_loop(fleet_system))
+        assert timed("SQL GROUP BY", lambda: sql_group_by(fleet_system)) == expected
+        assert timed("snapshot", lambda: snapshot_query(loaded)) == expected
+        fleet_system.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# SQL timing overhead benchmark
+# python benchmarks/sql_tracing.py --calls 100000 --repeat 2000
+#
+# Times a few typical FleetManagementSystem reads with query stats off and on, then
+# prints the statements that took the most time and any slow ones with their plans.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import FleetManagementSystem  # noqa: E402
+from synthetic_fleet import populate  # noqa: E402
+
+
+def per_call_us(func, repeat):
+    started = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure what per-statement SQL timing costs.")
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--slow-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_system = FleetManagementSystem(os.path.join(tmp, "fleet.db"))
+        populate(fleet_system, max(10, args.calls // 100), args.calls, args.calls // 4)
+        reads = [
+            ("get_call_schedule (uncached)", lambda i: fleet_system._load_call_schedule(f"C{1 + i % args.calls:07d}")),
+            ("get_calls_page", lambda i: fleet_system.get_calls_page()),
+            ("count_calls", lambda i: fleet_system.count_calls()),
+            ("change_marker", lambda i: fleet_system.change_marker()),
+        ]
+        for name, func in reads:
+            off = per_call_us(func, args.repeat)
+            fleet_system.enable_query_stats(args.slow_ms)
+            on = per_call_us(func, args.repeat)
+            fleet_system.disable_query_stats()
+            print(f"{name:30} off {off:9.1f} us   on {on:9.1f} us   +{on - off:6.1f} us")
+
+        fleet_system.enable_query_stats(args.slow_ms)
+        fleet_system.calls_between("2024-06-01", "2024-07-01")
+        fleet_system.search("garcia")
+        fleet_system.dashboard_kpis("2024-06-12")
+        print("\nMost time")
+        for stats in fleet_system.query_stats()[:5]:
+            print(f"  {stats['total_ms']:8.2f} ms  {stats['count']:5}x  p95 {stats['p95_ms']:7.3f} ms  "
+                  f"{stats['rows']:7} rows  {stats['sql'][:70]}")
+        print(f"\nSlow (>= {args.slow_ms} ms)")
+        for sql, params, ms, plan in fleet_system.slow_queries():
+            print(f"  {ms:8.2f} ms  {sql[:90]}")
+            for line in plan:
+                print(f"      {line}")
+        fleet_system.conn.close()
+
+
+if __name__ == "__main__":
+    main()
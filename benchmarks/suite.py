@@ -0,0 +1,192 @@
+# Benchmark suite for FleetManagementSystem
+# python benchmarks/suite.py --scales 1k 100k 1m --output results.json
+# python benchmarks/suite.py --scales 1k 100k --save-baseline
+#
+# For each scale, fills a database with synthetic_fleet (calls = scale, vehicles =
+# scale / 100, maintenance = scale / 4), then times every public method: the add_*,
+# remove_* and update methods, assign_vehicle_to_call, the get_* lookups and the queries
+# the GUI runs on every refresh (counts, first and deep pages, KPIs, search, the change
+# feed). Writes go to rows the suite adds itself and removes afterwards.
+#
+# Results are JSON: {"environment": ..., "scales": {scale: {"rows", "load", "methods":
+# {method: {"median_ms", "p95_ms", "min_ms", "runs"}}}}}. They are compared with
+# benchmarks/baseline.json, and the exit status is 1 if any method's median got more
+# than --tolerance slower. The baseline only means something on the machine that wrote
+# it; refresh it there with --save-baseline.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import PAGE_SIZE, CallSchedule, FleetManagementSystem, Maintenance, Vehicle  # noqa: E402
+from synthetic_fleet import FIRST_DAY, populate, vehicle_ids  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SCALES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+# A median this much slower than the baseline (1.0 = twice as slow) is a regression,
+# unless it is still within FLOOR_MS of it. Whole runs drift by up to half again on a busy
+# machine; a lost index or a query that stopped seeking is many times slower.
+TOLERANCE = 1.0
+FLOOR_MS = 0.25
+DAY = "2024-06-12"
+
+
+def fleet_size(calls):
+    return max(10, calls // 100), calls, calls // 4
+
+
+def time_calls(func, repeat):
+    # func(i) for i in range(repeat); per-call milliseconds
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {"median_ms": round(statistics.median(timings), 4),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+            "min_ms": round(timings[0], 4),
+            "runs": repeat}
+
+
+def method_benchmarks(fleet_system, vehicles, calls, seed):
+    # [(name, func(i))] in the order they run; each write step uses rows from the ones before
+    rng = random.Random(seed)
+    existing_vehicles = vehicle_ids(vehicles)
+    vehicle_keys = [rng.choice(existing_vehicles) for _ in range(10000)]
+    call_keys = [f"C{rng.randint(1, calls):07d}" for _ in range(10000)]
+    # Where a page halfway down the call list starts
+    _, deep_key = fleet_system.get_calls_page(limit=1, offset=calls // 2)
+    maintenance_ids = []
+    seq = max(0, fleet_system.latest_change_seq() - PAGE_SIZE)
+
+    return [
+        # Writes, on rows the suite owns
+        ("add_vehicle", lambda i: fleet_system.add_vehicle(Vehicle(f"BV{i:05d}", "Ford", "Transit", 2022))),
+        ("update_vehicle_status", lambda i: fleet_system.update_vehicle_status(f"BV{i:05d}", "In for maintenance")),
+        ("add_call_schedule", lambda i: fleet_system.add_call_schedule(
+            CallSchedule(f"BC{i:05d}", "Bench Customer", DAY, "09:00", "Heating"))),
+        ("assign_vehicle_to_call", lambda i: fleet_system.assign_vehicle_to_call(f"BC{i:05d}", f"BA{i:05d}")),
+        ("remove_call_schedule", lambda i: fleet_system.remove_call_schedule(f"BC{i:05d}")),
+        ("add_maintenance_record", lambda i: maintenance_ids.append(
+            fleet_system.add_maintenance_record(f"BV{i:05d}", Maintenance(DAY, "Bench oil change")))),
+        ("complete_maintenance_record", lambda i: fleet_system.complete_maintenance_record(maintenance_ids[i])),
+        ("remove_maintenance_record", lambda i: fleet_system.remove_maintenance_record(maintenance_ids[i])),
+        ("remove_vehicle", lambda i: fleet_system.remove_vehicle(f"BV{i:05d}")),
+        # Lookups, on different keys each time
+        ("get_vehicle", lambda i: fleet_system.get_vehicle(vehicle_keys[i])),
+        ("get_call_schedule", lambda i: fleet_system.get_call_schedule(call_keys[i])),
+        ("get_vehicle_maintenance", lambda i: fleet_system.get_vehicle_maintenance(vehicle_keys[i])),
+        ("get_available_vehicles", lambda i: fleet_system.get_available_vehicles()),
+        ("get_vehicle_ids", lambda i: fleet_system.get_vehicle_ids()),
+        ("get_inventory", lambda i: fleet_system.get_inventory()),
+        ("free_vehicles", lambda i: fleet_system.free_vehicles(DAY, 9 * 60, 11 * 60)),
+        # What a refresh of the GUI reads
+        ("change_marker", lambda i: fleet_system.change_marker()),
+        ("table_versions", lambda i: fleet_system.table_versions()),
+        ("changes_since", lambda i: list(fleet_system.changes_since(seq))),
+        ("count_vehicles", lambda i: fleet_system.count_vehicles()),
+        ("count_calls", lambda i: fleet_system.count_calls()),
+        ("count_maintenance", lambda i: fleet_system.count_maintenance()),
+        ("get_vehicles_page", lambda i: fleet_system.get_vehicles_page()),
+        ("get_calls_page", lambda i: fleet_system.get_calls_page()),
+        ("get_calls_page deep", lambda i: fleet_system.get_calls_page(deep_key)),
+        ("get_calls_page unassigned", lambda i: fleet_system.get_calls_page(filters={'vehicle_id': None})),
+        ("get_maintenance_page", lambda i: fleet_system.get_maintenance_page()),
+        ("calls_between", lambda i: fleet_system.calls_between(DAY, "2024-06-13")),
+        ("dashboard_kpis", lambda i: fleet_system.dashboard_kpis(DAY)),
+        ("search", lambda i: fleet_system.search("garcia heat")),
+    ]
+
+
+def run_scale(name, calls, repeat, seed, data_dir):
+    vehicles, calls, maintenance = fleet_size(calls)
+    fleet_system = FleetManagementSystem(os.path.join(data_dir, f"fleet-{name}.db"))
+    load = populate(fleet_system, vehicles, calls, maintenance, seed, FIRST_DAY)
+    # One spare vehicle per assignment, so assign_vehicle_to_call never hits a booked slot
+    fleet_system.add_vehicles_bulk(Vehicle(f"BA{i:05d}", "Ford", "Transit", 2022) for i in range(repeat))
+
+    methods = {}
+    for method, func in method_benchmarks(fleet_system, vehicles, calls, seed):
+        methods[method] = time_calls(func, repeat)
+        print(f"  {name:5} {method:28} {methods[method]['median_ms']:10.3f} ms", file=sys.stderr)
+    for i in range(repeat):
+        fleet_system.remove_vehicle(f"BA{i:05d}")
+    fleet_system.conn.close()
+    return {"rows": {"vehicles": vehicles, "call_schedules": calls, "maintenance": maintenance},
+            "load": {table: {"rows": rows, "seconds": round(seconds, 3), "rows_per_second": round(rows / seconds)}
+                     for table, (rows, seconds) in load.items()},
+            "methods": methods}
+
+
+def compare(results, baseline, tolerance, floor_ms):
+    # [(scale, method, baseline ms, now ms)] for every median that got slower than allowed
+    regressions = []
+    for scale, result in results["scales"].items():
+        before = baseline.get("scales", {}).get(scale, {}).get("methods", {})
+        for method, timing in result["methods"].items():
+            if method not in before:
+                continue
+            old, new = before[method]["median_ms"], timing["median_ms"]
+            if new > old * (1 + tolerance) and new - old > floor_ms:
+                regressions.append((scale, method, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time FleetManagementSystem's public methods at several sizes.")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", help="keep the generated databases here instead of a temporary directory")
+    parser.add_argument("--output", default="-", help="JSON results file, - for standard output")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = {"environment": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                               "platform": platform.platform(), "processor": platform.processor()},
+               "seed": args.seed, "repeat": args.repeat, "scales": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for scale in args.scales:
+            if os.path.exists(os.path.join(data_dir, f"fleet-{scale}.db")):
+                parser.error(f"{data_dir} already has fleet-{scale}.db; remove it or use another --data-dir")
+            print(f"{scale}: {', '.join(map(str, fleet_size(SCALES[scale])))} vehicles, calls, maintenance",
+                  file=sys.stderr)
+            results["scales"][scale] = run_scale(scale, SCALES[scale], args.repeat, args.seed, data_dir)
+
+    text = json.dumps(results, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Saved the baseline to {args.baseline}", file=sys.stderr)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance, FLOOR_MS)
+    for scale, method, old, new in regressions:
+        print(f"SLOWER  {scale:5} {method:28} {old:10.3f} ms -> {new:10.3f} ms ({new / old:.1f}x)", file=sys.stderr)
+    print(f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Synthetic fleet generator
+# python benchmarks/synthetic_fleet.py --db demo.db --vehicles 500 --calls 100000 --maintenance 25000
+#
+# Fills a fleet database with made-up vehicles, calls and maintenance records written
+# through FleetManagementSystem's bulk methods, so triggers, summaries and search indexes
+# are maintained exactly as in use. The same seed always produces the same rows.
+#
+#     vehicles     mostly vans, newer ones more common; most are Available
+#     calls        fewer at weekends, heating in winter and AC in summer, mornings
+#                  busiest; booked in CALL_MINUTES slots so no vehicle is double-booked,
+#                  most calls before TODAY_FRACTION of the date range have a vehicle
+#     maintenance  older vehicles need more; records before "today" are mostly completed
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fleet_core import CallSchedule, FleetManagementSystem, Maintenance, Vehicle  # noqa: E402
+from fleet_schedule import CALL_MINUTES, DAY_END, DAY_START, format_minutes  # noqa: E402
+
+FIRST_DAY = "2024-01-01"
+DAYS = 365
+# Share of the date range that lies in the past; later calls and maintenance are still open
+TODAY_FRACTION = 0.75
+NEWEST_YEAR = 2024
+
+MODELS = [("Ford", "Transit", 30), ("Chevrolet", "Express", 20), ("Ram", "ProMaster", 15),
+          ("Ford", "F-250", 15), ("Ford", "E-350", 10), ("Nissan", "NV200", 10)]
+STATUSES = [("Available", 85), ("In for maintenance", 8), ("Assigned to Call", 7)]
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+               "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra", "Luis", "Ashley"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+              "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores"]
+# Relative demand per job type in winter (Dec-Feb), spring/autumn and summer (Jun-Aug)
+JOB_TYPES = {"Heating": (45, 15, 5), "AC": (5, 15, 45), "Plumbing": (25, 30, 25),
+             "Drain/Sewer": (15, 20, 15), "Electrical": (10, 20, 10)}
+# Calls per weekday, Monday first
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.4, 0.1]
+SERVICES = [("Oil change", 30), ("Tire rotation", 15), ("Brake inspection", 12), ("Replace wiper blades", 8),
+            ("Battery replacement", 6), ("Coolant flush", 6), ("Transmission service", 5),
+            ("Ladder rack repair", 5), ("Annual DOT inspection", 8), ("Replace air filter", 5)]
+ASSIGNED_SHARE = 0.85
+
+
+def _seeded(seed, stream):
+    # Each kind of row has its own generator, so changing one count leaves the others' rows alone
+    return random.Random(f"{seed}:{stream}")
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def vehicle_ids(count):
+    return [f"V{i:05d}" for i in range(1, count + 1)]
+
+
+def vehicle_year(vehicle_number, seed):
+    # Model year of the vehicle_number-th vehicle; repeatable without keeping the vehicles
+    rng = _seeded(seed, f"year:{vehicle_number}")
+    return NEWEST_YEAR - min(int(rng.expovariate(1 / 4)), 15)
+
+
+def synthetic_vehicles(count, seed=1):
+    rng = _seeded(seed, "vehicles")
+    models = _cumulative(weight for _, _, weight in MODELS)
+    statuses = _cumulative(weight for _, weight in STATUSES)
+    for number, vehicle_id in enumerate(vehicle_ids(count), 1):
+        make, model, _ = rng.choices(MODELS, cum_weights=models)[0]
+        status = rng.choices(STATUSES, cum_weights=statuses)[0][0]
+        yield Vehicle(vehicle_id, make, model, vehicle_year(number, seed), status)
+
+
+def _season(day):
+    return 0 if day.month in (12, 1, 2) else 2 if day.month in (6, 7, 8) else 1
+
+
+def synthetic_calls(count, vehicles, seed=1, first_day=FIRST_DAY, days=DAYS):
+    # count CallSchedules spread over days from first_day, in date order. vehicles is the
+    # number of vehicles made by synthetic_vehicles; a call only gets a vehicle whose slot
+    # that day is still free.
+    rng = _seeded(seed, "calls")
+    start = date.fromisoformat(first_day)
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    per_day = Counter(rng.choices(range(days), cum_weights=_cumulative(WEEKDAY_WEIGHTS[day.weekday()]
+                                                                        for day in dates), k=count))
+    slots = list(range(DAY_START, DAY_END - CALL_MINUTES + 1, CALL_MINUTES))
+    # Mornings book up first
+    slot_weights = _cumulative(len(slots) - index / 2 for index in range(len(slots)))
+    job_types = list(JOB_TYPES)
+    season_weights = [_cumulative(JOB_TYPES[job_type][season] for job_type in job_types) for season in range(3)]
+    ids = vehicle_ids(vehicles)
+    today = int(days * TODAY_FRACTION)
+    number = 0
+    for offset, day in enumerate(dates):
+        booked = set()
+        iso_day = day.isoformat()
+        job_weights = season_weights[_season(day)]
+        assigned_share = ASSIGNED_SHARE if offset < today else ASSIGNED_SHARE / 2
+        for _ in range(per_day[offset]):
+            number += 1
+            slot = rng.choices(slots, cum_weights=slot_weights)[0]
+            vehicle_id = None
+            if ids and rng.random() < assigned_share:
+                candidate = rng.choice(ids)
+                if (candidate, slot) not in booked:
+                    booked.add((candidate, slot))
+                    vehicle_id = candidate
+            yield CallSchedule(f"C{number:07d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", iso_day,
+                               format_minutes(slot), rng.choices(job_types, cum_weights=job_weights)[0], vehicle_id)
+
+
+def synthetic_maintenance(count, vehicles, seed=1, first_day=FIRST_DAY, days=DAYS):
+    # count (vehicle_id, Maintenance) pairs; a vehicle's share grows with its age
+    rng = _seeded(seed, "maintenance")
+    ids = vehicle_ids(vehicles)
+    if not ids:
+        return
+    by_age = _cumulative(1 + NEWEST_YEAR - vehicle_year(number, seed) for number in range(1, vehicles + 1))
+    services = _cumulative(weight for _, weight in SERVICES)
+    start = date.fromisoformat(first_day)
+    today = int(days * TODAY_FRACTION)
+    for _ in range(count):
+        vehicle_id = ids[bisect.bisect_right(by_age, rng.random() * by_age[-1])]
+        offset = rng.randrange(days)
+        service = rng.choices(SERVICES, cum_weights=services)[0][0]
+        maintenance = Maintenance((start + timedelta(days=offset)).isoformat(),
+                                  f"{service} at {rng.randrange(5, 250) * 1000:,} miles")
+        if offset < today and rng.random() < 0.95:
+            maintenance.complete_maintenance()
+        yield vehicle_id, maintenance
+
+
+def populate(fleet_system, vehicles, calls, maintenance, seed=1, first_day=FIRST_DAY, days=DAYS):
+    # Write the synthetic fleet; returns {table: (rows inserted, seconds taken)}
+    timings = {}
+    for table, add_bulk, rows in (
+            ('vehicles', fleet_system.add_vehicles_bulk, synthetic_vehicles(vehicles, seed)),
+            ('call_schedules', fleet_system.add_call_schedules_bulk,
+             synthetic_calls(calls, vehicles, seed, first_day, days)),
+            ('maintenance', fleet_system.add_maintenance_records_bulk,
+             synthetic_maintenance(maintenance, vehicles, seed, first_day, days))):
+        started = time.perf_counter()
+        result = add_bulk(rows)
+        if result.failures:
+            raise ValueError(f"{len(result.failures)} synthetic {table} rows failed, e.g. {result.failures[0]}")
+        timings[table] = (result.inserted, time.perf_counter() - started)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a fleet database with repeatable synthetic data.")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--vehicles", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--maintenance", type=int, default=25000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--first-day", default=FIRST_DAY)
+    parser.add_argument("--days", type=int, default=DAYS)
+    args = parser.parse_args(argv)
+
+    fleet_system = FleetManagementSystem(args.db)
+    timings = populate(fleet_system, args.vehicles, args.calls, args.maintenance, args.seed,
+                       args.first_day, args.days)
+    fleet_system.conn.close()
+    for table, (rows, seconds) in timings.items():
+        print(f"{table:15} {rows:9} rows  {seconds:7.2f} s  {rows / max(seconds, 1e-9):10.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
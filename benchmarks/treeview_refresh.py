@@ -0,0 +1,80 @@
+# Treeview refresh benchmark: full rebuild vs keyed diff
+# python benchmarks/treeview_refresh.py --rows 50000
+#
+# Fills a ttk.Treeview with synthetic call rows, then times the two ways of showing a
+# refreshed result set: deleting and re-inserting every row (what the refresh_* methods
+# used to do) and KeyedTreeBinder.apply, which only touches changed rows. Needs a display.
+
+import argparse
+import os
+import random
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fleet_views import KeyedTreeBinder, compute_delta  # noqa: E402
+
+JOB_TYPES = ["Heating", "AC", "Plumbing", "Drain/Sewer", "Electrical"]
+
+
+def synthetic_calls(count, seed=1):
+    rng = random.Random(seed)
+    return [(f"C{i:07d}", f"Customer {rng.randint(1, 5000)}", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+             f"{rng.randint(7, 18)}:00", rng.choice(JOB_TYPES), None) for i in range(count)]
+
+
+def change_rows(rows, fraction, seed=2):
+    # Assign a vehicle to a fraction of the calls, drop a few and add a few
+    rng = random.Random(seed)
+    rows = list(rows)
+    changes = max(1, int(len(rows) * fraction))
+    for index in rng.sample(range(len(rows)), changes):
+        rows[index] = rows[index][:5] + (f"V{rng.randint(1, 500):04d}",)
+    del rows[:changes // 10]
+    rows.extend((f"N{i:07d}", "New customer", "2024-12-31", "8:00", "AC", None) for i in range(changes // 10))
+    return rows
+
+
+def full_rebuild(tree, rows):
+    for item in tree.get_children():
+        tree.delete(item)
+    for row in rows:
+        tree.insert('', 'end', values=row)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare full Treeview rebuilds with keyed diff refreshes.")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    root = tk.Tk()
+    root.withdraw()
+    columns = ("ID", "Customer Name", "Date", "Time", "Job Type", "Vehicle ID")
+    rebuild_tree = ttk.Treeview(root, columns=columns, show="headings")
+    diff_tree = ttk.Treeview(root, columns=columns, show="headings")
+    binder = KeyedTreeBinder(diff_tree)
+
+    rows = synthetic_calls(args.rows)
+    print(f"initial load   rebuild {timed(full_rebuild, rebuild_tree, rows):8.3f} s   "
+          f"diff {timed(binder.apply, rows):8.3f} s")
+    for label, fraction in (("no change", 0), ("1 row", 1 / args.rows), ("1% rows", 0.01), ("10% rows", 0.10)):
+        refreshed = change_rows(rows, fraction) if fraction else rows
+        old = dict(binder.rows)
+        new = {binder.iid(row): tuple(row) for row in refreshed}
+        diff_only = timed(compute_delta, old, new, binder.order, list(new))
+        print(f"{label:<14} rebuild {timed(full_rebuild, rebuild_tree, refreshed):8.3f} s   "
+              f"diff {timed(binder.apply, refreshed):8.3f} s   (delta computation {diff_only:6.3f} s)")
+        binder.apply(rows)
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Multi-process stress test for the shared fleet database
+# python benchmarks/wal_concurrency.py --readers 8 --writes 300
+#
+# Several reader processes keep scanning the vehicles table (like dispatchers refreshing
+# their views) while one writer updates vehicle status through FleetManagementSystem,
+# alternating plain update_vehicle_status calls (retry_on_busy) with ones inside
+# transaction() (BEGIN IMMEDIATE via execute_with_retry). It runs once in rollback-journal
+# mode and once in WAL mode and prints the writer's commit latency for each.
+#
+# The writer has busy_timeout=0, so a lock held by a reader can't be waited out inside
+# SQLite: every time it is in the way, SQLITE_BUSY reaches the retry code, which is counted.
+# In WAL mode readers must never block the writer, so the run fails if any WAL write had to
+# retry or failed outright, or, with --max-p99-ms, if its p99 latency is over that. Latency
+# isn't checked by default because on a machine with fewer cores than readers the writer
+# also waits for the CPU.
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fleet_db  # noqa: E402
+from fleet_core import FleetManagementSystem, Vehicle  # noqa: E402
+from fleet_db import connect, is_busy_error  # noqa: E402
+
+# Rollback-journal mode blocks nearly every write, and each one spends over a second in
+# backoff before giving up, so it gets fewer writes than WAL mode
+DELETE_WRITES = 30
+
+
+def setup(db_name, journal_mode, vehicles):
+    fleet_system = FleetManagementSystem(db_name, journal_mode=journal_mode)
+    fleet_system.add_vehicles_bulk(Vehicle(f"V{i:06d}", "Ford", "Transit", 2020) for i in range(vehicles))
+    fleet_system.conn.close()
+
+
+def reader(db_name, journal_mode, stop, counter):
+    conn = connect(db_name, journal_mode=journal_mode)
+    scans = 0
+    while not stop.is_set():
+        # Hold a read transaction open for the whole scan, as a slow refresh would
+        conn.execute("BEGIN")
+        for _ in conn.execute("SELECT * FROM vehicles"):
+            pass
+        conn.commit()
+        scans += 1
+    with counter.get_lock():
+        counter.value += scans
+
+
+def counting_retries(backoff_delays, retries):
+    # Wrap fleet_db.backoff_delays so retries[0] counts the busy errors retry_on_busy and
+    # execute_with_retry catch: both take a delay before every attempt, and finish the
+    # delays only when the last attempt inside the loop was busy too
+    def counted(*args, **kwargs):
+        for attempt, delay in enumerate(backoff_delays(*args, **kwargs)):
+            retries[0] += attempt > 0
+            yield delay
+        retries[0] += 1
+    return counted
+
+
+def writer(db_name, journal_mode, writes):
+    fleet_system = FleetManagementSystem(db_name, journal_mode=journal_mode, busy_timeout=0)
+    latencies = []
+    errors = 0
+    retries = [0]
+    backoff_delays = fleet_db.backoff_delays
+    fleet_db.backoff_delays = counting_retries(backoff_delays, retries)
+    try:
+        for i in range(writes):
+            vehicle_id, status = f"V{i:06d}", "Assigned to Call" if i % 2 else "Available"
+            start = time.perf_counter()
+            try:
+                if i % 2:
+                    with fleet_system.transaction():
+                        fleet_system.update_vehicle_status(vehicle_id, status)
+                else:
+                    fleet_system.update_vehicle_status(vehicle_id, status)
+            except Exception as error:
+                # Still busy after every retry
+                if not is_busy_error(error):
+                    raise
+                fleet_system.conn.rollback()
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        fleet_db.backoff_delays = backoff_delays
+        fleet_system.conn.close()
+    return latencies, retries[0], errors
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(journal_mode, readers, writes, vehicles):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "stress.db")
+        setup(db_name, journal_mode, vehicles)
+        stop = multiprocessing.Event()
+        counter = multiprocessing.Value("i", 0)
+        procs = [multiprocessing.Process(target=reader, args=(db_name, journal_mode, stop, counter))
+                 for _ in range(readers)]
+        for proc in procs:
+            proc.start()
+        time.sleep(0.5)  # let the readers get going
+        latencies, retries, errors = writer(db_name, journal_mode, writes)
+        stop.set()
+        for proc in procs:
+            proc.join()
+    ms = [latency * 1000 for latency in latencies]
+    print(f"{journal_mode:>6}: {writes} writes  p50 {percentile(ms, 50):7.2f} ms  p99 {percentile(ms, 99):8.2f} ms  "
+          f"max {max(ms):8.2f} ms  busy retries {retries}  failed {errors}  reader scans {counter.value}")
+    return ms, retries, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare writer latency under concurrent readers in DELETE and WAL mode.")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=300)
+    parser.add_argument("--vehicles", type=int, default=20000)
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="also fail if the WAL writer's p99 latency is over this")
+    args = parser.parse_args(argv)
+
+    run("DELETE", args.readers, min(args.writes, DELETE_WRITES), args.vehicles)
+    wal_ms, wal_retries, wal_errors = run("WAL", args.readers, args.writes, args.vehicles)
+    failed = False
+    if wal_retries or wal_errors:
+        print(f"FAIL: readers blocked the WAL writer ({wal_retries} busy retries, {wal_errors} failed writes)")
+        failed = True
+    if args.max_p99_ms is not None and percentile(wal_ms, 99) > args.max_p99_ms:
+        print(f"FAIL: the WAL writer's p99 was {percentile(wal_ms, 99):.1f} ms, over {args.max_p99_ms:g} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# Fleet availability as a bitmap: for every vehicle and day, one bit per 15-minute slot
+# that is set while the vehicle is booked (a call, or a whole day of maintenance). Bits are
+# packed into bytes, so 5,000 vehicles over 90 days take about 5 MB, and "who is free in
+# this window" is one vectorized AND across every vehicle.
+
+from datetime import date, timedelta
+
+import numpy as np
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BYTES_PER_DAY = SLOTS_PER_DAY // 8
+
+# Days covered when no range is asked for
+AVAILABILITY_DAYS = 90
+
+
+def slot_range(start, end):
+    # Slots touched by [start, end) minutes after midnight, widened to whole slots
+    first = max(0, start // SLOT_MINUTES)
+    last = min(SLOTS_PER_DAY, -(-end // SLOT_MINUTES))
+    return first, last
+
+
+def window_mask(start, end):
+    # Packed bytes with the bits of [start, end) set
+    bits = np.zeros(SLOTS_PER_DAY, dtype=bool)
+    first, last = slot_range(start, end)
+    bits[first:last] = True
+    return np.packbits(bits)
+
+
+class AvailabilityTimeline:
+    def __init__(self, vehicle_ids, first_day, days=AVAILABILITY_DAYS):
+        self.first_day = first_day
+        self.days = days
+        self._first = date.fromisoformat(first_day)
+        self.vehicle_ids = list(vehicle_ids)
+        self.rows = {vehicle_id: row for row, vehicle_id in enumerate(self.vehicle_ids)}
+        self.active = np.ones(len(self.vehicle_ids), dtype=bool)
+        self.busy = np.zeros((len(self.vehicle_ids), days, BYTES_PER_DAY), dtype=np.uint8)
+        # What is in the bitmap, so a changed or deleted booking can be found again
+        self.call_days = {}          # call_id -> (vehicle_id, date)
+        self.maintenance_days = {}   # maintenance id -> (vehicle_id, date)
+        # Set by the owner: the change_log position and change marker this reflects
+        self.seq = 0
+        self.marker = None
+
+    def day_index(self, day):
+        # Position of an ISO date in the timeline, or None outside it (or unreadable)
+        try:
+            index = (date.fromisoformat(day) - self._first).days
+        except (TypeError, ValueError):
+            return None
+        return index if 0 <= index < self.days else None
+
+    def covers(self, day):
+        return self.day_index(day) is not None
+
+    def dates(self):
+        return [(self._first + timedelta(days=offset)).isoformat() for offset in range(self.days)]
+
+    # Build the whole bitmap at once. calls: [(call_id, vehicle_id, date, start, end)];
+    # maintenance: [(id, vehicle_id, date)], each blocking the whole day.
+    def load(self, calls, maintenance):
+        marks = []
+        day_indexes = {day: index for index, day in enumerate(self.dates())}
+        for call_id, vehicle_id, day, start, end in calls:
+            row, index = self.rows.get(vehicle_id), day_indexes.get(day)
+            if row is not None and index is not None:
+                self.call_days[call_id] = (vehicle_id, day)
+                marks.append((row, index, start, end))
+        for maintenance_id, vehicle_id, day in maintenance:
+            row, index = self.rows.get(vehicle_id), day_indexes.get(day)
+            if row is not None and index is not None:
+                self.maintenance_days[maintenance_id] = (vehicle_id, day)
+                marks.append((row, index, 0, 24 * 60))
+        if not marks:
+            return
+        rows, days, starts, ends = np.array(marks, dtype=np.int64).T
+        firsts = np.maximum(0, starts // SLOT_MINUTES)
+        lasts = np.minimum(SLOTS_PER_DAY, -(-ends // SLOT_MINUTES))
+        # +1 where each booking starts and -1 where it ends; a running sum above zero is busy.
+        # Done a block of vehicles at a time to bound the temporary array.
+        block = 512
+        for low in range(0, len(self.vehicle_ids), block):
+            selected = (rows >= low) & (rows < low + block)
+            if not selected.any():
+                continue
+            count = min(block, len(self.vehicle_ids) - low)
+            edges = np.zeros((count, self.days, SLOTS_PER_DAY + 1), dtype=np.int16)
+            np.add.at(edges, (rows[selected] - low, days[selected], firsts[selected]), 1)
+            np.add.at(edges, (rows[selected] - low, days[selected], lasts[selected]), -1)
+            bits = np.cumsum(edges[:, :, :SLOTS_PER_DAY], axis=2, dtype=np.int16) > 0
+            self.busy[low:low + count] = np.packbits(bits, axis=2)
+
+    # Replace one vehicle's day with these bookings; calls [(call_id, start, end)],
+    # maintenance [id]
+    def set_day(self, vehicle_id, day, calls=(), maintenance=()):
+        row, index = self.rows.get(vehicle_id), self.day_index(day)
+        if row is None or index is None:
+            return
+        bits = np.zeros(SLOTS_PER_DAY, dtype=bool)
+        for call_id, start, end in calls:
+            first, last = slot_range(start, end)
+            bits[first:last] = True
+            self.call_days[call_id] = (vehicle_id, day)
+        for maintenance_id in maintenance:
+            bits[:] = True
+            self.maintenance_days[maintenance_id] = (vehicle_id, day)
+        self.busy[row, index] = np.packbits(bits)
+
+    def add_vehicle(self, vehicle_id):
+        row = self.rows.get(vehicle_id)
+        if row is not None:
+            self.active[row] = True
+            return
+        self.rows[vehicle_id] = len(self.vehicle_ids)
+        self.vehicle_ids.append(vehicle_id)
+        self.active = np.append(self.active, True)
+        self.busy = np.concatenate((self.busy, np.zeros((1, self.days, BYTES_PER_DAY), dtype=np.uint8)))
+
+    def remove_vehicle(self, vehicle_id):
+        row = self.rows.get(vehicle_id)
+        if row is not None:
+            self.active[row] = False
+
+    def free_mask(self, day, start, end):
+        # Boolean array over vehicle_ids: True where the vehicle has nothing booked in
+        # [start, end) minutes after midnight on day
+        index = self.day_index(day)
+        if index is None:
+            raise ValueError(f"{day} is outside the availability timeline "
+                             f"({self.first_day} plus {self.days} days).")
+        return ~(self.busy[:, index, :] & window_mask(start, end)).any(axis=1) & self.active
+
+    def free_vehicles(self, day, start, end):
+        mask = self.free_mask(day, start, end)
+        return [self.vehicle_ids[row] for row in np.flatnonzero(mask)]
+
+    def busy_slots(self, vehicle_id, day):
+        # One vehicle's day unpacked to a bool per slot
+        return np.unpackbits(self.busy[self.rows[vehicle_id], self.day_index(day)]).astype(bool)
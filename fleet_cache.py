@@ -0,0 +1,61 @@
+# Read-through cache for rows the GUI asks for over and over (a vehicle, a call, a
+# vehicle's maintenance). Entries are dropped least recently used first once a cache is
+# full, and expire after a time-to-live so nothing stays stale for long even if an
+# invalidation is missed. The owner invalidates entries as it writes.
+
+import time
+from collections import OrderedDict
+
+# Entries kept per cache, and seconds before an entry is read again from the database
+CACHE_ENTRIES = 1024
+CACHE_TTL = 30.0
+
+
+class LRUCache:
+    def __init__(self, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()   # key -> (expires, value), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, load):
+        # The cached value for key, or load(key) stored and returned
+        entry = self.entries.get(key)
+        now = self.clock()
+        if entry is not None:
+            expires, value = entry
+            if expires > now:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return value
+            self.expirations += 1
+            del self.entries[key]
+        self.misses += 1
+        value = load(key)
+        self.entries[key] = (now + self.ttl, value)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def invalidate(self, key):
+        if self.entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'expirations': self.expirations,
+                'invalidations': self.invalidations, 'size': len(self.entries)}
@@ -0,0 +1,95 @@
+# Command-line access to the fleet database; needs only fleet_core, not the GUI
+# python fleet_cli.py vehicles --status Available
+# python fleet_cli.py calls 2024-06-01 2024-06-08
+# python fleet_cli.py search "oil change"
+# python fleet_cli.py kpis --today 2024-06-01
+# python fleet_cli.py --db fleet_management.db dispatch 2024-06-01
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+from fleet_core import FleetManagementSystem
+from fleet_schedule import parse_date
+
+
+def print_rows(rows):
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def list_vehicles(fleet_system, args):
+    filters = {'status': args.status} if args.status else None
+    print_rows(fleet_system.iter_vehicles(filters=filters))
+
+
+def list_calls(fleet_system, args):
+    # The last date is inclusive here; calls_between stops before the start of its end date
+    end = date.fromisoformat(parse_date(args.last or args.first)) + timedelta(days=1)
+    print_rows(fleet_system.calls_between(parse_date(args.first), end))
+
+
+def search(fleet_system, args):
+    print_rows(fleet_system.search(args.query, args.limit))
+
+
+def show_kpis(fleet_system, args):
+    kpis = fleet_system.dashboard_kpis(args.today)
+    print(f"Date                 {kpis['date']}")
+    print(f"Vehicles             {kpis['vehicles']}")
+    for status, count in kpis['vehicles_by_status'].items():
+        print(f"  {status:18} {count}")
+    print(f"Open calls           {kpis['open_calls']}")
+    print(f"Assigned calls       {kpis['assigned_calls']}")
+    print(f"Open maintenance     {kpis['open_maintenance']}")
+    print(f"Overdue maintenance  {kpis['overdue_maintenance']}")
+
+
+def dispatch(fleet_system, args):
+    plan = fleet_system.dispatch_calls(args.date)
+    print_rows(plan.assignments)
+    print_rows(plan.unassigned)
+    print(f"Assigned {len(plan.assignments)} call(s), {len(plan.unassigned)} left unassigned.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read and plan the fleet database from the command line.")
+    parser.add_argument("--db", default="fleet_management.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("vehicles", help="list vehicles")
+    command.add_argument("--status")
+    command.set_defaults(run=list_vehicles)
+
+    command = commands.add_parser("calls", help="list calls from the first date through the last")
+    command.add_argument("first")
+    command.add_argument("last", nargs="?")
+    command.set_defaults(run=list_calls)
+
+    command = commands.add_parser("search", help="full-text search over calls and maintenance")
+    command.add_argument("query")
+    command.add_argument("--limit", type=int, default=20)
+    command.set_defaults(run=search)
+
+    command = commands.add_parser("kpis", help="dashboard headline numbers")
+    command.add_argument("--today")
+    command.set_defaults(run=show_kpis)
+
+    command = commands.add_parser("dispatch", help="assign every unassigned call on a date")
+    command.add_argument("date")
+    command.set_defaults(run=dispatch)
+
+    args = parser.parse_args(argv)
+    fleet_system = FleetManagementSystem(args.db)
+    try:
+        args.run(fleet_system, args)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    finally:
+        fleet_system.conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# Fleet Management core: the data model, storage and planning services without any GUI.
+# Scripts, servers and cron jobs use it without importing tkinter or tkcalendar:
+#     from fleet_core import FleetManagementSystem, Vehicle
+#
+#     models    Vehicle, Maintenance, CallSchedule, BulkResult and row_factory / from_rows,
+#               which build them from query rows
+#     storage   FleetStorage, Inventory and the table column and page constants
+#     services  FleetManagementSystem: FleetStorage plus availability and dispatch
+#
+# Each submodule is imported the first time one of its names is used, and NumPy only when
+# availability or dispatch first runs, so importing the package costs next to nothing.
+
+import importlib
+
+_EXPORTS = {
+    'Vehicle': 'models',
+    'Maintenance': 'models',
+    'CallSchedule': 'models',
+    'BulkResult': 'models',
+    'row_factory': 'models',
+    'from_rows': 'models',
+    'FleetStorage': 'storage',
+    'Inventory': 'storage',
+    'CALL_COLUMNS': 'storage',
+    'CALL_MODEL_COLUMNS': 'storage',
+    'VEHICLE_COLUMNS': 'storage',
+    'MAINTENANCE_COLUMNS': 'storage',
+    'TABLE_COLUMNS': 'storage',
+    'TABLE_MODELS': 'storage',
+    'MODEL_COLUMNS': 'storage',
+    'CALL_ORDERS': 'storage',
+    'VEHICLE_ORDERS': 'storage',
+    'MAINTENANCE_ORDERS': 'storage',
+    'PAGE_SIZE': 'storage',
+    'SEARCH_LIMIT': 'storage',
+    'BULK_CHUNK_SIZE': 'storage',
+    'FleetManagementSystem': 'services',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'{__name__}.{module_name}'), name)
+    # Later lookups find it directly
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,141 @@
+# Fleet data model: the objects the storage layer reads and writes. They use __slots__, so a
+# million of them take well under half the memory of dict-backed objects, and row_factory
+# builds them straight from query results. (Written out rather than @dataclass(slots=True):
+# dataclasses imports inspect, which would double how long fleet_core takes to import.)
+
+from operator import itemgetter
+
+from fleet_schedule import CALL_MINUTES, format_minutes, minutes_of_day, parse_date
+
+# Shared by the model classes: equality and repr over __slots__, which lists every field in
+# constructor order. Slots keep each object to its fields, with no per-object __dict__.
+class Record:
+    __slots__ = ()
+    # Columns whose field has another name
+    COLUMN_FIELDS = {}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({values})'
+
+# Vehicle Class
+class Vehicle(Record):
+    __slots__ = ('vehicle_id', 'make', 'model', 'year', 'status')
+
+    def __init__(self, vehicle_id, make, model, year, status='Available'):
+        self.vehicle_id = vehicle_id
+        self.make = make
+        self.model = model
+        self.year = year
+        self.status = status
+
+    def update_status(self, status):
+        self.status = status
+
+# Maintenance Class
+class Maintenance(Record):
+    __slots__ = ('date', 'description', 'completed', 'vehicle_id', 'maintenance_id')
+    COLUMN_FIELDS = {'id': 'maintenance_id'}
+
+    # vehicle_id and maintenance_id are filled in on records read back from the database
+    def __init__(self, date, description, completed=False, vehicle_id=None, maintenance_id=None):
+        self.date = date
+        self.description = description
+        self.completed = completed
+        self.vehicle_id = vehicle_id
+        self.maintenance_id = maintenance_id
+
+    def complete_maintenance(self):
+        self.completed = True
+
+# Schedule Call Class
+class CallSchedule(Record):
+    __slots__ = ('call_id', 'customer_name', 'date', 'time', 'job_type', 'vehicle_id', 'duration')
+
+    # duration is in minutes; None (a migrated call whose time couldn't be read has no slot)
+    # means CALL_MINUTES
+    def __init__(self, call_id, customer_name, date, time, job_type, vehicle_id=None, duration=CALL_MINUTES):
+        self.call_id = call_id
+        self.customer_name = customer_name
+        self.date = date
+        self.time = time
+        self.job_type = job_type
+        self.vehicle_id = vehicle_id
+        self.duration = CALL_MINUTES if duration is None else duration
+
+    def assign_vehicle(self, vehicle_id):
+        self.vehicle_id = vehicle_id
+
+    def slot(self):
+        # (start, end) in minutes after midnight
+        start = minutes_of_day(self.time)
+        if start is None:
+            raise ValueError(f"Can't read the time {self.time!r}; enter it like 9:00 or 2:30 PM.")
+        return start, start + self.duration
+
+    def stored_values(self):
+        # (date, time, start_minute, end_minute) as stored: YYYY-MM-DD and HH:MM, so rows sort
+        # and range-query by (date, time)
+        start, end = self.slot()
+        return parse_date(self.date), format_minutes(start), start, end
+
+def model_fields(model, columns):
+    # The model field each column fills, by name; model.COLUMN_FIELDS renames the odd one
+    # (maintenance.id is Maintenance.maintenance_id) and an expression is matched by its
+    # alias ("end_minute - start_minute AS duration"). ValueError for a column with no field.
+    if isinstance(columns, str):
+        columns = columns.split(',')
+    columns = [column.rpartition(' AS ')[2].strip() for column in columns]
+    mapped = [model.COLUMN_FIELDS.get(column, column) for column in columns]
+    for column, name in zip(columns, mapped):
+        if name not in model.__slots__:
+            raise ValueError(f"{model.__name__} has no field for the column {column}")
+    return mapped
+
+def row_builder(model, columns):
+    # A function building a model object from one row of columns (a list, or text like
+    # storage's VEHICLE_COLUMNS). The names are matched once, here: columns already in field
+    # order go straight to the constructor, others are reordered with an itemgetter.
+    mapped = model_fields(model, columns)
+    order = list(model.__slots__)
+    if mapped == order[:len(mapped)]:
+        return lambda row: model(*row)
+    if set(order[:len(mapped)]) == set(mapped) and len(mapped) > 1:
+        reorder = itemgetter(*[mapped.index(name) for name in order[:len(mapped)]])
+        return lambda row: model(*reorder(row))
+    return lambda row: model(**dict(zip(mapped, row)))
+
+def row_factory(model, columns):
+    # A sqlite3 row_factory for a query selecting columns, so fetches return model objects:
+    #     cursor.row_factory = row_factory(Vehicle, VEHICLE_COLUMNS)
+    # It runs once per row, so the usual case calls the constructor with no step between.
+    mapped = model_fields(model, columns)
+    if mapped == list(model.__slots__[:len(mapped)]):
+        return lambda cursor, row: model(*row)
+    build = row_builder(model, columns)
+    return lambda cursor, row: build(row)
+
+def from_rows(model, rows, columns):
+    # Batch constructor: model objects for rows already fetched as tuples, e.g. a cached page
+    build = row_builder(model, columns)
+    return [build(row) for row in rows]
+
+# Bulk import result Class
+class BulkResult:
+    def __init__(self):
+        self.inserted = 0
+        self.failures = []
+
+    def add_failure(self, index, record, error):
+        # index is the position of the record in the input iterable
+        self.failures.append((index, record, str(error)))
+
+    def __repr__(self):
+        return f"BulkResult(inserted={self.inserted}, failed={len(self.failures)})"
@@ -0,0 +1,172 @@
+# Fleet planning services on top of FleetStorage: the availability timeline, dispatch and the
+# columnar analytics snapshot. They use NumPy (fleet_availability, fleet_dispatch,
+# fleet_snapshot), which is imported the first time one of them runs rather than when the
+# core is imported.
+
+from datetime import datetime
+
+from fleet_db import retry_on_busy
+
+from .storage import FleetStorage
+
+
+class FleetManagementSystem(FleetStorage):
+    def __init__(self, db_name="fleet_management.db", **pragmas):
+        super().__init__(db_name, **pragmas)
+        self._availability = None
+
+    def availability(self, first_day=None, days=None):
+        # The AvailabilityTimeline for days (default fleet_availability.AVAILABILITY_DAYS)
+        # starting at first_day (default today). It is built once and then brought up to date
+        # from change_log, so each booking made here or on another workstation only rewrites
+        # the vehicle-days it touched. Inside a transaction() block it shows the last
+        # committed state.
+        if days is None:
+            from fleet_availability import AVAILABILITY_DAYS
+            days = AVAILABILITY_DAYS
+        first_day = first_day or datetime.today().date().isoformat()
+        timeline = self._availability
+        if timeline is None or timeline.first_day != first_day or timeline.days != days:
+            timeline = self._availability = self._build_availability(first_day, days)
+        elif not self.conn.in_transaction:
+            self._sync_availability(timeline)
+        return timeline
+
+    def free_vehicles(self, date, start, end):
+        # Vehicles with nothing booked on date between start and end minutes after midnight.
+        # Keeps using a window that covers date, so asking about days outside the one
+        # starting today doesn't rebuild the timeline twice on every call.
+        timeline = self._availability
+        if timeline is not None and timeline.covers(date):
+            timeline = self.availability(timeline.first_day, timeline.days)
+        else:
+            timeline = self.availability()
+            if not timeline.covers(date):
+                timeline = self.availability(first_day=date)
+        return timeline.free_vehicles(date, start, end)
+
+    def _build_availability(self, first_day, days):
+        from fleet_availability import AvailabilityTimeline
+        cursor = self.conn.cursor()
+        seq = self.latest_change_seq()
+        marker = self.change_marker()
+        timeline = AvailabilityTimeline(self.get_vehicle_ids(), first_day, days)
+        last_day = timeline.dates()[-1]
+        cursor.execute('''
+            SELECT call_id, vehicle_id, date, start_minute, end_minute FROM call_schedules
+            WHERE date BETWEEN ? AND ? AND vehicle_id IS NOT NULL AND start_minute IS NOT NULL
+        ''', (first_day, last_day))
+        calls = cursor.fetchall()
+        cursor.execute('''
+            SELECT id, vehicle_id, date FROM maintenance WHERE date BETWEEN ? AND ? AND NOT completed
+        ''', (first_day, last_day))
+        timeline.load(calls, cursor.fetchall())
+        timeline.seq = seq
+        timeline.marker = marker
+        return timeline
+
+    def _sync_availability(self, timeline):
+        marker = self.change_marker()
+        if marker == timeline.marker:
+            return
+        timeline.marker = marker
+        touched = set()
+        for seq, table, operation, key, row in self.changes_since(timeline.seq):
+            timeline.seq = seq
+            if table == 'vehicles':
+                if row is None:
+                    timeline.remove_vehicle(key)
+                else:
+                    timeline.add_vehicle(key)
+                continue
+            # Reread both the day the booking was on and the day it is on now
+            if table == 'call_schedules':
+                touched.add(timeline.call_days.pop(key, None))
+                if row is not None:
+                    call_id, customer_name, day, time, job_type, vehicle_id = row
+                    touched.add((vehicle_id, day))
+            elif table == 'maintenance':
+                touched.add(timeline.maintenance_days.pop(key, None))
+                if row is not None:
+                    maintenance_id, vehicle_id, day, description, completed = row
+                    touched.add((vehicle_id, day))
+        for vehicle_day in touched:
+            if vehicle_day is not None and timeline.covers(vehicle_day[1]):
+                self._reload_availability_day(timeline, *vehicle_day)
+
+    def _reload_availability_day(self, timeline, vehicle_id, day):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT call_id, start_minute, end_minute FROM call_schedules
+            WHERE vehicle_id = ? AND date = ? AND start_minute IS NOT NULL
+        ''', (vehicle_id, day))
+        calls = cursor.fetchall()
+        cursor.execute('SELECT id FROM maintenance WHERE vehicle_id = ? AND completed = 0 AND date = ?',
+                       (vehicle_id, day))
+        timeline.set_day(vehicle_id, day, calls, [row[0] for row in cursor.fetchall()])
+
+    def snapshot(self, cache_dir=None):
+        # A fleet_snapshot.FleetSnapshot of every vehicle, call and maintenance record, up to
+        # date with the database. With cache_dir it starts from the copy saved there, reads
+        # only what changed since, and saves itself back if anything did, so analytics scripts
+        # start without reading the tables.
+        from fleet_snapshot import FleetSnapshot
+        snapshot = None
+        if cache_dir is not None:
+            try:
+                snapshot = FleetSnapshot.load(cache_dir)
+            except ValueError:
+                pass
+        snapshot = snapshot or FleetSnapshot()
+        seen = (snapshot.source, snapshot.seq)
+        snapshot.refresh(self)
+        if cache_dir is not None and (snapshot.source, snapshot.seq) != seen:
+            snapshot.save(cache_dir)
+        return snapshot
+
+    @retry_on_busy
+    def dispatch_calls(self, date, distance=None):
+        # Assign every call on date that has no vehicle yet, choosing the vehicles that keep
+        # the total cost lowest (see fleet_dispatch). The plan is worked out and written in
+        # one transaction, so no other workstation can book the same vehicles in between.
+        # distance(call_ids, vehicle_ids) may return a matrix of miles; the database has no
+        # locations of its own. Returns the DispatchPlan.
+        #
+        # Vehicles are picked by their free slots that day, not by status: "Assigned to Call"
+        # only says a vehicle has been sent out at some point, so those vehicles are offered
+        # too, and one vehicle can take several calls as long as none of them overlap its
+        # bookings. Vehicles "In for maintenance", or with open maintenance on date, aren't.
+        with self.transaction():
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT call_id, job_type, start_minute, end_minute FROM call_schedules
+                WHERE date = ? AND vehicle_id IS NULL ORDER BY start_minute, call_id
+            ''', (date,))
+            calls = cursor.fetchall()
+            # Vehicles booked in for maintenance that day stay in the yard
+            cursor.execute('''
+                SELECT vehicle_id FROM vehicles WHERE status IN (?, ?) AND vehicle_id NOT IN (
+                    SELECT vehicle_id FROM maintenance WHERE date = ? AND NOT completed AND vehicle_id IS NOT NULL
+                ) ORDER BY vehicle_id
+            ''', ("Available", "Assigned to Call", date))
+            vehicles = [row[0] for row in cursor.fetchall()]
+            bookings = {}
+            cursor.execute('''
+                SELECT vehicle_id, start_minute, end_minute FROM call_schedules
+                WHERE date = ? AND vehicle_id IS NOT NULL AND start_minute IS NOT NULL
+            ''', (date,))
+            for vehicle_id, start, end in cursor.fetchall():
+                bookings.setdefault(vehicle_id, []).append((start, end))
+            cursor.execute('''
+                SELECT vehicle_id, job_type, COUNT(*) FROM call_schedules
+                WHERE vehicle_id IS NOT NULL GROUP BY vehicle_id, job_type
+            ''')
+            history = {(vehicle_id, job_type): count for vehicle_id, job_type, count in cursor.fetchall()}
+            if distance is not None:
+                distance = distance([call[0] for call in calls], vehicles)
+
+            from fleet_dispatch import plan_dispatch
+            plan = plan_dispatch(calls, vehicles, self.inventory.items, bookings, history, distance)
+            for call_id, vehicle_id, kit in plan.assignments:
+                self.assign_vehicle_to_call(call_id, vehicle_id, kit)
+        return plan
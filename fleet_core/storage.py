@@ -0,0 +1,755 @@
+# Fleet storage: FleetStorage reads and writes the SQLite database (see fleet_db) and keeps
+# the booking index and caches in step with it. It needs nothing beyond the standard
+# library; the planning methods that use NumPy are added by fleet_core.services.
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from fleet_cache import LRUCache
+from fleet_db import (LOGGED_TABLES, connect, execute_with_retry, migrate, rebuild_search_indexes, retry_on_busy,
+                      search_expression)
+from fleet_schedule import DAY_END, DAY_START, IntervalIndex, date_and_time, format_minutes, parse_date
+from fleet_trace import SLOW_QUERY_MS, QueryStats
+
+from .models import BulkResult, CallSchedule, Maintenance, Vehicle, row_factory
+
+# Explicit column order; databases upgraded in place have job_type as the last column
+CALL_COLUMNS = 'call_id, customer_name, date, time, job_type, vehicle_id'
+VEHICLE_COLUMNS = 'vehicle_id, make, model, year, status'
+MAINTENANCE_COLUMNS = 'id, vehicle_id, date, description, completed'
+TABLE_COLUMNS = {'vehicles': VEHICLE_COLUMNS, 'maintenance': MAINTENANCE_COLUMNS, 'call_schedules': CALL_COLUMNS}
+# What the readers build from each table's rows when asked for as_models=True, and the
+# columns they select for it: a call's duration is stored as its slot, so it is read back
+# from that rather than left at the constructor's default
+TABLE_MODELS = {'vehicles': Vehicle, 'maintenance': Maintenance, 'call_schedules': CallSchedule}
+CALL_MODEL_COLUMNS = f'{CALL_COLUMNS}, end_minute - start_minute AS duration'
+MODEL_COLUMNS = {'vehicles': VEHICLE_COLUMNS, 'maintenance': MAINTENANCE_COLUMNS,
+                 'call_schedules': CALL_MODEL_COLUMNS}
+
+# Keyset pagination: each order names the columns that sort the rows, ending with the
+# primary key so the order is unique. All of them are covered by an index.
+CALL_ORDERS = {'date': ('date', 'time', 'call_id'), 'call_id': ('call_id',)}
+VEHICLE_ORDERS = {'vehicle_id': ('vehicle_id',), 'status': ('status', 'vehicle_id')}
+MAINTENANCE_ORDERS = {'id': ('id',), 'vehicle': ('vehicle_id', 'completed', 'id')}
+PAGE_SIZE = 200
+
+# Most results search() returns, and how many matches it ranks by relevance before falling
+# back to the newest ones
+SEARCH_LIMIT = 50
+SEARCH_RANKED = 500
+# Full-text index and the query reading (kind, key, date, highlighted text, rank) from it
+SEARCH_SOURCES = [
+    ('call_search', '''
+        SELECT 'call', c.call_id, c.date,
+               highlight(call_search, 0, '[', ']') || COALESCE(' (' || highlight(call_search, 1, '[', ']') || ')', ''),
+               call_search.rank
+        FROM call_search JOIN call_schedules AS c ON c.rowid = call_search.rowid
+    '''),
+    ('maintenance_search', '''
+        SELECT 'maintenance', m.id, m.date, highlight(maintenance_search, 0, '[', ']'), maintenance_search.rank
+        FROM maintenance_search JOIN maintenance AS m ON m.id = maintenance_search.rowid
+    '''),
+]
+
+# Rows written per executemany call by the bulk import methods
+BULK_CHUNK_SIZE = 500
+
+# Inventory Class
+# Stock lives in the inventory table so every workstation shares it, and every change is
+# also written to the append-only inventory_ledger
+class Inventory:
+    def __init__(self, fleet_system):
+        self.fleet_system = fleet_system
+
+    @property
+    def items(self):
+        # {item: quantity} in the order the items were added
+        cursor = self.fleet_system.conn.cursor()
+        cursor.execute('SELECT item, quantity FROM inventory ORDER BY rowid')
+        return dict(cursor.fetchall())
+
+    def use_item(self, item, call_id=None, vehicle_id=None):
+        # Take one kit out of stock; returns False when there is none left. The decrement
+        # only matches a row with stock remaining, so two workstations can never both take
+        # the last kit.
+        with self.fleet_system.transaction():
+            cursor = self.fleet_system.conn.cursor()
+            cursor.execute('UPDATE inventory SET quantity = quantity - 1 WHERE item = ? AND quantity > 0', (item,))
+            if cursor.rowcount == 0:
+                return False
+            cursor.execute('INSERT INTO inventory_ledger (item, change, call_id, vehicle_id) VALUES (?, -1, ?, ?)',
+                           (item, call_id, vehicle_id))
+        return True
+
+    def restock_item(self, item, quantity):
+        # Add quantity kits, creating the item if it is new
+        if quantity <= 0:
+            raise ValueError("Restock quantity must be a positive number.")
+        with self.fleet_system.transaction():
+            cursor = self.fleet_system.conn.cursor()
+            cursor.execute('''
+                INSERT INTO inventory (item, quantity) VALUES (?, ?)
+                ON CONFLICT(item) DO UPDATE SET quantity = quantity + excluded.quantity
+            ''', (item, quantity))
+            cursor.execute('INSERT INTO inventory_ledger (item, change) VALUES (?, ?)', (item, quantity))
+
+# Database
+class FleetStorage:
+    def __init__(self, db_name="fleet_management.db", **pragmas):
+        # Initialize the fleet management system, connecting to the database.
+        # Keyword arguments override fleet_db.CONNECTION_PRAGMAS, e.g. journal_mode="DELETE"
+        self.conn = connect(db_name, **pragmas)
+        self._transaction_depth = 0
+        self.create_tables()
+        self.inventory = Inventory(self)
+        # Booked call intervals per vehicle and day, see fleet_schedule
+        self.bookings = IntervalIndex(self._load_bookings)
+        # Rows read through get_vehicle, get_call_schedule, get_vehicle_maintenance and
+        # get_available_vehicles, see fleet_cache
+        self.caches = {'vehicle': LRUCache(), 'call': LRUCache(), 'maintenance': LRUCache(),
+                       'available_vehicles': LRUCache(max_entries=1)}
+        # PRAGMA data_version when the booking index and caches were last known current
+        self._seen_data_version = None
+
+    def create_tables(self):
+        # Create or upgrade the tables; does nothing when the schema is already current
+        migrate(self.conn)
+
+    @retry_on_busy
+    def add_vehicle(self, vehicle):
+        # Add a new vehicle to the vehicles table
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO vehicles (vehicle_id, make, model, year, status) VALUES (?, ?, ?, ?, ?)
+        ''', (vehicle.vehicle_id, vehicle.make, vehicle.model, vehicle.year, vehicle.status))
+        self._forget_vehicle(vehicle.vehicle_id)
+        self._commit()
+
+    @retry_on_busy
+    def remove_vehicle(self, vehicle_id):
+        # Remove a vehicle from the vehicles table; False if there was no such vehicle
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM vehicles WHERE vehicle_id = ?', (vehicle_id,))
+        self._forget_vehicle(vehicle_id)
+        self._commit()
+        return cursor.rowcount > 0
+
+    @retry_on_busy
+    def add_call_schedule(self, call_schedule):
+        # Add call schedule to the call_schedule table. A call booked with a vehicle must not
+        # overlap that vehicle's other calls that day; ValueError if it does, or if the date or
+        # time can't be read.
+        day, time_text, start, end = call_schedule.stored_values()
+        with self.transaction():
+            if call_schedule.vehicle_id is not None:
+                self._check_slot(call_schedule.vehicle_id, day, start, end, call_schedule.call_id)
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT INTO call_schedules (call_id, customer_name, date, time, job_type, vehicle_id,
+                                            start_minute, end_minute)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (call_schedule.call_id, call_schedule.customer_name, day,
+                time_text, call_schedule.job_type, call_schedule.vehicle_id, start, end))
+            if call_schedule.vehicle_id is not None:
+                self.bookings.add(call_schedule.vehicle_id, day, start, end, call_schedule.call_id)
+            self.caches['call'].invalidate(call_schedule.call_id)
+
+    @retry_on_busy
+    def remove_call_schedule(self, call_id):
+        # Remove a call schedule from the call_schedules table
+        with self.transaction():
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM call_schedules WHERE call_id = ?', (call_id,))
+            self.bookings.remove(call_id)
+            self.caches['call'].invalidate(call_id)
+
+    @retry_on_busy
+    def assign_vehicle_to_call(self, call_id, vehicle_id, item=None):
+        # Assign a vehicle to a call and update vehicle status. With item, one of that kit
+        # is taken from inventory in the same transaction; if it is out of stock nothing
+        # is saved and ValueError is raised. ValueError too if there is no such call or the
+        # vehicle already has a call at that time.
+        with self.transaction():
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT date, start_minute, end_minute FROM call_schedules WHERE call_id = ?', (call_id,))
+            slot = cursor.fetchone()
+            if slot is None:
+                raise ValueError(f"Call ID {call_id} not found.")
+            if slot[1] is not None:
+                self._check_slot(vehicle_id, *slot, call_id)
+            if item is not None and not self.inventory.use_item(item, call_id, vehicle_id):
+                raise ValueError(f"There are no {item} items available in the inventory.")
+            cursor.execute('UPDATE call_schedules SET vehicle_id = ? WHERE call_id = ?', (vehicle_id, call_id))
+            cursor.execute('UPDATE vehicles SET status = ? WHERE vehicle_id = ?', ("Assigned to Call", vehicle_id))
+            self.bookings.remove(call_id)
+            if slot[1] is not None:
+                self.bookings.add(vehicle_id, *slot, call_id)
+            self.caches['call'].invalidate(call_id)
+            self._forget_vehicle(vehicle_id)
+
+    def _load_bookings(self, vehicle_id, date):
+        # Loader for self.bookings: one vehicle's timed calls on one day
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT start_minute, end_minute, call_id FROM call_schedules
+            WHERE vehicle_id = ? AND date = ? AND start_minute IS NOT NULL
+        ''', (vehicle_id, date))
+        return cursor.fetchall()
+
+    def _booking_index(self):
+        self._forget_others_writes()
+        return self.bookings
+
+    def _forget_others_writes(self):
+        # Empty the booking index and caches if another connection has committed since they
+        # were filled. PRAGMA data_version only moves for other connections' commits.
+        cursor = self.conn.cursor()
+        cursor.execute('PRAGMA data_version')
+        version = cursor.fetchone()[0]
+        if version != self._seen_data_version:
+            self._forget_everything()
+            self._seen_data_version = version
+
+    def _forget_everything(self):
+        self.bookings.invalidate()
+        for cache in self.caches.values():
+            cache.clear()
+
+    def _forget_vehicle(self, vehicle_id):
+        self.caches['vehicle'].invalidate(vehicle_id)
+        self.caches['maintenance'].invalidate(vehicle_id)
+        self.caches['available_vehicles'].clear()
+
+    def _cached(self, kind, key, load):
+        # Read through self.caches[kind]
+        self._forget_others_writes()
+        return self.caches[kind].get(key, load)
+
+    def cache_stats(self):
+        # {cache name: hits, misses, hit_rate, evictions, expirations, invalidations, size}
+        return {kind: cache.stats() for kind, cache in self.caches.items()}
+
+    def enable_query_stats(self, slow_ms=SLOW_QUERY_MS):
+        # Start timing every statement on this connection (see fleet_trace). Statements
+        # taking slow_ms or longer are logged with their query plan; None logs none. Calling
+        # it again only changes the threshold.
+        if self.conn.query_stats is None:
+            self.conn.query_stats = QueryStats(slow_ms)
+        else:
+            self.conn.query_stats.slow_ms = slow_ms
+
+    def disable_query_stats(self):
+        self.conn.query_stats = None
+
+    def reset_query_stats(self):
+        if self.conn.query_stats is not None:
+            self.conn.query_stats.reset()
+
+    def query_stats(self):
+        # [{sql, count, total_ms, p50_ms, p95_ms, p99_ms, max_ms, rows}] per statement, most
+        # total time first; rows is the number of rows fetched. [] while stats are off.
+        return [] if self.conn.query_stats is None else self.conn.query_stats.summary()
+
+    def slow_queries(self):
+        # [(sql, params, ms, query plan lines)] for the latest statements over the slow
+        # threshold, oldest first
+        return [] if self.conn.query_stats is None else list(self.conn.query_stats.slow)
+
+    def _check_slot(self, vehicle_id, date, start, end, call_id=None):
+        other = self.find_conflict(vehicle_id, date, start, end, ignore=call_id)
+        if other is not None:
+            raise ValueError(f"Vehicle {vehicle_id} is already booked for call {other} at "
+                             f"{format_minutes(start)}-{format_minutes(end)} on {date}.")
+
+    def find_conflict(self, vehicle_id, date, start, end, ignore=None):
+        # call_id of a call of vehicle_id on date overlapping [start, end) minutes after
+        # midnight, or None
+        return self._booking_index().conflict(vehicle_id, date, start, end, ignore)
+
+    def free_windows(self, vehicle_id, date, min_minutes=0, day_start=DAY_START, day_end=DAY_END):
+        # [(start, end)] stretches of the working day, in minutes after midnight, when
+        # vehicle_id has no call on date
+        return self._booking_index().day(vehicle_id, date).free_windows(day_start, day_end, min_minutes)
+
+    @retry_on_busy
+    def update_vehicle_status(self, vehicle_id, status):
+        # Change the status of a vehicle
+        cursor = self.conn.cursor()
+        cursor.execute('UPDATE vehicles SET status = ? WHERE vehicle_id = ?', (status, vehicle_id))
+        self._forget_vehicle(vehicle_id)
+        self._commit()
+
+    @retry_on_busy
+    def add_maintenance_record(self, vehicle_id, maintenance):
+        # Add a maintenance record to the maintenance table and return its id; ValueError if
+        # the date can't be read
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO maintenance (vehicle_id, date, description, completed) VALUES (?, ?, ?, ?)
+        ''', (vehicle_id, parse_date(maintenance.date), maintenance.description, int(maintenance.completed)))
+        self.caches['maintenance'].invalidate(vehicle_id)
+        self._commit()
+        return cursor.lastrowid
+
+    @retry_on_busy
+    def remove_maintenance_record(self, maintenance_id):
+        # Remove a maintenance record from the maintenance table
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM maintenance WHERE id = ?', (maintenance_id,))
+        self.caches['maintenance'].clear()
+        self._commit()
+
+    @retry_on_busy
+    def complete_maintenance_record(self, maintenance_id):
+        # Mark a maintenance record as completed
+        cursor = self.conn.cursor()
+        cursor.execute('UPDATE maintenance SET completed = 1 WHERE id = ?', (maintenance_id,))
+        self.caches['maintenance'].clear()
+        self._commit()
+
+    @contextmanager
+    def transaction(self):
+        # Group several operations into one atomic commit:
+        #     with fleet_system.transaction():
+        #         fleet_system.assign_vehicle_to_call(call_id, vehicle_id)
+        #         fleet_system.update_vehicle_status(other_id, "Available")
+        # Methods called inside the block don't commit on their own. Nested blocks use
+        # savepoints, so an error inside one only undoes that inner block.
+        cursor = self.conn.cursor()
+        if self._transaction_depth == 0:
+            if not self.conn.in_transaction:
+                execute_with_retry(cursor, 'BEGIN IMMEDIATE')
+        else:
+            cursor.execute(f'SAVEPOINT fleet_sp_{self._transaction_depth}')
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            # The booking index and caches may hold rows from the writes being undone
+            self._forget_everything()
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+            else:
+                cursor.execute(f'ROLLBACK TO fleet_sp_{self._transaction_depth}')
+                cursor.execute(f'RELEASE fleet_sp_{self._transaction_depth}')
+            raise
+        else:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                # In rollback-journal mode COMMIT waits for readers to finish; a busy COMMIT
+                # leaves the transaction open, so it can be retried as it is
+                try:
+                    execute_with_retry(cursor, 'COMMIT')
+                except BaseException:
+                    self._forget_everything()
+                    self.conn.rollback()
+                    raise
+            else:
+                cursor.execute(f'RELEASE fleet_sp_{self._transaction_depth}')
+
+    def _commit(self):
+        # Commit now unless a transaction() block is open; that block commits when it ends
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    def get_vehicle(self, vehicle_id):
+        # Retrieve a vehicle's details from the vehicles table
+        return self._cached('vehicle', vehicle_id, self._load_vehicle)
+
+    def _load_vehicle(self, vehicle_id):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM vehicles WHERE vehicle_id = ?', (vehicle_id,))
+        return cursor.fetchone()
+
+    def get_call_schedule(self, call_id):
+        # Retrieve a call schedule's details from the call_schedules table
+        return self._cached('call', call_id, self._load_call_schedule)
+
+    def _load_call_schedule(self, call_id):
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT {CALL_COLUMNS} FROM call_schedules WHERE call_id = ?', (call_id,))
+        return cursor.fetchone()
+
+    def get_vehicle_maintenance(self, vehicle_id):
+        # A vehicle's maintenance records, oldest first
+        return list(self._cached('maintenance', vehicle_id, self._load_vehicle_maintenance))
+
+    def _load_vehicle_maintenance(self, vehicle_id):
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT {MAINTENANCE_COLUMNS} FROM maintenance WHERE vehicle_id = ? ORDER BY date, id',
+                       (vehicle_id,))
+        return tuple(cursor.fetchall())
+
+    def calls_between(self, start, end, as_models=False):
+        # Calls at or after start and before end, in time order. start and end are datetimes,
+        # dates (midnight) or text like "2024-06-01T14:30"; the range seeks idx_calls_date_time.
+        # Rows are tuples in CALL_COLUMNS order, or CallSchedule objects with as_models.
+        start, end = date_and_time(start), date_and_time(end)
+        cursor, columns = self._cursor('call_schedules', CALL_COLUMNS, as_models)
+        cursor.execute(f'''
+            SELECT {columns} FROM call_schedules
+            WHERE (date, time) >= (?, ?) AND (date, time) < (?, ?)
+            ORDER BY date, time, call_id
+        ''', start + end)
+        return cursor.fetchall()
+
+    def maintenance_between(self, first_day, last_day, as_models=False):
+        # Maintenance records dated first_day through last_day inclusive, oldest first
+        cursor, columns = self._cursor('maintenance', MAINTENANCE_COLUMNS, as_models)
+        cursor.execute(f'''
+            SELECT {columns} FROM maintenance WHERE date BETWEEN ? AND ? ORDER BY date, id
+        ''', (parse_date(first_day), parse_date(last_day)))
+        return cursor.fetchall()
+
+    def get_available_vehicles(self):
+        # (vehicle_id, make, model, year) of every vehicle that can take a call
+        return list(self._cached('available_vehicles', None, self._load_available_vehicles))
+
+    def _load_available_vehicles(self, key):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT vehicle_id, make, model, year FROM vehicles WHERE status = ? ORDER BY vehicle_id',
+                       ("Available",))
+        return tuple(cursor.fetchall())
+
+    def get_vehicle_ids(self):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT vehicle_id FROM vehicles ORDER BY vehicle_id')
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_inventory(self):
+        # [(item, quantity)] for every kit in stock or not
+        return list(self.inventory.items.items())
+
+    def change_marker(self):
+        # Changes whenever anything is committed to the database: PRAGMA data_version covers
+        # other connections and total_changes this one, and neither reads any table
+        cursor = self.conn.cursor()
+        cursor.execute('PRAGMA data_version')
+        return cursor.fetchone()[0], self.conn.total_changes
+
+    def table_versions(self):
+        # {table name: counter bumped by every insert, update and delete on that table}
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT table_name, version FROM table_versions')
+        return dict(cursor.fetchall())
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        # Calls and maintenance records containing every word of query (the last word may be
+        # partly typed), best match first: [(kind, key, date, text)] where kind is 'call' (key
+        # call_id, text "customer (job type)") or 'maintenance' (key id, text the
+        # description), with the matched words in [brackets]
+        expression = search_expression(query)
+        if expression is None:
+            return []
+        cursor = self.conn.cursor()
+        results = []
+        for index, select in SEARCH_SOURCES:
+            # bm25 scores every match before sorting, which takes a while for a word found in
+            # much of the table; past SEARCH_RANKED matches, rank only the newest ones
+            cursor.execute(f'SELECT rowid FROM {index} WHERE {index} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?',
+                           (expression, SEARCH_RANKED))
+            order = f'{index}.rowid DESC' if cursor.fetchone() else f'{index}.rank'
+            cursor.execute(f'{select} WHERE {index} MATCH ? ORDER BY {order} LIMIT ?', (expression, limit))
+            results += cursor.fetchall()
+        # Both ranks are bm25 scores, lower is better
+        results.sort(key=lambda row: row[4])
+        return [row[:4] for row in results[:limit]]
+
+    @retry_on_busy
+    def rebuild_search_indexes(self):
+        # Re-read the full-text indexes from their tables, e.g. after a VACUUM
+        with self.transaction():
+            rebuild_search_indexes(self.conn)
+
+    def vehicle_status_counts(self):
+        # {status: number of vehicles}, from the trigger-maintained vehicle_status_counts
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT status, vehicles FROM vehicle_status_counts ORDER BY status')
+        return dict(cursor.fetchall())
+
+    def call_counts(self, first_day, last_day=None):
+        # [(date, job_type, open_calls, assigned_calls)] for first_day through last_day
+        # (just first_day when last_day is None), from call_day_counts
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT date, job_type, open_calls, assigned_calls FROM call_day_counts
+            WHERE date BETWEEN ? AND ? ORDER BY date, job_type
+        ''', (parse_date(first_day), parse_date(last_day or first_day)))
+        return cursor.fetchall()
+
+    def maintenance_backlog(self, today=None):
+        # [(vehicle_id, open_records, overdue_records, oldest_open_date)] for every vehicle
+        # with incomplete maintenance, most overdue first. Overdue means dated before today.
+        today = parse_date(today or datetime.today().date())
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT vehicle_id, SUM(records), SUM(CASE WHEN date < ? THEN records ELSE 0 END), MIN(date)
+            FROM open_maintenance_counts GROUP BY vehicle_id ORDER BY 3 DESC, 4, vehicle_id
+        ''', (today,))
+        return cursor.fetchall()
+
+    def dashboard_kpis(self, today=None):
+        # Headline numbers for the dashboard. Everything is read from the summary tables, so
+        # the cost doesn't grow with the number of calls or maintenance records kept.
+        today = parse_date(today or datetime.today().date())
+        by_status = self.vehicle_status_counts()
+        calls = self.call_counts(today)
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(records), 0), COALESCE(SUM(CASE WHEN date < ? THEN records ELSE 0 END), 0)
+            FROM open_maintenance_counts
+        ''', (today,))
+        open_maintenance, overdue_maintenance = cursor.fetchone()
+        return {'date': today,
+                'vehicles': sum(by_status.values()),
+                'vehicles_by_status': by_status,
+                'open_calls': sum(row[2] for row in calls),
+                'assigned_calls': sum(row[3] for row in calls),
+                'calls_by_job_type': {job_type: (open_calls, assigned_calls)
+                                      for _, job_type, open_calls, assigned_calls in calls},
+                'open_maintenance': open_maintenance,
+                'overdue_maintenance': overdue_maintenance}
+
+    def latest_change_seq(self):
+        # Sequence number of the newest change_log entry; start a new consumer from here
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+        return cursor.fetchone()[0]
+
+    def changes_since(self, seq=0, page_size=PAGE_SIZE):
+        # Stream row-level changes after seq as (seq, table, operation, key, row), where
+        # operation is 'I', 'U' or 'D' and row is the row as it is now (None once deleted).
+        # Remember the last seq handled and pass it back next time.
+        cursor = self.conn.cursor()
+        while True:
+            cursor.execute('''
+                SELECT seq, table_name, operation, row_key FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?
+            ''', (seq, page_size))
+            changes = cursor.fetchall()
+            if not changes:
+                return
+            rows = {}
+            for table, columns in TABLE_COLUMNS.items():
+                keys = list({key for _, changed_table, _, key in changes if changed_table == table})
+                if keys:
+                    key_column = LOGGED_TABLES[table]
+                    cursor.execute(f"SELECT {columns} FROM {table} WHERE {key_column} IN ({', '.join('?' * len(keys))})",
+                                   keys)
+                    key_index = [name.strip() for name in columns.split(',')].index(key_column)
+                    for row in cursor.fetchall():
+                        rows[table, row[key_index]] = row
+            for seq, table, operation, key in changes:
+                yield seq, table, operation, key, rows.get((table, key))
+            if len(changes) < page_size:
+                return
+
+    @retry_on_busy
+    def compact_changes(self, before_seq):
+        # Drop change_log entries up to before_seq that a later entry for the same row
+        # supersedes. A consumer that is further behind still ends up with every row's final
+        # state; deletes are kept as tombstones so it also learns which rows are gone.
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            DELETE FROM change_log WHERE seq <= ? AND EXISTS (
+                SELECT 1 FROM change_log AS newer
+                WHERE newer.table_name = change_log.table_name
+                AND newer.row_key = change_log.row_key
+                AND newer.seq > change_log.seq
+            )
+        ''', (before_seq,))
+        removed = cursor.rowcount
+        self._commit()
+        return removed
+
+    def get_vehicles_page(self, after_key=None, limit=PAGE_SIZE, filters=None, order='vehicle_id',
+                          descending=False, offset=0, as_models=False):
+        # One page of vehicles and the after_key for the next page (None on the last page).
+        # Rows are tuples in VEHICLE_COLUMNS order, or Vehicle objects with as_models.
+        return self._get_page('vehicles', VEHICLE_COLUMNS, VEHICLE_ORDERS[order],
+                              after_key, limit, filters, descending, offset, as_models)
+
+    def get_calls_page(self, after_key=None, limit=PAGE_SIZE, filters=None, order='date',
+                       descending=False, offset=0, as_models=False):
+        # One page of call schedules, e.g. filters={'vehicle_id': None} for unassigned calls
+        return self._get_page('call_schedules', CALL_COLUMNS, CALL_ORDERS[order],
+                              after_key, limit, filters, descending, offset, as_models)
+
+    def get_maintenance_page(self, after_key=None, limit=PAGE_SIZE, filters=None, order='id',
+                             descending=False, offset=0, as_models=False):
+        # One page of maintenance records, e.g. filters={'vehicle_id': 'V1', 'completed': 0}
+        return self._get_page('maintenance', MAINTENANCE_COLUMNS, MAINTENANCE_ORDERS[order],
+                              after_key, limit, filters, descending, offset, as_models)
+
+    def count_vehicles(self, filters=None):
+        return self._count('vehicles', VEHICLE_COLUMNS, filters)
+
+    def count_calls(self, filters=None):
+        return self._count('call_schedules', CALL_COLUMNS, filters)
+
+    def count_maintenance(self, filters=None):
+        return self._count('maintenance', MAINTENANCE_COLUMNS, filters)
+
+    def iter_vehicles(self, after_key=None, limit=PAGE_SIZE, filters=None, order='vehicle_id', descending=False,
+                      as_models=False):
+        # Stream every matching vehicle, reading limit rows per query
+        return self._iter_pages(self.get_vehicles_page, after_key, limit, filters, order, descending, as_models)
+
+    def iter_calls(self, after_key=None, limit=PAGE_SIZE, filters=None, order='date', descending=False,
+                   as_models=False):
+        # Stream every matching call schedule, reading limit rows per query
+        return self._iter_pages(self.get_calls_page, after_key, limit, filters, order, descending, as_models)
+
+    def iter_maintenance(self, after_key=None, limit=PAGE_SIZE, filters=None, order='id', descending=False,
+                         as_models=False):
+        # Stream every matching maintenance record, reading limit rows per query
+        return self._iter_pages(self.get_maintenance_page, after_key, limit, filters, order, descending,
+                                as_models)
+
+    def _cursor(self, table, columns, as_models):
+        # A cursor for a query on table and the columns it should select: columns itself, or
+        # with as_models MODEL_COLUMNS[table], whose rows the row factory turns into the
+        # table's model objects as they are fetched
+        cursor = self.conn.cursor()
+        if as_models:
+            columns = MODEL_COLUMNS[table]
+            cursor.row_factory = row_factory(TABLE_MODELS[table], columns)
+        return cursor, columns
+
+    def _filter_clauses(self, table, column_names, filters):
+        where, params = [], []
+        for column, value in (filters or {}).items():
+            if column not in column_names:
+                raise ValueError(f"Unknown {table} column: {column}")
+            if value is None:
+                where.append(f'{column} IS NULL')
+            else:
+                where.append(f'{column} = ?')
+                params.append(value)
+        return where, params
+
+    def _get_page(self, table, columns, key_columns, after_key, limit, filters, descending, offset=0,
+                  as_models=False):
+        # Seek past after_key with a row-value comparison on the indexed order columns rather
+        # than using OFFSET, so every page costs the same however deep into the table it is.
+        # offset skips rows after that point; the virtual treeviews use it to jump from the
+        # nearest key they know when the scrollbar is dragged.
+        column_names = [name.strip() for name in columns.split(',')]
+        where, params = self._filter_clauses(table, column_names, filters)
+        # Order columns pinned by an equality filter add nothing to the key, and leaving them
+        # out lets SQLite seek straight to after_key in an index that starts with the filter
+        key_columns = [column for column in key_columns if column not in (filters or {})] or key_columns
+        key = ', '.join(key_columns)
+        if after_key is not None:
+            where.append(f"({key}) {'<' if descending else '>'} ({', '.join('?' * len(key_columns))})")
+            params.extend(after_key)
+        direction = ' DESC' if descending else ''
+        cursor, selected = self._cursor(table, columns, as_models)
+        sql = f'SELECT {selected} FROM {table}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f" ORDER BY {', '.join(column + direction for column in key_columns)} LIMIT ? OFFSET ?"
+        params.extend((limit, offset))
+
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        next_key = None
+        if len(rows) == limit:
+            if as_models:
+                model = TABLE_MODELS[table]
+                next_key = tuple(getattr(rows[-1], model.COLUMN_FIELDS.get(column, column)) for column in key_columns)
+            else:
+                positions = [column_names.index(column) for column in key_columns]
+                next_key = tuple(rows[-1][position] for position in positions)
+        return rows, next_key
+
+    def _count(self, table, columns, filters):
+        column_names = [name.strip() for name in columns.split(',')]
+        where, params = self._filter_clauses(table, column_names, filters)
+        sql = f'SELECT COUNT(*) FROM {table}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+    def _iter_pages(self, get_page, after_key, limit, filters, order, descending, as_models=False):
+        while True:
+            rows, after_key = get_page(after_key, limit, filters, order, descending, as_models=as_models)
+            yield from rows
+            if after_key is None:
+                return
+
+    def add_vehicles_bulk(self, vehicles, chunk_size=BULK_CHUNK_SIZE):
+        # Add many Vehicle objects in one transaction
+        result = self._bulk_insert('''
+            INSERT INTO vehicles (vehicle_id, make, model, year, status) VALUES (?, ?, ?, ?, ?)
+        ''', vehicles, lambda vehicle: (vehicle.vehicle_id, vehicle.make, vehicle.model,
+                                        int(vehicle.year), vehicle.status), chunk_size)
+        self.caches['vehicle'].clear()
+        self.caches['available_vehicles'].clear()
+        return result
+
+    def add_call_schedules_bulk(self, call_schedules, chunk_size=BULK_CHUNK_SIZE):
+        # Add many CallSchedule objects in one transaction. Rows whose date or time can't be
+        # read fail. Overlapping bookings are not rejected here; the booking index still sees
+        # them, so later bookings can't be slipped inside one.
+        def to_params(call):
+            day, time_text, start, end = call.stored_values()
+            return (call.call_id, call.customer_name, day, time_text, call.job_type, call.vehicle_id, start, end)
+        result = self._bulk_insert('''
+            INSERT INTO call_schedules (call_id, customer_name, date, time, job_type, vehicle_id,
+                                        start_minute, end_minute)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', call_schedules, to_params, chunk_size)
+        self.bookings.invalidate()
+        self.caches['call'].clear()
+        return result
+
+    def add_maintenance_records_bulk(self, records, chunk_size=BULK_CHUNK_SIZE):
+        # Add many (vehicle_id, Maintenance) pairs in one transaction
+        def to_params(record):
+            vehicle_id, maintenance = record
+            return (vehicle_id, parse_date(maintenance.date), maintenance.description, int(maintenance.completed))
+        result = self._bulk_insert('''
+            INSERT INTO maintenance (vehicle_id, date, description, completed) VALUES (?, ?, ?, ?)
+        ''', records, to_params, chunk_size)
+        self.caches['maintenance'].clear()
+        return result
+
+    def _bulk_insert(self, sql, records, to_params, chunk_size):
+        # Insert records chunk by chunk inside a single transaction. A chunk that hits a bad
+        # row is rolled back to its savepoint and replayed row by row so only that row fails.
+        result = BulkResult()
+        records = iter(records)
+        index = 0
+        with self.transaction():
+            cursor = self.conn.cursor()
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                rows = []
+                for record in chunk:
+                    try:
+                        rows.append((index, record, to_params(record)))
+                    except (AttributeError, TypeError, ValueError) as error:
+                        result.add_failure(index, record, error)
+                    index += 1
+
+                cursor.execute('SAVEPOINT bulk_chunk')
+                try:
+                    cursor.executemany(sql, [params for _, _, params in rows])
+                    result.inserted += len(rows)
+                except sqlite3.Error:
+                    cursor.execute('ROLLBACK TO bulk_chunk')
+                    for row_index, record, params in rows:
+                        try:
+                            cursor.execute(sql, params)
+                            result.inserted += 1
+                        except sqlite3.Error as error:
+                            result.add_failure(row_index, record, error)
+                cursor.execute('RELEASE bulk_chunk')
+        return result
@@ -0,0 +1,497 @@
+# Connection setup for the shared fleet database
+
+import functools
+import random
+import re
+import sqlite3
+import time
+
+from fleet_schedule import CALL_MINUTES, format_minutes, iso_date, minutes_of_day
+from fleet_trace import TracingConnection
+
+# Settings applied to every connection. WAL lets dispatchers keep reading while another
+# workstation writes. It needs every client on the same machine as the database file
+# (shared memory), so pass journal_mode="DELETE" when the file sits on a network share.
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",    # safe with WAL, one fsync per checkpoint instead of per commit
+    "busy_timeout": 5000,       # milliseconds SQLite waits on a lock before raising SQLITE_BUSY
+    "cache_size": -16000,       # negative means KiB, so about 16 MB of page cache
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+# Retries after SQLite has already waited busy_timeout and still reports the database as locked
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05  # seconds, doubled on each retry
+
+
+def connect(db_name, **pragmas):
+    # Open a connection with CONNECTION_PRAGMAS, overridden by any keyword arguments
+    settings = dict(CONNECTION_PRAGMAS, **pragmas)
+    conn = sqlite3.connect(db_name, timeout=settings["busy_timeout"] / 1000, factory=TracingConnection)
+    for name, value in settings.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def is_busy_error(error):
+    # SQLITE_BUSY and SQLITE_LOCKED both surface as OperationalError
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+def backoff_delays(retries=BUSY_RETRIES, base=BUSY_BACKOFF):
+    # Exponential backoff with jitter so competing workstations don't retry in lockstep
+    for attempt in range(retries):
+        yield base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def execute_with_retry(cursor, sql, params=()):
+    # Run one statement, retrying while the database is locked by another client
+    for delay in backoff_delays():
+        try:
+            return cursor.execute(sql, params)
+        except sqlite3.OperationalError as error:
+            if not is_busy_error(error):
+                raise
+            time.sleep(delay)
+    return cursor.execute(sql, params)
+
+
+def retry_on_busy(method):
+    # Re-run a FleetManagementSystem write from the start if another client holds the lock.
+    # Inside a transaction() block the error is passed up instead, because only the whole
+    # block can be retried safely.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._transaction_depth > 0:
+            return method(self, *args, **kwargs)
+        for delay in backoff_delays():
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as error:
+                if not is_busy_error(error):
+                    raise
+                self.conn.rollback()
+                time.sleep(delay)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Schema migrations. PRAGMA user_version records the last one applied, so a database that
+# is already current skips all DDL on startup. Append new steps to MIGRATIONS; never edit
+# or reorder steps that have shipped.
+
+def _create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vehicles (
+            vehicle_id TEXT PRIMARY KEY,
+            make TEXT,
+            model TEXT,
+            year INTEGER,
+            status TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vehicle_id TEXT,
+            date TEXT,
+            description TEXT,
+            completed INTEGER,
+            FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS call_schedules (
+            call_id TEXT PRIMARY KEY,
+            customer_name TEXT,
+            date TEXT,
+            time TEXT,
+            job_type TEXT,
+            vehicle_id TEXT,
+            FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
+        )
+    ''')
+
+
+def _add_call_job_type(cursor):
+    # Databases created before job types were added (like the shipped fleet_management.db)
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(call_schedules)')]
+    if 'job_type' not in columns:
+        cursor.execute('ALTER TABLE call_schedules ADD COLUMN job_type TEXT')
+
+
+def _create_query_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_date_time ON call_schedules(date, time)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_vehicle ON call_schedules(vehicle_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_maintenance_vehicle ON maintenance(vehicle_id, completed)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vehicles_status ON vehicles(status)')
+
+
+def _add_keyset_indexes(cursor):
+    # Extend the v3 indexes with the primary key so keyset pages are read in index order
+    cursor.execute('DROP INDEX IF EXISTS idx_calls_date_time')
+    cursor.execute('CREATE INDEX idx_calls_date_time ON call_schedules(date, time, call_id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_calls_vehicle')
+    cursor.execute('CREATE INDEX idx_calls_vehicle ON call_schedules(vehicle_id, date, time, call_id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_vehicles_status')
+    cursor.execute('CREATE INDEX idx_vehicles_status ON vehicles(status, vehicle_id)')
+
+
+def _add_table_versions(cursor):
+    # A counter per table, bumped by triggers on every insert, update and delete, so the GUI
+    # can tell which tables another workstation changed without rescanning them
+    cursor.execute('CREATE TABLE table_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+    for table in ('vehicles', 'maintenance', 'call_schedules'):
+        cursor.execute('INSERT INTO table_versions (table_name, version) VALUES (?, 0)', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+
+
+# Primary key of each logged table
+LOGGED_TABLES = {'vehicles': 'vehicle_id', 'maintenance': 'id', 'call_schedules': 'call_id'}
+
+
+def _add_change_log(cursor):
+    # Row-level change log with a monotonic sequence number. row_key has no declared type
+    # so maintenance ids stay integers. The triggers replace the v5 ones and bump
+    # table_versions as well, so each changed row costs one trigger per event.
+    cursor.execute('''
+        CREATE TABLE change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key NOT NULL,
+            operation TEXT NOT NULL CHECK (operation IN ('I', 'U', 'D'))
+        )
+    ''')
+    cursor.execute('CREATE INDEX idx_change_log_row ON change_log(table_name, row_key, seq)')
+    for table, key in LOGGED_TABLES.items():
+        for event in ('insert', 'update', 'delete'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_version_{event}')
+        bump = f"UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';"
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_changes_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, operation) VALUES ('{table}', NEW.{key}, 'I');
+                {bump}
+            END
+        ''')
+        # Changing the primary key is logged as a delete of the old key and an insert of the new
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_changes_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, operation)
+                    SELECT '{table}', OLD.{key}, 'D' WHERE OLD.{key} IS NOT NEW.{key};
+                INSERT INTO change_log (table_name, row_key, operation)
+                    VALUES ('{table}', NEW.{key}, CASE WHEN OLD.{key} IS NEW.{key} THEN 'U' ELSE 'I' END);
+                {bump}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_changes_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, operation) VALUES ('{table}', OLD.{key}, 'D');
+                {bump}
+            END
+        ''')
+
+
+# Service kits and their stock before inventory moved into the database
+DEFAULT_INVENTORY = {
+    "Heating Service Kit": 5,
+    "AC Service Kit": 5,
+    "Plumbing Service Kit": 5,
+    "Drain/Sewer Service Kit": 5,
+    "Electrical Service Kit": 5,
+}
+
+
+def _add_inventory(cursor):
+    # Stock levels shared by every workstation. The CHECK makes a negative count impossible
+    # even if a caller skips the conditional decrement.
+    cursor.execute('''
+        CREATE TABLE inventory (
+            item TEXT PRIMARY KEY,
+            quantity INTEGER NOT NULL CHECK (quantity >= 0)
+        )
+    ''')
+    cursor.executemany('INSERT INTO inventory (item, quantity) VALUES (?, ?)', DEFAULT_INVENTORY.items())
+    # Append-only record of every stock movement: negative for kits used, positive for restocks
+    cursor.execute('''
+        CREATE TABLE inventory_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item TEXT NOT NULL,
+            change INTEGER NOT NULL,
+            call_id TEXT,
+            vehicle_id TEXT,
+            recorded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX idx_inventory_ledger_item ON inventory_ledger(item, id)')
+    for event in ('UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER inventory_ledger_no_{event.lower()} BEFORE {event} ON inventory_ledger
+            BEGIN
+                SELECT RAISE(ABORT, 'inventory_ledger is append-only');
+            END
+        ''')
+    cursor.execute("INSERT INTO table_versions (table_name, version) VALUES ('inventory', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER inventory_version_{event.lower()} AFTER {event} ON inventory
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE table_name = 'inventory';
+            END
+        ''')
+
+
+def _add_call_intervals(cursor):
+    # Each call's slot as minutes after midnight, parsed from the free-text time, so a
+    # vehicle's bookings can be checked for overlaps. Calls whose time can't be read keep
+    # NULLs and take no part in conflict checks.
+    cursor.execute('ALTER TABLE call_schedules ADD COLUMN start_minute INTEGER')
+    cursor.execute('ALTER TABLE call_schedules ADD COLUMN end_minute INTEGER')
+    cursor.execute('SELECT call_id, time FROM call_schedules')
+    slots = []
+    for call_id, time_text in cursor.fetchall():
+        start = minutes_of_day(time_text)
+        if start is not None:
+            slots.append((start, start + CALL_MINUTES, call_id))
+    cursor.executemany('UPDATE call_schedules SET start_minute = ?, end_minute = ? WHERE call_id = ?', slots)
+    cursor.execute('CREATE INDEX idx_calls_vehicle_slot ON call_schedules(vehicle_id, date, start_minute)')
+
+
+def _normalize_dates(cursor):
+    # Rewrite call and maintenance dates as YYYY-MM-DD and call times as HH:MM, so text
+    # order is time order and (date, time) ranges can seek idx_calls_date_time. Values that
+    # can't be read are left as they are and listed in normalization_rejects for review.
+    cursor.execute('''CREATE TABLE normalization_rejects (
+                        table_name TEXT NOT NULL,
+                        row_key TEXT NOT NULL,
+                        column_name TEXT NOT NULL,
+                        value TEXT)''')
+    rejects = []
+    cursor.execute('SELECT call_id, date, time, start_minute, end_minute FROM call_schedules')
+    calls = []
+    for call_id, day, time_text, start_minute, end_minute in cursor.fetchall():
+        iso, start = iso_date(day), minutes_of_day(time_text)
+        if iso is None:
+            rejects.append(('call_schedules', call_id, 'date', day))
+        if start is None:
+            rejects.append(('call_schedules', call_id, 'time', time_text))
+            normalized = (iso or day, time_text, start_minute, end_minute)
+        else:
+            # Keep each call's duration; calls without a slot yet get the default one
+            duration = end_minute - start_minute if None not in (start_minute, end_minute) else CALL_MINUTES
+            normalized = (iso or day, format_minutes(start), start, start + duration)
+        if normalized != (day, time_text, start_minute, end_minute):
+            calls.append(normalized + (call_id,))
+    cursor.executemany('UPDATE call_schedules SET date = ?, time = ?, start_minute = ?, end_minute = ? '
+                       'WHERE call_id = ?', calls)
+    cursor.execute('SELECT id, date FROM maintenance')
+    maintenance = []
+    for maintenance_id, day in cursor.fetchall():
+        iso = iso_date(day)
+        if iso is None:
+            rejects.append(('maintenance', str(maintenance_id), 'date', day))
+        elif iso != day:
+            maintenance.append((iso, maintenance_id))
+    cursor.executemany('UPDATE maintenance SET date = ? WHERE id = ?', maintenance)
+    cursor.executemany('INSERT INTO normalization_rejects VALUES (?, ?, ?, ?)', rejects)
+    cursor.execute('CREATE INDEX idx_maintenance_date ON maintenance(date, id)')
+
+
+def _summary_triggers(cursor, table, summary, keys, counts):
+    # Keep summary in step with table and fill it from the rows already there. keys maps
+    # each summary key column to the table column it groups by (NULL grouped as ''); counts
+    # maps each count column to a 0/1 expression over a row written with {row}, e.g.
+    # '{row}.vehicle_id IS NULL'. A group whose counts all reach zero is deleted.
+    key_columns = ', '.join(keys)
+    count_columns = ', '.join(counts)
+    watched = ', '.join(dict.fromkeys(list(keys.values()) + [column for expression, columns in counts.values()
+                                                               for column in columns]))
+
+    def apply(row, sign):
+        key_values = ', '.join(f"COALESCE({row}.{column}, '')" for column in keys.values())
+        count_values = ', '.join(f"{sign}({expression.format(row=row)})" for expression, _ in counts.values())
+        additions = ', '.join(f'{column} = {column} + excluded.{column}' for column in counts)
+        matches = ' AND '.join(f"{key} = COALESCE({row}.{column}, '')" for key, column in keys.items())
+        empty = ' AND '.join(f'{column} = 0' for column in counts)
+        return f'''
+            INSERT INTO {summary} ({key_columns}, {count_columns}) VALUES ({key_values}, {count_values})
+                ON CONFLICT ({key_columns}) DO UPDATE SET {additions};
+            DELETE FROM {summary} WHERE {matches} AND {empty};'''
+
+    cursor.execute(f'''
+        CREATE TRIGGER {summary}_insert AFTER INSERT ON {table}
+        BEGIN{apply('NEW', '+')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER {summary}_update AFTER UPDATE OF {watched} ON {table}
+        BEGIN{apply('OLD', '-')}{apply('NEW', '+')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER {summary}_delete AFTER DELETE ON {table}
+        BEGIN{apply('OLD', '-')}
+        END
+    ''')
+    groups = ', '.join(f"COALESCE({column}, '')" for column in keys.values())
+    sums = [f"SUM({expression.format(row=table)})" for expression, _ in counts.values()]
+    cursor.execute(f'''
+        INSERT INTO {summary} ({key_columns}, {count_columns})
+        SELECT {groups}, {', '.join(sums)} FROM {table} GROUP BY {groups}
+        HAVING {' OR '.join(f'{total} <> 0' for total in sums)}
+    ''')
+
+
+def _add_dashboard_summaries(cursor):
+    # Running counts behind the dashboard KPIs, kept current by triggers so reading them
+    # never scans the history: vehicles per status, open and assigned calls per day and job
+    # type, and incomplete maintenance per vehicle and date
+    cursor.execute('''
+        CREATE TABLE vehicle_status_counts (
+            status TEXT PRIMARY KEY,
+            vehicles INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    _summary_triggers(cursor, 'vehicles', 'vehicle_status_counts', {'status': 'status'},
+                      {'vehicles': ('1', ())})
+    cursor.execute('''
+        CREATE TABLE call_day_counts (
+            date TEXT NOT NULL,
+            job_type TEXT NOT NULL,
+            open_calls INTEGER NOT NULL,
+            assigned_calls INTEGER NOT NULL,
+            PRIMARY KEY (date, job_type)
+        ) WITHOUT ROWID
+    ''')
+    _summary_triggers(cursor, 'call_schedules', 'call_day_counts', {'date': 'date', 'job_type': 'job_type'},
+                      {'open_calls': ('{row}.vehicle_id IS NULL', ('vehicle_id',)),
+                       'assigned_calls': ('{row}.vehicle_id IS NOT NULL', ('vehicle_id',))})
+    cursor.execute('''
+        CREATE TABLE open_maintenance_counts (
+            vehicle_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            PRIMARY KEY (vehicle_id, date)
+        ) WITHOUT ROWID
+    ''')
+    _summary_triggers(cursor, 'maintenance', 'open_maintenance_counts', {'vehicle_id': 'vehicle_id', 'date': 'date'},
+                      {'records': ('NOT COALESCE({row}.completed, 0)', ('completed',))})
+
+
+# Full-text indexes: (index, table, rowid column, indexed columns)
+SEARCH_INDEXES = [
+    ('call_search', 'call_schedules', 'rowid', ('customer_name', 'job_type')),
+    ('maintenance_search', 'maintenance', 'id', ('description',)),
+]
+
+
+def _add_search_indexes(cursor):
+    # FTS5 indexes over customer names, job types and maintenance descriptions. They are
+    # external-content tables, holding only the index and reading text back from the base
+    # table by rowid, and triggers keep them in step. call_schedules has no INTEGER PRIMARY
+    # KEY, so a VACUUM could renumber its rowids; rebuild_search_indexes() after one.
+    # Porter stemming lets "furnaces" find "furnace"; prefix indexes keep as-you-type
+    # queries like "hend*" fast.
+    for index, table, rowid, columns in SEARCH_INDEXES:
+        column_list = ', '.join(columns)
+        old_values = ', '.join(f'OLD.{column}' for column in columns)
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {index} USING fts5({column_list}, content='{table}', content_rowid='{rowid}',
+                                                   tokenize='porter unicode61', prefix='2 3')
+        ''')
+        remove = f"INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', OLD.{rowid}, {old_values});"
+        add = f"INSERT INTO {index} (rowid, {column_list}) VALUES (NEW.{rowid}, {new_values});"
+        cursor.execute(f'CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN {add} END')
+        cursor.execute(f'CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN {remove} END')
+        cursor.execute(f'CREATE TRIGGER {index}_update AFTER UPDATE OF {column_list} ON {table} '
+                       f'BEGIN {remove} {add} END')
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _add_call_job_type),
+    (3, _create_query_indexes),
+    (4, _add_keyset_indexes),
+    (5, _add_table_versions),
+    (6, _add_change_log),
+    (7, _add_inventory),
+    (8, _add_call_intervals),
+    (9, _normalize_dates),
+    (10, _add_dashboard_summaries),
+    (11, _add_search_indexes),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def normalization_rejects(conn):
+    # [(table_name, row_key, column_name, value)] the date migration couldn't read
+    return conn.execute('SELECT table_name, row_key, column_name, value FROM normalization_rejects '
+                        'ORDER BY table_name, row_key, column_name').fetchall()
+
+
+def migrate(conn):
+    # Bring the database up to SCHEMA_VERSION. Returns the versions that were applied.
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    applied = []
+    cursor = conn.cursor()
+    for version, step in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        # Each step runs in its own write transaction. The version is re-read after taking
+        # the lock in case another workstation upgraded the file at the same time.
+        execute_with_retry(cursor, 'BEGIN IMMEDIATE')
+        try:
+            if schema_version(conn) < version:
+                step(cursor)
+                cursor.execute(f'PRAGMA user_version = {version}')
+                applied.append(version)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
+
+
+def rebuild_search_indexes(conn):
+    # Re-read every full-text index from its table
+    for index, _, _, _ in SEARCH_INDEXES:
+        conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+def search_expression(text):
+    # An FTS5 query matching rows that contain every word of text, the last one also as a
+    # prefix so results appear while typing; a whole-word match of it scores higher. Words are
+    # quoted, so punctuation and FTS keywords (AND, NEAR, ...) in what the user typed are
+    # matched literally. None if text has no words.
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    *complete, last = words
+    return ' AND '.join([f'"{word}"' for word in complete] + [f'("{last}" OR "{last}"*)'])
+
+
+def query_plan(conn, sql, params=()):
+    # The detail column of EXPLAIN QUERY PLAN, e.g. ['SEARCH vehicles USING INDEX idx_vehicles_status (status=?)']
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
@@ -0,0 +1,199 @@
+# Batch dispatch: match every open call on a day to a vehicle free at that time, at the
+# lowest total cost, instead of a dispatcher picking one vehicle per call by hand.
+#
+# The cost of giving call i to vehicle j is built as a NumPy matrix and solved as an
+# assignment problem (Hungarian algorithm). SciPy's linear_sum_assignment is used when it
+# is installed; otherwise a NumPy implementation of the same algorithm runs instead.
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+# Cost of a pairing that must not happen (vehicle already booked then, in maintenance, ...).
+# Finite so the solver always finishes; such pairs are dropped from the result.
+INFEASIBLE = 1e9
+
+DISPATCH_WEIGHTS = {
+    "slot": 1.0,           # per hour after midnight, so earlier calls win when vehicles run short
+    "new_job_type": 4.0,   # the vehicle has never been sent on this job type
+    "load": 2.0,           # per call the vehicle already has that day
+    "distance": 1.0,       # per mile, when distances are supplied
+}
+
+
+def kit_for_job(job_type):
+    # The inventory kit a call of this job type uses, e.g. "AC" -> "AC Service Kit"
+    return f"{job_type} Service Kit"
+
+
+class DispatchPlan:
+    def __init__(self):
+        self.assignments = []   # (call_id, vehicle_id, kit)
+        self.unassigned = []    # (call_id, reason)
+        self.total_cost = 0.0
+
+    def __repr__(self):
+        return f"DispatchPlan(assigned={len(self.assignments)}, unassigned={len(self.unassigned)})"
+
+
+# Build the (calls x vehicles) cost matrix.
+# calls: [(call_id, job_type, start, end)] in minutes after midnight, None when unknown
+# vehicles: [vehicle_id]
+# bookings: {vehicle_id: [(start, end) of calls it already has that day]}
+# history: {(vehicle_id, job_type): number of past calls}
+# distance: optional (calls x vehicles) array of miles
+def build_cost_matrix(calls, vehicles, bookings=None, history=None, distance=None, weights=None):
+    weights = dict(DISPATCH_WEIGHTS, **(weights or {}))
+    bookings = bookings or {}
+    history = history or {}
+    starts = np.array([start for call_id, job_type, start, end in calls], dtype=float)
+    ends = np.array([end for call_id, job_type, start, end in calls], dtype=float)
+    # Calls without a readable time go last and skip the overlap check
+    timed = ~np.isnan(starts)
+    order_minutes = np.where(timed, starts, 24 * 60)
+    cost = np.repeat((weights["slot"] * order_minutes / 60)[:, None], len(vehicles), axis=1)
+
+    job_types = sorted({job_type for call_id, job_type, start, end in calls})
+    type_index = np.array([job_types.index(job_type) for call_id, job_type, start, end in calls], dtype=int)
+    experienced = np.zeros((len(job_types), len(vehicles)), dtype=bool)
+    for j, vehicle_id in enumerate(vehicles):
+        for t, job_type in enumerate(job_types):
+            experienced[t, j] = history.get((vehicle_id, job_type), 0) > 0
+    cost += weights["new_job_type"] * ~experienced[type_index]
+
+    for j, vehicle_id in enumerate(vehicles):
+        booked = bookings.get(vehicle_id, ())
+        if not booked:
+            continue
+        cost[:, j] += weights["load"] * len(booked)
+        clash = np.zeros(len(calls), dtype=bool)
+        for booked_start, booked_end in booked:
+            clash |= (starts < booked_end) & (ends > booked_start)
+        cost[clash, j] = INFEASIBLE
+
+    if distance is not None:
+        cost += weights["distance"] * np.asarray(distance, dtype=float)
+    return np.minimum(cost, INFEASIBLE)
+
+
+def solve_assignment(cost):
+    # Rows and columns of a minimum-cost matching with min(rows, columns) pairs
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    if cost.shape[0] > cost.shape[1]:
+        cols, rows = _hungarian(cost.T)
+    else:
+        rows, cols = _hungarian(cost)
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def _hungarian(cost):
+    # Shortest augmenting path Hungarian algorithm with potentials, O(n^2 m), for n <= m.
+    # Each step of the inner loop is one vectorized pass over the columns.
+    n, m = cost.shape
+    # Start from each row's cheapest cost and greedily match rows whose cheapest column is
+    # still free; dispatch costs have many ties, so this settles most rows up front
+    u = np.concatenate(([0.0], cost.min(axis=1)))
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=int)   # match[j]: row (1-based) matched to column j, 0 if free
+    way = np.zeros(m + 1, dtype=int)
+    unmatched = []
+    for i in range(1, n + 1):
+        tight = np.flatnonzero((cost[i - 1] == u[i]) & (match[1:] == 0))
+        if len(tight):
+            match[tight[0] + 1] = i
+        else:
+            unmatched.append(i)
+    for i in unmatched:
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used
+            free[0] = False
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free[1:], minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            if match[j1]:
+                # Among equally cheap columns take an unmatched one, which ends the search
+                open_ties = np.flatnonzero((candidates == delta) & (match[1:] == 0))
+                if len(open_ties):
+                    j1 = int(open_ties[0]) + 1
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    cols = np.nonzero(match[1:])[0]
+    return match[1:][cols] - 1, cols
+
+
+# Work out which vehicle takes which call. stock is {kit: quantity}; when a job type has
+# more calls than kits, its earliest calls are the ones considered.
+#
+# Each solve gives a vehicle at most one call, so the matching is repeated in rounds: the
+# calls placed in one round are added to their vehicles' bookings, and the next round
+# matches the calls still open against them, so the clash check and the load cost see
+# them. A vehicle can end up with several calls that don't overlap. A call with no
+# readable time can't be checked for clashes, so it is only placed in the first round.
+def plan_dispatch(calls, vehicles, stock, bookings=None, history=None, distance=None, weights=None):
+    plan = DispatchPlan()
+    remaining = dict(stock)
+    keep = []
+    for index in sorted(range(len(calls)), key=lambda i: 24 * 60 if calls[i][2] is None else calls[i][2]):
+        call_id, job_type, start, end = calls[index]
+        kit = kit_for_job(job_type)
+        if remaining.get(kit, 0) > 0:
+            remaining[kit] -= 1
+            keep.append(index)
+        else:
+            plan.unassigned.append((call_id, f"no {kit} in stock"))
+    keep.sort()
+    kept_calls = [calls[i] for i in keep]
+    if distance is not None:
+        distance = np.asarray(distance, dtype=float)[keep]
+
+    bookings = {vehicle_id: list(booked) for vehicle_id, booked in (bookings or {}).items()}
+    open_rows = list(range(len(kept_calls)))
+    while open_rows:
+        round_calls = [kept_calls[row] for row in open_rows]
+        round_distance = None if distance is None else distance[open_rows]
+        cost = build_cost_matrix(round_calls, vehicles, bookings, history, round_distance, weights)
+        rows, cols = solve_assignment(cost)
+        placed = set()
+        for row, col in zip(rows, cols):
+            if cost[row, col] >= INFEASIBLE:
+                continue
+            call_id, job_type, start, end = round_calls[row]
+            plan.assignments.append((call_id, vehicles[col], kit_for_job(job_type)))
+            plan.total_cost += float(cost[row, col])
+            placed.add(open_rows[row])
+            if start is not None:
+                bookings.setdefault(vehicles[col], []).append((start, end))
+        if not placed:
+            break
+        open_rows = [row for row in open_rows if row not in placed and kept_calls[row][2] is not None]
+    assigned = {call_id for call_id, vehicle_id, kit in plan.assignments}
+    for call_id, job_type, start, end in kept_calls:
+        if call_id not in assigned:
+            plan.unassigned.append((call_id, "no vehicle free"))
+    return plan
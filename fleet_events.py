@@ -0,0 +1,88 @@
+# Live updates for the Fleet Management GUI
+#
+# ChangeWatcher notices commits from any connection, including other workstations, and
+# ChangeFeed tells every view of a changed table to refresh. One cheap check serves all
+# views instead of each view polling the database.
+
+
+# Local publish/subscribe keyed by table name
+class ChangeFeed:
+    def __init__(self):
+        self.subscribers = {}
+
+    def subscribe(self, table, callback):
+        self.subscribers.setdefault(table, []).append(callback)
+
+    def unsubscribe(self, table, callback):
+        if callback in self.subscribers.get(table, []):
+            self.subscribers[table].remove(callback)
+
+    def publish(self, tables):
+        for table in tables:
+            for callback in list(self.subscribers.get(table, [])):
+                callback()
+
+
+# Polls for changes on the database worker every interval_ms. Each check compares
+# PRAGMA data_version (bumped by other connections' commits) and the worker connection's
+# own total_changes, which costs no I/O, and only when one moved reads the per-table
+# counters kept by triggers to find out which tables changed.
+class ChangeWatcher:
+    def __init__(self, root, worker, feed, interval_ms=400):
+        self.root = root
+        self.worker = worker
+        self.feed = feed
+        self.interval_ms = interval_ms
+        self.timer = None
+        self.checking = False
+        self.check_again = False
+        # Only touched on the worker thread
+        self.last_marker = None
+        self.last_versions = None
+
+    def start(self):
+        if self.timer is None:
+            self.timer = self.root.after(self.interval_ms, self.tick)
+
+    def stop(self):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def tick(self):
+        self.timer = self.root.after(self.interval_ms, self.tick)
+        self.check_now()
+
+    # Check straight away, e.g. right after this workstation saved something. Only one
+    # check is in flight at a time; a request made meanwhile runs once it finishes.
+    def check_now(self):
+        if self.checking:
+            self.check_again = True
+            return
+        self.checking = True
+        self.worker.submit(self.find_changes, quiet=True, on_done=self.on_changes, on_error=self.on_error)
+
+    def on_changes(self, tables):
+        self.checking = False
+        self.feed.publish(tables)
+        if self.check_again:
+            self.check_again = False
+            self.check_now()
+
+    def on_error(self, error):
+        # Try again on the next tick (e.g. the database was locked for too long)
+        self.checking = False
+
+    # Runs on the worker thread
+    def find_changes(self, fleet_system):
+        marker = fleet_system.change_marker()
+        if marker == self.last_marker:
+            return []
+        self.last_marker = marker
+        versions = fleet_system.table_versions()
+        if self.last_versions is None:
+            self.last_versions = versions
+            return []
+        changed = [table for table, version in versions.items() if self.last_versions.get(table) != version]
+        self.last_versions = versions
+        return changed
@@ -0,0 +1,103 @@
+# Bulk import for the fleet database
+# python fleet_import.py vehicles roster.csv
+# python fleet_import.py calls calls.jsonl --db fleet_management.db
+
+import argparse
+import csv
+import json
+import sys
+
+from fleet_core import BULK_CHUNK_SIZE, CallSchedule, FleetManagementSystem, Maintenance, Vehicle
+from fleet_schedule import CALL_MINUTES
+
+
+# Stream rows as dicts from a CSV file (with a header row) or a JSON-lines file
+def read_rows(path, file_format=None):
+    if file_format is None:
+        file_format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _blank_to_none(value):
+    return value if value not in ("", None) else None
+
+
+def vehicle_from_row(row):
+    return Vehicle(row["vehicle_id"], row["make"], row["model"], int(row["year"]),
+                   row.get("status") or "Available")
+
+
+def call_schedule_from_row(row):
+    duration = _blank_to_none(row.get("duration"))
+    return CallSchedule(row["call_id"], row["customer_name"], row["date"], row["time"],
+                        row["job_type"], _blank_to_none(row.get("vehicle_id")),
+                        int(duration) if duration is not None else CALL_MINUTES)
+
+
+def maintenance_from_row(row):
+    maintenance = Maintenance(row["date"], row["description"])
+    if str(row.get("completed", "")).strip().lower() in ("1", "true", "yes"):
+        maintenance.complete_maintenance()
+    return row["vehicle_id"], maintenance
+
+
+TABLES = {
+    "vehicles": (vehicle_from_row, "add_vehicles_bulk"),
+    "calls": (call_schedule_from_row, "add_call_schedules_bulk"),
+    "maintenance": (maintenance_from_row, "add_maintenance_records_bulk"),
+}
+
+
+# Stand-in for a row that couldn't be parsed; the bulk method reports it as a failed row
+class _InvalidRow:
+    def __init__(self, row, error):
+        self.row = row
+        self.error = error
+
+    def __getattr__(self, name):
+        raise ValueError(f"invalid row: {self.error!r}")
+
+    def __iter__(self):
+        raise ValueError(f"invalid row: {self.error!r}")
+
+    def __repr__(self):
+        return repr(self.row)
+
+
+# Convert rows lazily so the whole file is never held in memory
+def _objects(rows, from_row):
+    for row in rows:
+        try:
+            yield from_row(row)
+        except (KeyError, TypeError, ValueError) as error:
+            yield _InvalidRow(row, error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import vehicles, call schedules or maintenance records.")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="CSV file with a header row, or a .jsonl file")
+    parser.add_argument("--db", default="fleet_management.db")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from_row, method_name = TABLES[args.table]
+    fleet_system = FleetManagementSystem(args.db)
+    rows = read_rows(args.path, args.format)
+    result = getattr(fleet_system, method_name)(_objects(rows, from_row), args.chunk_size)
+
+    for index, record, error in result.failures:
+        print(f"row {index + 1}: {error}", file=sys.stderr)
+    print(f"Imported {result.inserted} {args.table} row(s), {len(result.failures)} failed.")
+    return 1 if result.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
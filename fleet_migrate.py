@@ -0,0 +1,36 @@
+# Upgrade a fleet database to the current schema and list any rows whose dates or times
+# couldn't be normalized, so they can be fixed by hand
+# python fleet_migrate.py --db fleet_management.db
+
+import argparse
+import sys
+
+from fleet_db import SCHEMA_VERSION, connect, migrate, normalization_rejects, schema_version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upgrade a fleet database and report unreadable dates and times.")
+    parser.add_argument("--db", default="fleet_management.db")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    before = schema_version(conn)
+    applied = migrate(conn)
+    if applied:
+        print(f"{args.db}: upgraded from version {before} to {SCHEMA_VERSION} "
+              f"(applied {', '.join(map(str, applied))})")
+    else:
+        print(f"{args.db}: already at version {schema_version(conn)}")
+    rejects = normalization_rejects(conn)
+    conn.close()
+    if not rejects:
+        print("Every date and time was read.")
+        return 0
+    print(f"{len(rejects)} value(s) could not be read and were left as they are:")
+    for table_name, row_key, column_name, value in rejects:
+        print(f"  {table_name} {row_key}: {column_name} = {value!r}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Call time slots: parsing the times dispatchers type, and a per-vehicle, per-day index of
+# booked intervals for conflict checks and free-window lookups
+
+import bisect
+import re
+from datetime import date, datetime
+
+# Minutes a call takes when no duration is given
+CALL_MINUTES = 120
+
+# Working day used for free-window lookups, in minutes after midnight
+DAY_START = 7 * 60
+DAY_END = 19 * 60
+
+_TIME = re.compile(r'^\s*(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*([ap])?\.?\s*m?\.?\s*$', re.IGNORECASE)
+
+# Date formats accepted besides ISO, e.g. from a DateEntry without date_pattern
+_DATE_FORMATS = ("%Y/%m/%d", "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%d.%m.%Y", "%B %d, %Y", "%b %d, %Y", "%d %B %Y")
+
+
+def minutes_of_day(text):
+    # Minutes after midnight for the free-text times dispatchers type ("9:00", "14:30",
+    # "2pm", "2:15 PM"); None when the text isn't a time
+    match = _TIME.match(text or '')
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or '').lower()
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'p' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def format_minutes(minutes):
+    # Minutes after midnight as HH:MM, which sorts as text in time order
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def iso_date(value):
+    # YYYY-MM-DD for a date, a datetime or text in a known format; None when unreadable
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value or '').strip()
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        pass
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_date(value):
+    # iso_date, raising ValueError when the date can't be read
+    day = iso_date(value)
+    if day is None:
+        raise ValueError(f"Can't read the date {value!r}; enter it like 2024-06-01.")
+    return day
+
+
+def date_and_time(value):
+    # (YYYY-MM-DD, HH:MM) for a datetime, a date (midnight) or text like "2024-06-01T14:30"
+    if isinstance(value, datetime):
+        return value.date().isoformat(), format_minutes(value.hour * 60 + value.minute)
+    if isinstance(value, date):
+        return value.isoformat(), "00:00"
+    day, _, clock = str(value).strip().replace('T', ' ').partition(' ')
+    day = iso_date(day)
+    minutes = minutes_of_day(clock) if clock.strip() else 0
+    if day is None or minutes is None:
+        raise ValueError(f"Can't read {value!r} as a date and time; use e.g. 2024-06-01T14:30.")
+    return day, format_minutes(minutes)
+
+
+# One vehicle's bookings on one day as parallel lists sorted by start. Bookings made
+# through the index never overlap, but bulk imports and migrated rows can, so max_ends[i]
+# keeps the latest end among bookings 0..i: a long booking that contains a later one still
+# shows up there, and the scan back from a candidate stops as soon as nothing earlier can
+# reach it.
+class DaySchedule:
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        self.call_ids = []
+        for start, end, call_id in sorted(intervals):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.call_ids.append(call_id)
+        self.max_ends = []
+        self._update_max_ends(0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _update_max_ends(self, position):
+        # Recompute max_ends from position on after an insert or delete there
+        del self.max_ends[position:]
+        latest = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[position:]:
+            latest = end if latest is None else max(latest, end)
+            self.max_ends.append(latest)
+
+    def conflict(self, start, end, ignore=None):
+        # call_id of a booking that overlaps [start, end), or None. Every booking starting
+        # before end is a candidate; walk back from the last one until none can reach start.
+        index = bisect.bisect_left(self.starts, end) - 1
+        while index >= 0 and self.max_ends[index] > start:
+            if self.ends[index] > start and self.call_ids[index] != ignore:
+                return self.call_ids[index]
+            index -= 1
+        return None
+
+    def add(self, start, end, call_id):
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.call_ids.insert(position, call_id)
+        self._update_max_ends(position)
+
+    def remove(self, call_id):
+        if call_id in self.call_ids:
+            index = self.call_ids.index(call_id)
+            del self.starts[index], self.ends[index], self.call_ids[index]
+            self._update_max_ends(index)
+
+    def free_windows(self, day_start=DAY_START, day_end=DAY_END, min_minutes=0):
+        # (start, end) gaps between bookings inside [day_start, day_end)
+        windows = []
+        cursor = day_start
+        first = bisect.bisect_right(self.max_ends, day_start)
+        for index in range(first, len(self.starts)):
+            if self.starts[index] >= day_end:
+                break
+            if self.starts[index] - cursor >= max(min_minutes, 1):
+                windows.append((cursor, self.starts[index]))
+            cursor = max(cursor, self.ends[index])
+        if day_end - cursor >= max(min_minutes, 1):
+            windows.append((cursor, day_end))
+        return windows
+
+
+# DaySchedules keyed by (vehicle_id, date), loaded on first use with
+# load(vehicle_id, date) -> [(start, end, call_id)]. The owner keeps it in step with its
+# own writes and calls invalidate() when the database may have changed underneath it.
+class IntervalIndex:
+    def __init__(self, load):
+        self.load = load
+        self.days = {}
+        self.call_days = {}   # call_id -> (vehicle_id, date) for calls in a loaded day
+
+    def day(self, vehicle_id, date):
+        key = (vehicle_id, date)
+        schedule = self.days.get(key)
+        if schedule is None:
+            schedule = self.days[key] = DaySchedule(self.load(vehicle_id, date))
+            for call_id in schedule.call_ids:
+                self.call_days[call_id] = key
+        return schedule
+
+    def conflict(self, vehicle_id, date, start, end, ignore=None):
+        return self.day(vehicle_id, date).conflict(start, end, ignore)
+
+    def add(self, vehicle_id, date, start, end, call_id):
+        self.day(vehicle_id, date).add(start, end, call_id)
+        self.call_days[call_id] = (vehicle_id, date)
+
+    def remove(self, call_id):
+        key = self.call_days.pop(call_id, None)
+        if key is not None and key in self.days:
+            self.days[key].remove(call_id)
+
+    def invalidate(self):
+        self.days = {}
+        self.call_days = {}
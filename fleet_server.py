@@ -0,0 +1,109 @@
+# Read-only JSON over HTTP for the fleet database; needs only fleet_core, not the GUI
+# python fleet_server.py --db fleet_management.db --port 8080
+#
+#     GET /kpis?today=2024-06-01
+#     GET /vehicles?status=Available&after=V0200
+#     GET /calls?start=2024-06-01&end=2024-06-08T12:00
+#     GET /search?q=oil+change&limit=20
+#     GET /query-stats        per-statement SQL timings, with --query-stats
+#
+# Requests are handled one at a time on a single connection, which is plenty for an office
+# and keeps the connection on the thread that opened it.
+
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from fleet_core import PAGE_SIZE, SEARCH_LIMIT, FleetManagementSystem
+
+
+def get_kpis(fleet_system, query):
+    return fleet_system.dashboard_kpis(query.get('today'))
+
+
+def get_vehicles(fleet_system, query):
+    # One page at a time; pass the returned "next" back as after= for the page after it
+    filters = {'status': query['status']} if 'status' in query else None
+    after = (query['after'],) if 'after' in query else None
+    rows, next_key = fleet_system.get_vehicles_page(after, int(query.get('limit', PAGE_SIZE)), filters)
+    return {'rows': rows, 'next': next_key[0] if next_key else None}
+
+
+def get_calls(fleet_system, query):
+    return fleet_system.calls_between(query['start'], query['end'])
+
+
+def get_search(fleet_system, query):
+    return fleet_system.search(query.get('q', ''), int(query.get('limit', SEARCH_LIMIT)))
+
+
+def get_query_stats(fleet_system, query):
+    # The parameters of slow queries are left out; they may hold customer details
+    return {'statements': fleet_system.query_stats(),
+            'slow': [{'sql': sql, 'ms': ms, 'plan': plan} for sql, params, ms, plan in fleet_system.slow_queries()]}
+
+
+ROUTES = {'/kpis': get_kpis, '/vehicles': get_vehicles, '/calls': get_calls, '/search': get_search,
+          '/query-stats': get_query_stats}
+
+
+class FleetRequestHandler(BaseHTTPRequestHandler):
+    fleet_system = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            self.send_json(404, {'error': f"No such resource: {url.path}"})
+            return
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            self.send_json(200, route(self.fleet_system, query))
+        except KeyError as error:
+            self.send_json(400, {'error': f"Missing parameter: {error.args[0]}"})
+        except ValueError as error:
+            self.send_json(400, {'error': str(error)})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(db_name, host='127.0.0.1', port=8080, slow_ms=None):
+    # With slow_ms, time every statement and log those taking at least slow_ms
+    fleet_system = FleetManagementSystem(db_name)
+    if slow_ms is not None:
+        fleet_system.enable_query_stats(slow_ms)
+    handler = type('Handler', (FleetRequestHandler,), {'fleet_system': fleet_system})
+    return HTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the fleet database as read-only JSON.")
+    parser.add_argument("--db", default="fleet_management.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--query-stats", type=float, metavar="SLOW_MS",
+                        help="time every SQL statement and log those taking at least SLOW_MS")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.db, args.host, args.port, args.query_stats)
+    print(f"Serving {args.db} on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.fleet_system.conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
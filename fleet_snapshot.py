@@ -0,0 +1,458 @@
+# Columnar snapshot of the fleet for analytics: every vehicle, call and maintenance record
+# held as NumPy column arrays, so fleet-wide questions are vectorized array operations
+# instead of Python loops over fetched tuples.
+#
+#     snapshot = fleet_system.snapshot("fleet_snapshot")     # loads, refreshes, saves
+#     calls = snapshot.join(snapshot.calls, 'status', 'make')
+#     heating = calls.where(job_type="Heating") & calls.between('date', "2024-06-01", "2024-06-30")
+#     calls.count_by('vehicle_make', heating)                 # {"Ford": 312, ...}
+#     calls.sum_by(('vehicle_id', 'job_type'), calls['end_minute'] - calls['start_minute'], heating)
+#
+# Text columns are dictionary-encoded: the column holds int32 codes into a Dictionary of
+# the distinct values, with -1 for NULL. vehicle_id shares one Dictionary across all three
+# tables, so joining on it is integer indexing. Dates are int32 days since 1970-01-01 and
+# other integers int32, both with NULL_INT for NULL.
+#
+# refresh() applies change_log entries since the last refresh, re-reading only the rows
+# they name. save() writes each array to its own .npy file and the dictionaries as
+# NUL-separated UTF-8 buffers with offsets; load() memory-maps them, so a script starts
+# without reading the tables or decoding a string it doesn't use.
+
+import json
+import os
+from datetime import date
+
+import numpy as np
+
+from fleet_core import BULK_CHUNK_SIZE
+
+NULL_INT = np.iinfo(np.int32).min
+FETCH_ROWS = 50000
+# Reload a table outright rather than replay more pending changes than this share of its rows
+RELOAD_FRACTION = 0.5
+CACHE_FORMAT = 1
+MANIFEST = "snapshot.json"
+
+# Per table: its key column and (column, kind), where kind is 'int', 'date' or the name of
+# the Dictionary a text column is encoded with
+TABLES = {
+    'vehicles': ('vehicle_id', [('vehicle_id', 'vehicle_id'), ('make', 'make'), ('model', 'model'),
+                                ('year', 'int'), ('status', 'status')]),
+    'call_schedules': ('call_id', [('call_id', 'call_id'), ('customer_name', 'customer_name'), ('date', 'date'),
+                                   ('start_minute', 'int'), ('end_minute', 'int'), ('job_type', 'job_type'),
+                                   ('vehicle_id', 'vehicle_id')]),
+    'maintenance': ('id', [('id', 'int'), ('vehicle_id', 'vehicle_id'), ('date', 'date'),
+                           ('description', 'description'), ('completed', 'int')]),
+}
+
+
+def day_number(text):
+    # Days since 1970-01-01 of an ISO date, or NULL_INT if it is missing or unreadable
+    try:
+        return (date.fromisoformat(text) - date(1970, 1, 1)).days
+    except (TypeError, ValueError):
+        return NULL_INT
+
+
+def day_numbers(values):
+    days = np.array(values, dtype=object)
+    try:
+        stamps = days.astype('datetime64[D]')
+    except ValueError:
+        return np.array([day_number(value) for value in values], dtype=np.int32)
+    numbers = stamps.astype(np.int64)
+    numbers[np.isnat(stamps)] = NULL_INT
+    return numbers.astype(np.int32)
+
+
+class Dictionary:
+    # The distinct values of a text column, each stored once and numbered in the order
+    # first seen. Loaded from a cache it stays a UTF-8 buffer with offsets until a value has
+    # to be looked up by its text.
+    def __init__(self, values=()):
+        # value -> code in code order, after None -> -1, so a new value's code is len - 1
+        self._codes = {None: -1}
+        self._values = None
+        self._data = self._offsets = None
+        self.encode(list(values))
+
+    @classmethod
+    def from_buffer(cls, data, offsets):
+        dictionary = cls()
+        dictionary._codes = None
+        dictionary._data, dictionary._offsets = data, offsets
+        return dictionary
+
+    def __len__(self):
+        return len(self._offsets) - 1 if self._codes is None else len(self._codes) - 1
+
+    def codes(self):
+        if self._codes is None:
+            count = len(self)
+            values = self._data.tobytes().decode('utf-8').split('\0') if count else []
+            if len(values) != count:
+                # Some value holds a NUL itself, so split on the offsets instead
+                text, offsets = self._data.tobytes(), self._offsets.tolist()
+                values = [text[start:end - 1].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+            self._codes = {None: -1}
+            self._codes.update(zip(values, range(count)))
+            self._values = values
+            self._data = self._offsets = None
+        return self._codes
+
+    def values(self):
+        codes = self.codes()
+        if self._values is None or len(self._values) != len(codes) - 1:
+            self._values = list(codes)[1:]
+        return self._values
+
+    def lookup(self, value):
+        # The code of value, or -1 if no row has it (so comparing with it matches nothing)
+        return self.codes().get(value, -1)
+
+    def encode(self, values):
+        # int32 codes for values, numbering the ones not seen before
+        codes = self.codes()
+        setdefault = codes.setdefault
+        return np.array([setdefault(value, len(codes) - 1) for value in values], dtype=np.int32)
+
+    def decode(self, codes):
+        codes = codes.tolist()
+        if self._codes is None:
+            # Only the values asked for are decoded
+            text, offsets = self._data.tobytes(), self._offsets
+            return [None if code < 0 else text[offsets[code]:offsets[code + 1] - 1].decode('utf-8') for code in codes]
+        values = self.values()
+        return [None if code < 0 else values[code] for code in codes]
+
+    def to_buffer(self):
+        if self._codes is None:
+            return self._data, self._offsets
+        # NUL-separated, so load() can split the lot in one go; offsets[code] is where the
+        # value starts and offsets[code + 1] - 1 where it ends
+        encoded = [value.encode('utf-8') for value in self.values()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) + 1 for value in encoded], out=offsets[1:])
+        return np.frombuffer(b'\0'.join(encoded), dtype=np.uint8), offsets
+
+
+class ColumnTable:
+    # One table's rows as column arrays, in no particular order. table['status'] is the raw
+    # array (codes for text columns); the query methods take and return values as text.
+    def __init__(self, name, key, kinds, dictionaries, columns=None):
+        self.name = name
+        self.key = key
+        self.kinds = dict(kinds)
+        self.dictionaries = dictionaries
+        self.columns = columns if columns is not None else {
+            column: np.empty(0, dtype=np.int32) for column in self.kinds}
+        self._index = None
+
+    def __len__(self):
+        return len(self.columns[self.key])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def encode(self, column, value):
+        # The value as stored in column: a code, a day number or the int itself
+        kind = self.kinds[column]
+        if kind == 'int':
+            return NULL_INT if value is None else value
+        if kind == 'date':
+            return NULL_INT if value is None else day_number(value)
+        return self.dictionaries[kind].lookup(value)
+
+    def decode(self, column, values):
+        kind = self.kinds[column]
+        if kind == 'int':
+            return [None if value == NULL_INT else value for value in values.tolist()]
+        if kind == 'date':
+            return [None if value == NULL_INT else date.fromordinal(value + 719163).isoformat()
+                    for value in values.tolist()]
+        return self.dictionaries[kind].decode(values)
+
+    def where(self, **conditions):
+        # Rows where every column equals its value, or one of them for a list, tuple or set
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in conditions.items():
+            if isinstance(value, (list, tuple, set, frozenset)):
+                mask &= np.isin(self.columns[column], [self.encode(column, item) for item in value])
+            else:
+                mask &= self.columns[column] == self.encode(column, value)
+        return mask
+
+    def between(self, column, first, last):
+        # Rows whose int or date column is first through last inclusive (NULL never is)
+        values = self.columns[column]
+        first, last = self.encode(column, first), self.encode(column, last)
+        return (values >= first) & (values <= last) & (values != NULL_INT)
+
+    def count_by(self, columns, mask=None):
+        # {value: rows} for the rows in mask, NULL counted under None; see sum_by
+        return self.sum_by(columns, None, mask)
+
+    def sum_by(self, columns, weights=None, mask=None):
+        # {value: total of weights} (a row count without weights) for the rows in mask. With
+        # a tuple of columns the keys are tuples of values, e.g. ('Ford', 'Heating').
+        names = [columns] if isinstance(columns, str) else list(columns)
+        values = [self.columns[column] if mask is None else self.columns[column][mask] for column in names]
+        if weights is not None:
+            weights = (weights if mask is None else weights[mask]).astype(np.float64)
+        if len(names) == 1 and self.kinds[names[0]] not in ('int', 'date'):
+            # Codes are small non-negative ints once NULL (-1) is moved to 0
+            present = np.nonzero(np.bincount(values[0] + 1))[0]
+            totals = np.bincount(values[0] + 1, weights)[present]
+            keys = self.decode(names[0], present - 1)
+        else:
+            # Number each column's distinct values, then each combination that occurs
+            distinct, inverses = zip(*(np.unique(column, return_inverse=True) for column in values))
+            sizes = [len(column) for column in distinct]
+            combined = np.ravel_multi_index(inverses, sizes) if len(names) > 1 else inverses[0]
+            present, inverse = np.unique(combined, return_inverse=True)
+            totals = np.bincount(inverse, weights, minlength=len(present))
+            decoded = [self.decode(column, groups[at])
+                       for column, groups, at in zip(names, distinct, np.unravel_index(present, sizes))]
+            keys = decoded[0] if len(names) == 1 else list(zip(*decoded))
+        totals = totals.tolist() if weights is not None else [int(total) for total in totals]
+        return dict(zip(keys, totals))
+
+    def rows(self, mask=None, columns=None):
+        # The rows in mask as tuples of values, e.g. to show the result of a query
+        columns = columns or list(self.kinds)
+        decoded = [self.decode(column, self.columns[column] if mask is None else self.columns[column][mask])
+                   for column in columns]
+        return list(zip(*decoded))
+
+    def positions(self, keys):
+        # Where each stored key value is, -1 where it isn't in the table. A dictionary-encoded
+        # key is looked up in an array indexed by code, which makes joining on vehicle_id one
+        # gather; int keys are binary-searched.
+        stored = self.columns[self.key]
+        if self._index is None:
+            if self.kinds[self.key] in ('int', 'date'):
+                order = np.argsort(stored, kind='stable')
+                self._index = (stored[order], order)
+            else:
+                # Shifted by one so NULL (-1) lands on a slot of its own
+                index = np.full(len(self.dictionaries[self.kinds[self.key]]) + 1, -1, dtype=np.int64)
+                index[stored + 1] = np.arange(len(stored))
+                self._index = index
+        if isinstance(self._index, np.ndarray):
+            # Codes numbered after the index was built belong to no row here
+            slots = keys.astype(np.int64) + 1
+            inside = slots < len(self._index)
+            return np.where(inside, self._index[np.where(inside, slots, 0)], -1)
+        sorted_keys, order = self._index
+        if not len(sorted_keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        return np.where(sorted_keys[found] == keys, order[found], -1)
+
+    def encode_rows(self, rows):
+        # Column arrays for rows fetched in self.kinds order
+        values = list(zip(*rows)) if rows else [()] * len(self.kinds)
+        columns = {}
+        for (column, kind), column_values in zip(self.kinds.items(), values):
+            if kind == 'int':
+                columns[column] = np.array([NULL_INT if value is None else value for value in column_values],
+                                           dtype=np.int32)
+            elif kind == 'date':
+                columns[column] = day_numbers(column_values)
+            else:
+                columns[column] = self.dictionaries[kind].encode(column_values)
+        return columns
+
+    def replace(self, columns):
+        self.columns = columns
+        self._index = None
+
+    def upsert(self, columns):
+        # Overwrite rows whose key is already here, append the rest
+        at = self.positions(columns[self.key])
+        present = at >= 0
+        for column, values in columns.items():
+            stored = self.columns[column]
+            if not stored.flags.writeable:
+                stored = self.columns[column] = stored.copy()
+            stored[at[present]] = values[present]
+        if not present.all():
+            self.replace({column: np.concatenate((self.columns[column], values[~present]))
+                          for column, values in columns.items()})
+
+    def delete(self, keys):
+        at = self.positions(keys)
+        at = at[at >= 0]
+        if len(at):
+            keep = np.ones(len(self), dtype=bool)
+            keep[at] = False
+            self.replace({column: values[keep] for column, values in self.columns.items()})
+
+
+class FleetSnapshot:
+    def __init__(self):
+        self.dictionaries = {}
+        self.tables = {}
+        for table, (key, kinds) in TABLES.items():
+            for column, kind in kinds:
+                if kind not in ('int', 'date'):
+                    self.dictionaries.setdefault(kind, Dictionary())
+            self.tables[table] = ColumnTable(table, key, kinds, self.dictionaries)
+        # The database file and change_log position this snapshot reflects (None until it is
+        # first loaded), and the cache generation it was loaded from
+        self.source = None
+        self.seq = None
+        self.generation = 0
+
+    @property
+    def vehicles(self):
+        return self.tables['vehicles']
+
+    @property
+    def calls(self):
+        return self.tables['call_schedules']
+
+    @property
+    def maintenance(self):
+        return self.tables['maintenance']
+
+    def join(self, table, *columns):
+        # table with the named vehicles columns of each row's vehicle added as vehicle_<column>
+        # (NULL where the row has no vehicle or it no longer exists). The arrays are shared,
+        # not copied.
+        vehicles = self.vehicles
+        at = vehicles.positions(table['vehicle_id'])
+        found = at >= 0
+        joined = ColumnTable(table.name, table.key, table.kinds, self.dictionaries, dict(table.columns))
+        for column in columns:
+            kind = vehicles.kinds[column]
+            values = np.full(len(table), NULL_INT if kind in ('int', 'date') else -1, dtype=np.int32)
+            values[found] = vehicles[column][at[found]]
+            joined.kinds[f'vehicle_{column}'] = kind
+            joined.columns[f'vehicle_{column}'] = values
+        return joined
+
+    def refresh(self, fleet_system):
+        # Bring every table up to date with the database; returns the number of rows re-read.
+        # A snapshot of another database file, or of this one before it was restored from an
+        # older copy, is read again from scratch.
+        source = _database_file(fleet_system)
+        latest = fleet_system.latest_change_seq()
+        if latest == self.seq and source == self.source:
+            return 0
+        if (self.seq is None or source != self.source or latest < self.seq
+                or latest - self.seq > RELOAD_FRACTION * max(len(table) for table in self.tables.values())):
+            self.source, self.seq = source, latest
+            return sum(self._reload(fleet_system, table) for table in self.tables)
+        changed = {table: set() for table in self.tables}
+        for seq, table, operation, key, row in fleet_system.changes_since(self.seq):
+            changed[table].add(key)
+            self.seq = seq
+        return sum(self._apply(fleet_system, table, keys) for table, keys in changed.items() if keys)
+
+    def _select(self, table):
+        key, kinds = TABLES[table]
+        return f"SELECT {', '.join(column for column, kind in kinds)} FROM {table}"
+
+    def _reload(self, fleet_system, table):
+        cursor = fleet_system.conn.cursor()
+        cursor.execute(self._select(table))
+        target = self.tables[table]
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            chunks.append(target.encode_rows(rows))
+        target.replace({column: np.concatenate([chunk[column] for chunk in chunks]) if chunks
+                        else np.empty(0, dtype=np.int32) for column in target.kinds})
+        return len(target)
+
+    def _apply(self, fleet_system, table, keys):
+        # Re-read the changed rows; the ones that are gone were deleted
+        target = self.tables[table]
+        keys = list(keys)
+        cursor = fleet_system.conn.cursor()
+        rows = []
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[start:start + BULK_CHUNK_SIZE]
+            cursor.execute(f"{self._select(table)} WHERE {target.key} IN ({', '.join('?' * len(chunk))})", chunk)
+            rows.extend(cursor.fetchall())
+        key_index = list(target.kinds).index(target.key)
+        present = {row[key_index] for row in rows}
+        if rows:
+            target.upsert(target.encode_rows(rows))
+        gone = [key for key in keys if key not in present]
+        if gone:
+            target.delete(np.array([target.encode(target.key, key) for key in gone], dtype=np.int32))
+        return len(rows)
+
+    def save(self, directory):
+        # Write the snapshot as .npy files under a new generation number, then point the
+        # manifest at them. Older generations are removed where the OS allows; a file that
+        # is still memory-mapped (Windows) is left for the next save.
+        os.makedirs(directory, exist_ok=True)
+        manifest = _read_manifest(directory)
+        generation = max(self.generation, manifest['generation'] if manifest else 0) + 1
+        files = {}
+
+        def write(name, array):
+            files[name] = f"{name}.{generation}.npy"
+            np.save(os.path.join(directory, files[name]), array)
+
+        for name, dictionary in self.dictionaries.items():
+            data, offsets = dictionary.to_buffer()
+            write(f"dictionary.{name}.data", data)
+            write(f"dictionary.{name}.offsets", offsets)
+        for table, columns in self.tables.items():
+            for column, values in columns.columns.items():
+                write(f"{table}.{column}", values)
+        path = os.path.join(directory, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({'format': CACHE_FORMAT, 'generation': generation, 'source': self.source, 'seq': self.seq,
+                       'files': files}, f)
+        os.replace(path + ".tmp", path)
+        self.generation = generation
+        for name in os.listdir(directory):
+            if name.endswith(".npy") and name not in files.values():
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, directory):
+        # The snapshot saved in directory, memory-mapped copy-on-write: nothing is read until
+        # it is used, and changes stay in memory. ValueError if there is no usable cache.
+        manifest = _read_manifest(directory)
+        if manifest is None or manifest.get('format') != CACHE_FORMAT:
+            raise ValueError(f"No fleet snapshot in {directory}")
+        files = manifest['files']
+        try:
+            arrays = {name: np.load(os.path.join(directory, file), mmap_mode='c') for name, file in files.items()}
+        except OSError as error:
+            raise ValueError(f"Fleet snapshot in {directory} is incomplete: {error}")
+        snapshot = cls()
+        for name in snapshot.dictionaries:
+            snapshot.dictionaries[name] = Dictionary.from_buffer(arrays[f"dictionary.{name}.data"],
+                                                                 arrays[f"dictionary.{name}.offsets"])
+        for table, target in snapshot.tables.items():
+            target.replace({column: arrays[f"{table}.{column}"] for column in target.kinds})
+        snapshot.source = manifest['source']
+        snapshot.seq = manifest['seq']
+        snapshot.generation = manifest['generation']
+        return snapshot
+
+
+def _database_file(fleet_system):
+    cursor = fleet_system.conn.cursor()
+    cursor.execute('PRAGMA database_list')
+    return next(os.path.realpath(path) if path else path for _, name, path in cursor.fetchall() if name == 'main')
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,238 @@
+# Timing for the Fleet Management GUI: milestones from login until the window is usable,
+# and how long each Tk callback holds the mainloop
+
+import threading
+import time
+import tkinter
+from collections import deque
+
+
+# Records named milestones as milliseconds since it was created. The report lists them in
+# the order they happened, e.g.
+#     Startup timing (ms after login)
+#         12.4  dashboard built
+#         31.0  interactive
+class StartupTimer:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.marks = []
+
+    def mark(self, name):
+        elapsed = (self.clock() - self.started) * 1000
+        self.marks.append((elapsed, name))
+        return elapsed
+
+    def elapsed(self, name):
+        # Milliseconds at the first milestone called name, or None if it hasn't happened
+        for elapsed, mark in self.marks:
+            if mark == name:
+                return elapsed
+        return None
+
+    def report(self):
+        lines = ["Startup timing (ms after login)"]
+        lines.extend(f"    {elapsed:8.1f}  {name}" for elapsed, name in sorted(self.marks))
+        return "\n".join(lines)
+
+
+# Mainloop stall detector: a timer rescheduled every STALL_TICK_MS; when it fires at least
+# STALL_MS late, something held the mainloop for that long
+STALL_TICK_MS = 50
+STALL_MS = 100
+STALLS_KEPT = 200
+
+
+def callback_name(func):
+    # "FleetManagementApp.refresh_dashboard" for a method; lambdas and nested functions keep
+    # the method they were written in, e.g. "FleetManagementApp.assign_vehicle_popup.<locals>
+    # .assign_vehicle". after() registers a wrapper around the real callback, so look inside.
+    code = getattr(func, '__code__', None)
+    if code is not None and code.co_name == 'callit' and 'func' in code.co_freevars:
+        func = func.__closure__[code.co_freevars.index('func')].cell_contents
+    return getattr(func, '__qualname__', None) or type(func).__qualname__
+
+
+class CallbackStats:
+    def __init__(self):
+        self.count = 0
+        self.wall_ms = 0.0
+        self.max_ms = 0.0
+        self.tk_ms = 0.0
+        self.sql_ms = 0.0
+
+
+class _Frame:
+    def __init__(self, name, path, started):
+        self.name = name
+        self.path = path
+        self.started = started
+        self.tk_ms = 0.0
+        self.child_ms = 0.0
+
+
+# Stands in for a Tk root's tkapp, so the root and every widget made from it afterwards
+# time their Tcl calls
+class _TimedTkapp:
+    def __init__(self, tkapp, profiler):
+        self._tkapp = tkapp
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+    def call(self, *args):
+        return self._profiler.time_tk(self._tkapp.call, *args)
+
+    def eval(self, script):
+        return self._profiler.time_tk(self._tkapp.eval, script)
+
+
+class _TimedCallWrapper(tkinter.CallWrapper):
+    profiler = None
+
+    def __call__(self, *args):
+        if self.profiler is None:
+            return super().__call__(*args)
+        return self.profiler.timed(callback_name(self.func), super().__call__, *args)
+
+
+# How long each Tk callback holds the mainloop. install() wraps every callback Tk makes into
+# Python from then on (button commands, bindings, after() timers, variable traces) and splits
+# its time into Tcl calls (widget updates, dialogs), other callbacks run inside it (e.g.
+# while a popup waits) and Python. The DatabaseWorker reports the jobs each callback submits
+# as that callback's SQL time; they run on the worker thread, so they don't block the window
+# but show what the click cost.
+#
+# Redraws happen when Tk is next idle, after the callback has returned, so they only show
+# up as stalls. write() saves the profile as collapsed stacks, one "frame;frame;frame
+# microseconds" line per stack, which flamegraph.pl and speedscope read.
+class CallbackProfiler:
+    def __init__(self, clock=time.perf_counter, stall_ms=STALL_MS, tick_ms=STALL_TICK_MS):
+        self.clock = clock
+        self.stall_ms = stall_ms
+        self.tick_ms = tick_ms
+        self.started = clock()
+        self.callbacks = {}
+        self.stacks = {}
+        # (seconds since started, ms late, slowest callback since the tick before)
+        self.stalls = deque(maxlen=STALLS_KEPT)
+        self.frames = []
+        self.slowest = None
+        self.last_tick = None
+        self.roots = []
+        # The worker thread reports SQL time while the Tk thread is recording callbacks
+        self.lock = threading.Lock()
+
+    def install(self, *roots):
+        # Call as soon as the Tk roots exist; only widgets and callbacks made afterwards are
+        # timed. The stall ticker runs on the first root.
+        for root in roots:
+            if not isinstance(root.tk, _TimedTkapp):
+                root.tk = _TimedTkapp(root.tk, self)
+                self.roots.append(root)
+        _TimedCallWrapper.profiler = self
+        tkinter.CallWrapper = _TimedCallWrapper
+        # Registered on the plain tkapp, so the ticker itself is neither a callback nor Tk time
+        tkapp = roots[0].tk._tkapp
+        tkapp.createcommand('fleet_stall_tick', self._tick)
+        self.last_tick = self.clock()
+        tkapp.call('after', self.tick_ms, 'fleet_stall_tick')
+
+    def uninstall(self):
+        tkinter.CallWrapper = _TimedCallWrapper.__base__
+        _TimedCallWrapper.profiler = None
+        for root in self.roots:
+            root.tk = root.tk._tkapp
+        if self.roots:
+            tkapp = self.roots[0].tk
+            tkapp.call('after', 'cancel', 'fleet_stall_tick')
+            tkapp.deletecommand('fleet_stall_tick')
+        self.roots = []
+
+    def timed(self, name, func, *args):
+        # func(*args) as a callback called name, nested in whichever callback is running
+        path = f"{self.frames[-1].path};{name}" if self.frames else name
+        frame = _Frame(name, path, self.clock())
+        self.frames.append(frame)
+        try:
+            return func(*args)
+        finally:
+            self.frames.pop()
+            self._record(frame, (self.clock() - frame.started) * 1000)
+
+    def time_tk(self, func, *args):
+        if not self.frames:
+            return func(*args)
+        frame = self.frames[-1]
+        child_ms = frame.child_ms
+        started = self.clock()
+        try:
+            return func(*args)
+        finally:
+            # A popup's wait_window runs other callbacks inside this call; they count as theirs
+            frame.tk_ms += (self.clock() - started) * 1000 - (frame.child_ms - child_ms)
+
+    def current(self):
+        # (name, stack) of the running callback, or None between callbacks
+        return (self.frames[-1].name, self.frames[-1].path) if self.frames else None
+
+    def record_sql(self, origin, job_name, ms):
+        # A worker job submitted by the callback current() returned (None: outside one)
+        name, path = origin or ("(no callback)", "(no callback)")
+        with self.lock:
+            self.callbacks.setdefault(name, CallbackStats()).sql_ms += ms
+            key = f"[db worker];{path};{job_name}"
+            self.stacks[key] = self.stacks.get(key, 0.0) + ms
+
+    def _record(self, frame, wall_ms):
+        with self.lock:
+            stats = self.callbacks.setdefault(frame.name, CallbackStats())
+            stats.count += 1
+            stats.wall_ms += wall_ms
+            stats.max_ms = max(stats.max_ms, wall_ms)
+            stats.tk_ms += frame.tk_ms
+            self.stacks[frame.path] = self.stacks.get(frame.path, 0.0) + wall_ms - frame.child_ms - frame.tk_ms
+            if frame.tk_ms:
+                key = f"{frame.path};[tk]"
+                self.stacks[key] = self.stacks.get(key, 0.0) + frame.tk_ms
+        if self.frames:
+            self.frames[-1].child_ms += wall_ms
+        elif self.slowest is None or wall_ms > self.slowest[0]:
+            self.slowest = (wall_ms, frame.name)
+
+    def _tick(self):
+        now = self.clock()
+        late_ms = (now - self.last_tick) * 1000 - self.tick_ms
+        if late_ms >= self.stall_ms:
+            self.stalls.append((now - self.started, late_ms, self.slowest[1] if self.slowest else None))
+        self.slowest = None
+        self.last_tick = now
+        self.roots[0].tk._tkapp.call('after', self.tick_ms, 'fleet_stall_tick')
+
+    def summary(self):
+        # [(name, CallbackStats)], longest total wall time first
+        with self.lock:
+            return sorted(self.callbacks.items(), key=lambda item: item[1].wall_ms, reverse=True)
+
+    def report(self, limit=20):
+        lines = ["Tk callbacks (ms)", f"    {'count':>6} {'total':>9} {'max':>8} {'tk':>9} {'worker sql':>10}  callback"]
+        for name, stats in self.summary()[:limit]:
+            lines.append(f"    {stats.count:6} {stats.wall_ms:9.1f} {stats.max_ms:8.1f} {stats.tk_ms:9.1f} "
+                         f"{stats.sql_ms:10.1f}  {name}")
+        lines.append(f"Mainloop stalls of {self.stall_ms:.0f} ms or more: {len(self.stalls)}")
+        lines.extend(f"    {at:8.1f} s  {late_ms:8.1f} ms  {name or '(between callbacks)'}"
+                     for at, late_ms, name in self.stalls)
+        return "\n".join(lines)
+
+    def write(self, path):
+        # Collapsed stacks in microseconds; the stalls are a stack of their own
+        with self.lock:
+            stacks = dict(self.stacks)
+        for at, late_ms, name in self.stalls:
+            key = f"[stall];{name or '(between callbacks)'}"
+            stacks[key] = stacks.get(key, 0.0) + late_ms
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, ms in sorted(stacks.items()):
+                if round(ms * 1000) > 0:
+                    f.write(f"{stack} {round(ms * 1000)}\n")
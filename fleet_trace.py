@@ -0,0 +1,212 @@
+# Per-statement SQL timing for a fleet database connection, off until switched on:
+#     fleet_system.enable_query_stats(slow_ms=50)
+#     ...
+#     fleet_system.query_stats()    # [{sql, count, total_ms, p50_ms, ...}], most time first
+#     fleet_system.slow_queries()   # [(sql, params, ms, plan)], oldest first
+#
+# fleet_db.connect opens every connection as a TracingConnection. While its query_stats is
+# None, cursor() hands out ordinary sqlite3 cursors, so switched off it costs one Python
+# call per cursor. Switched on, each statement is timed from execute() until its last row
+# is fetched, the cursor runs another statement, or the cursor is closed or dropped.
+# Statements slower than slow_ms are logged to the "fleet.sql" logger with their
+# EXPLAIN QUERY PLAN; logging is only imported once there is one to log.
+
+import math
+import re
+import sqlite3
+import time
+from collections import deque
+
+SLOW_QUERY_MS = 100.0
+# Latencies kept per statement for the percentiles; count, total and rows cover every run
+LATENCY_SAMPLES = 1000
+SLOW_QUERIES_KEPT = 50
+
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+def normalize_sql(sql):
+    # One key per statement shape: whitespace collapsed and IN (?, ?, ...) lists of any
+    # length counted together
+    return _PLACEHOLDER_LIST.sub('?, ...', ' '.join(sql.split()))
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list, or None if it is empty
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def explain(conn, sql, params):
+    # EXPLAIN QUERY PLAN lines for sql, indented by depth; [] if it can't be explained
+    try:
+        cursor = sqlite3.Connection.cursor(conn)
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in cursor.fetchall():
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node] + detail)
+        return lines
+    except sqlite3.Error:
+        return []
+
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, ms, rows):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+        self.samples.append(ms)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        return {'sql': self.sql, 'count': self.count, 'total_ms': self.total_ms,
+                'p50_ms': percentile(samples, 0.50), 'p95_ms': percentile(samples, 0.95),
+                'p99_ms': percentile(samples, 0.99), 'max_ms': self.max_ms, 'rows': self.rows}
+
+
+class QueryStats:
+    def __init__(self, slow_ms=SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self.statements = {}
+        self.slow = deque(maxlen=SLOW_QUERIES_KEPT)
+
+    def record(self, conn, sql, params, ms, rows):
+        key = normalize_sql(sql)
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = StatementStats(key)
+        stats.add(ms, rows)
+        if self.slow_ms is not None and ms >= self.slow_ms:
+            plan = explain(conn, sql, params) if params is not None else []
+            self.slow.append((key, params, ms, plan))
+            import logging
+            # The parameters may hold customer details, so they stay out of the log
+            logging.getLogger("fleet.sql").warning("slow query (%.1f ms): %s%s", ms, key,
+                                                   ''.join(f'\n    {line}' for line in plan))
+
+    def summary(self):
+        return sorted((stats.summary() for stats in self.statements.values()),
+                      key=lambda summary: summary['total_ms'], reverse=True)
+
+    def reset(self):
+        self.statements.clear()
+        self.slow.clear()
+
+
+class TracingCursor(sqlite3.Cursor):
+    _stats = None
+    _sql = None
+    _params = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self._start(sql, None)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _start(self, sql, parameters):
+        self._stats = self.connection.query_stats
+        if self._stats is not None:
+            self._sql = sql
+            self._params = parameters
+            self._elapsed = 0.0
+            self._rows = 0
+
+    def _fetched(self, started, rows, done):
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - started
+            self._rows += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        self._stats.record(self.connection, sql, self._params, self._elapsed * 1000, self._rows)
+
+
+class TracingConnection(sqlite3.Connection):
+    # A QueryStats while statements are being timed, otherwise None
+    query_stats = None
+
+    def cursor(self, factory=None):
+        if factory is not None:
+            return super().cursor(factory)
+        if self.query_stats is None:
+            return super().cursor()
+        return super().cursor(TracingCursor)
+
+    # The shortcuts make their cursor without calling cursor()
+    def execute(self, sql, parameters=()):
+        if self.query_stats is None:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.query_stats is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,301 @@
+# Treeview helpers for the Fleet Management GUI
+
+import bisect
+from tkinter import ttk
+
+
+# Work out what changed between two snapshots of a table.
+# old and new map key -> row; new_order is the keys of new in display order.
+# Returns (inserts, updates, deletes, reordered) where inserts is a list of
+# (position, key) and updates a list of keys whose row values changed.
+def compute_delta(old, new, old_order, new_order):
+    deletes = [key for key in old_order if key not in new]
+    inserts = []
+    updates = []
+    for position, key in enumerate(new_order):
+        if key not in old:
+            inserts.append((position, key))
+        elif old[key] != new[key]:
+            updates.append(key)
+    kept_old = [key for key in old_order if key in new]
+    kept_new = [key for key in new_order if key in old]
+    return inserts, updates, deletes, kept_old != kept_new
+
+
+# Keeps a ttk.Treeview in step with query results using each row's primary key as the
+# Treeview iid. Each refresh only touches the rows that were added, changed or removed,
+# so an unchanged table costs no Tk calls and the user's selection and scroll position
+# survive the refresh.
+class KeyedTreeBinder:
+    def __init__(self, tree, key_index=0):
+        self.tree = tree
+        self.key_index = key_index
+        self.rows = {}
+        self.order = []
+
+    def __len__(self):
+        return len(self.order)
+
+    def iid(self, row):
+        return str(row[self.key_index])
+
+    def keys(self):
+        return list(self.order)
+
+    # Replace the contents of the tree with rows, applying only the difference
+    def apply(self, rows):
+        new = {}
+        new_order = []
+        for row in rows:
+            iid = self.iid(row)
+            new[iid] = tuple(row)
+            new_order.append(iid)
+        inserts, updates, deletes, reordered = compute_delta(self.rows, new, self.order, new_order)
+
+        if deletes:
+            self.tree.delete(*deletes)
+        for iid in updates:
+            self.tree.item(iid, values=new[iid])
+        if reordered:
+            # Rare (a sort column was edited); move the surviving rows into their new places
+            kept = [iid for iid in new_order if iid in self.rows]
+            for position, iid in enumerate(kept):
+                self.tree.move(iid, '', position)
+        for position, iid in inserts:
+            self.tree.insert('', position, iid=iid, values=new[iid])
+
+        self.rows = new
+        self.order = new_order
+        return len(inserts), len(updates), len(deletes)
+
+    # Add rows after the ones already shown, e.g. the next page of a paged query
+    def extend(self, rows):
+        for row in rows:
+            iid = self.iid(row)
+            if iid in self.rows:
+                continue
+            self.rows[iid] = tuple(row)
+            self.order.append(iid)
+            self.tree.insert('', 'end', iid=iid, values=row)
+
+    def clear(self):
+        self.tree.delete(*self.order)
+        self.rows = {}
+        self.order = []
+
+
+# A Treeview that can page through a table of any size. Only the rows that fit on screen
+# are in the Treeview; a buffer of rows either side is kept in memory and refilled from
+# the database as the user scrolls. The scrollbar is driven by the row count, not by the
+# Treeview's contents. Queries run on the DatabaseWorker, so the window keeps responding
+# while a page loads.
+#
+#     view = VirtualTreeview(frame, columns, worker,
+#                            FleetManagementSystem.get_calls_page, FleetManagementSystem.count_calls)
+#
+# get_page(fleet_system, after_key=, limit=, offset=, descending=) returns (rows, next_key)
+# and count(fleet_system) the number of rows; both run on the worker thread.
+class VirtualTreeview(ttk.Frame):
+    BUFFER_ROWS = 200   # rows kept in memory above and below the visible window
+    ROW_HEIGHT = 20     # used until the style reports one
+
+    def __init__(self, parent, columns, worker, get_page, count, key_index=0, **tree_options):
+        super().__init__(parent)
+        self.worker = worker
+        self.get_page = get_page
+        self.count = count
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side="left", expand=True, fill="both")
+        self.scrollbar.pack(side="right", fill="y")
+        self.binder = KeyedTreeBinder(self.tree, key_index)
+
+        self.total = 0
+        self.top = 0
+        self.visible = int(self.tree.cget("height"))
+        self.buffer_start = 0
+        self.buffer = []
+        self.buffer_next_key = None
+        # Known keys by row position, so a jump can seek from the nearest one instead of
+        # skipping from the start of the table
+        self.anchors = {}
+        self.anchor_positions = []
+        # Bumped whenever the buffer is thrown away, so late pages from before are ignored
+        self.generation = 0
+        self.render_pending = False
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Down>", lambda event: self.on_arrow(1))
+        self.tree.bind("<Up>", lambda event: self.on_arrow(-1))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.visible) or "break")
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.visible) or "break")
+
+    # Re-read the row count and the visible rows, e.g. after the table was changed
+    def refresh(self):
+        self.worker.submit(self.count, key=(self, "count"), on_done=self.on_count)
+
+    # Show a row count and first page (rows, next_key) read earlier, e.g. prefetched before
+    # this view was built, instead of asking the worker for them again
+    def show_first_page(self, total, page):
+        rows, next_key = page
+        self.generation += 1
+        self.total = total
+        self.top = 0
+        self.anchors = {}
+        self.anchor_positions = []
+        self.buffer_start = 0
+        self.buffer = list(rows)
+        self.buffer_next_key = next_key
+        self.add_anchor(len(rows) - 1, next_key)
+        self.render()
+
+    def on_count(self, total):
+        self.generation += 1
+        self.total = total
+        self.buffer = []
+        self.buffer_next_key = None
+        self.anchors = {}
+        self.anchor_positions = []
+        self.top = max(0, min(self.top, self.total - self.visible))
+        self.render()
+
+    def scroll(self, rows):
+        top = max(0, min(self.top + rows, self.total - self.visible))
+        if top != self.top:
+            self.top = top
+            self.schedule_render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = max(0, min(int(float(amount) * self.total), self.total - self.visible))
+            self.schedule_render()
+        elif unit == "pages":
+            self.scroll(int(amount) * self.visible)
+        else:
+            self.scroll(int(amount))
+
+    def on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-3 * step)
+        return "break"
+
+    def on_arrow(self, direction):
+        # Move the selection past the edge of the window by scrolling one row
+        children = self.tree.get_children()
+        if not children:
+            return None
+        edge = children[-1] if direction > 0 else children[0]
+        if self.tree.focus() != edge:
+            return None
+        self.scroll(direction)
+        self.render()
+        children = self.tree.get_children()
+        if children:
+            new_focus = children[-1] if direction > 0 else children[0]
+            self.tree.focus(new_focus)
+            self.tree.selection_set(new_focus)
+        return "break"
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or self.ROW_HEIGHT)
+        # Leave room for the heading row
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.top = max(0, min(self.top, self.total - self.visible))
+            self.schedule_render()
+
+    def schedule_render(self):
+        # Coalesce bursts of scroll events into one redraw
+        if not self.render_pending:
+            self.render_pending = True
+            self.after_idle(self.render)
+
+    # Show rows [top, top + visible) if they are buffered, otherwise ask for them; the
+    # current rows stay on screen until the page arrives
+    def render(self):
+        self.render_pending = False
+        end = min(self.top + self.visible, self.total)
+        if self.total:
+            self.scrollbar.set(self.top / self.total, end / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+        buffer_end = self.buffer_start + len(self.buffer)
+        if end > self.top and not (self.buffer_start <= self.top and end <= buffer_end):
+            self.request_rows(self.top, end)
+            return
+        start = self.top - self.buffer_start
+        self.binder.apply(self.buffer[start:start + end - self.top])
+
+    def request_rows(self, start, end):
+        want_start = max(0, start - self.BUFFER_ROWS)
+        want_end = min(self.total, end + self.BUFFER_ROWS)
+        buffer_end = self.buffer_start + len(self.buffer)
+        generation = self.generation
+
+        if self.buffer and self.buffer_start <= start <= buffer_end and self.buffer_next_key is not None:
+            # Scrolling down: continue from the last key in the buffer
+            limit = want_end - buffer_end
+            self.worker.submit(self.get_page, key=(self, "rows"), after_key=self.buffer_next_key, limit=limit,
+                               on_done=lambda page: self.on_more_rows(page, generation, want_start, limit))
+            return
+
+        limit = want_end - want_start
+        index = bisect.bisect_left(self.anchor_positions, want_start) - 1
+        anchor = self.anchor_positions[index] if index >= 0 else -1
+        from_end = self.total - want_end
+        if from_end < want_start - anchor - 1:
+            # Nearer the end of the table than any known key: read backwards from the end
+            query = dict(limit=limit, offset=from_end, descending=True)
+        elif anchor >= 0:
+            query = dict(after_key=self.anchors[anchor], limit=limit, offset=want_start - anchor - 1)
+        else:
+            query = dict(limit=limit, offset=want_start)
+        self.worker.submit(self.get_page, key=(self, "rows"), **query,
+                           on_done=lambda page: self.on_rows(page, generation, want_start, limit,
+                                                             query.get("descending", False)))
+
+    def on_more_rows(self, page, generation, want_start, limit):
+        if generation != self.generation:
+            return
+        rows, next_key = page
+        self.buffer.extend(rows)
+        self.buffer_next_key = next_key
+        self.add_anchor(self.buffer_start + len(self.buffer) - 1, next_key)
+        # Drop rows that have scrolled well out of view
+        drop = want_start - self.buffer_start
+        if drop > 0:
+            del self.buffer[:drop]
+            self.buffer_start += drop
+        self.after_page(len(rows) < limit)
+
+    def on_rows(self, page, generation, want_start, limit, descending):
+        if generation != self.generation:
+            return
+        rows, next_key = page
+        if descending:
+            rows.reverse()
+            self.add_anchor(want_start, next_key)
+            next_key = None
+        else:
+            self.add_anchor(want_start + len(rows) - 1, next_key)
+        self.buffer_start = want_start
+        self.buffer = rows
+        self.buffer_next_key = next_key
+        self.after_page(len(rows) < limit)
+
+    def after_page(self, short):
+        if short:
+            # Another workstation removed rows since the count was taken
+            self.refresh()
+        else:
+            self.render()
+
+    def add_anchor(self, position, key):
+        if key is not None and position not in self.anchors:
+            self.anchors[position] = key
+            bisect.insort(self.anchor_positions, position)
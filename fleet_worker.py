@@ -0,0 +1,168 @@
+# Background database worker for the Fleet Management GUI
+#
+# Tk isn't thread safe and SQL on the Tk thread freezes the window, so every query goes
+# through one worker thread that owns its own FleetManagementSystem (and connection).
+# Results are handed back through a queue that the Tk thread drains with after(), and
+# callbacks always run on the Tk thread.
+
+import queue
+import threading
+import time
+
+from fleet_timing import callback_name
+
+
+class Job:
+    def __init__(self, func, args, kwargs, on_done, on_error, key, quiet=False):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.key = key
+        self.quiet = quiet
+        self.cancelled = False
+        # The Tk callback that submitted the job, when a CallbackProfiler is recording
+        self.origin = None
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DatabaseWorker:
+    POLL_MS = 15
+
+    # root is any Tk widget (used for after()); make_system is called on the worker thread
+    # to open its FleetManagementSystem. on_busy(bool) runs when work starts or finishes,
+    # e.g. to show a loading indicator. With a fleet_timing.CallbackProfiler, each job's time
+    # is reported as SQL time of the callback that submitted it, and result handlers are
+    # timed like Tk callbacks.
+    def __init__(self, root, make_system, on_busy=None, on_error=None, profiler=None):
+        self.root = root
+        self.make_system = make_system
+        self.on_busy = on_busy
+        self.on_error = on_error
+        self.profiler = profiler
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.latest = {}
+        self.pending = 0
+        self.busy = 0
+        self.polling = False
+        self.fleet_system = None
+        self.thread = threading.Thread(target=self._run, name="fleet-db-worker", daemon=True)
+        self.thread.start()
+
+    # Run func(fleet_system, *args, **kwargs) on the worker thread, then on_done(result)
+    # on the Tk thread. Submitting a job with the same key as an earlier one cancels the
+    # earlier one, so a burst of refreshes only delivers the newest result. Quiet jobs
+    # (background polling) don't switch on the loading indicator.
+    def submit(self, func, *args, on_done=None, on_error=None, key=None, quiet=False, **kwargs):
+        job = Job(func, args, kwargs, on_done, on_error, key, quiet)
+        if self.profiler is not None:
+            job.origin = self.profiler.current()
+        if key is not None:
+            previous = self.latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self.latest[key] = job
+        self.pending += 1
+        if not quiet:
+            self.busy += 1
+            if self.busy == 1 and self.on_busy:
+                self.on_busy(True)
+        self.requests.put(job)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return job
+
+    def cancel(self, key):
+        job = self.latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def stop(self, timeout=2.0):
+        self.requests.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        try:
+            self.fleet_system = self.make_system()
+        except Exception as error:
+            # The database couldn't be opened (a locked file, a bad path, a failed
+            # migration): every job gets that error instead of waiting for ever
+            import logging
+            logging.getLogger("fleet.worker").error("could not open the database", exc_info=True)
+            self._fail_jobs(error)
+            return
+        while True:
+            job = self.requests.get()
+            if job is None:
+                break
+            if job.cancelled:
+                self.results.put((job, None, None))
+                continue
+            started = time.perf_counter()
+            try:
+                result = job.func(self.fleet_system, *job.args, **job.kwargs)
+                self.results.put((job, result, None))
+            except Exception as error:
+                # ValueErrors are the user's mistakes (a clashing slot, no stock) and reach
+                # them through the error callback; anything else is also logged with its
+                # traceback, as a bug
+                if not isinstance(error, ValueError):
+                    import logging
+                    logging.getLogger("fleet.worker").error("database job %s failed", callback_name(job.func),
+                                                            exc_info=True)
+                # A failed write leaves its implicit transaction (and write lock) open
+                if self.fleet_system.conn.in_transaction:
+                    self.fleet_system.conn.rollback()
+                self.results.put((job, None, error))
+            finally:
+                if self.profiler is not None:
+                    self.profiler.record_sql(job.origin, callback_name(job.func),
+                                             (time.perf_counter() - started) * 1000)
+        self.fleet_system.conn.close()
+
+    def _fail_jobs(self, error):
+        # Answer every job, queued or still to come, with error until stop()
+        while True:
+            job = self.requests.get()
+            if job is None:
+                break
+            self.results.put((job, None, error))
+
+    def _poll(self):
+        # Deliver finished jobs on the Tk thread; stop polling once nothing is in flight so
+        # an idle window costs no CPU
+        while True:
+            try:
+                job, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if not job.quiet:
+                self.busy -= 1
+                if not self.busy and self.on_busy:
+                    self.on_busy(False)
+            if job.key is not None and self.latest.get(job.key) is job:
+                del self.latest[job.key]
+            if job.cancelled:
+                continue
+            if error is not None:
+                handler = job.on_error or self.on_error
+                if handler:
+                    self._deliver(handler, error)
+            elif job.on_done:
+                self._deliver(job.on_done, result)
+        if self.pending:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self.polling = False
+
+    def _deliver(self, handler, value):
+        if self.profiler is None:
+            handler(value)
+        else:
+            self.profiler.timed(callback_name(handler), handler, value)
@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
-from TeamDominationClasses import Vehicle, Maintenance, CallSchedule, FleetManagementSystem
+from fleet_core import Vehicle, Maintenance, FleetManagementSystem
 
 class FleetManagementApp:
     def __init__(self, root):
@@ -138,12 +138,16 @@ class FleetManagementApp:
         description = self.maintenance_description_entry.get()
 
         if vehicle_id and date and description:
-            maintenance = Maintenance(date, description)
-            if self.fms.add_maintenance_record(vehicle_id, maintenance):
-                messagebox.showinfo("Success", "Maintenance record added successfully.")
-                self.add_maintenance_window.destroy()
-            else:
+            if self.fms.get_vehicle(vehicle_id) is None:
                 messagebox.showerror("Error", "Vehicle ID not found.")
+                return
+            try:
+                self.fms.add_maintenance_record(vehicle_id, Maintenance(date, description))
+            except ValueError as error:
+                messagebox.showerror("Error", str(error))
+                return
+            messagebox.showinfo("Success", "Maintenance record added successfully.")
+            self.add_maintenance_window.destroy()
         else:
             messagebox.showerror("Error", "All fields are required.")
 